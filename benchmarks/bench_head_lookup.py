@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""commits 테이블이 커져도 헤드 조회 시간이 일정한지 확인하는 벤치마크.
+
+    python benchmarks/bench_head_lookup.py --commits 1000000 --paths 1000
+
+임시 디렉토리에 index.db를 만들고, 커밋 수가 늘어나는 각 지점에서
+head_hash() 평균 시간을 잽니다. --legacy를 주면 인덱스가 없던 예전
+스키마(file_path 문자열 + 전체 스캔)와 나란히 비교합니다.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from filegit_db import connect, ensure_schema, head_hash  # noqa: E402
+
+LEGACY_HEAD = "SELECT object_hash FROM commits WHERE file_path = ? ORDER BY timestamp DESC LIMIT 1"
+
+
+def _fill(conn, legacy, start, stop, paths):
+    rows = []
+    for i in range(start, stop):
+        path = paths[i % len(paths)]
+        if legacy:
+            rows.append((path, f"{i:064x}", f"2024-01-01T00:00:00.{i:06d}"))
+        else:
+            rows.append((i % len(paths) + 1, f"{i:064x}", 1_700_000_000_000_000 + i))
+    with conn:
+        if legacy:
+            conn.executemany("INSERT INTO commits (file_path, object_hash, timestamp) VALUES (?, ?, ?)", rows)
+        else:
+            conn.executemany("INSERT INTO commits (path_id, object_hash, timestamp) VALUES (?, ?, ?)", rows)
+
+
+def _time_lookups(lookup, paths, samples):
+    picks = [random.choice(paths) for _ in range(samples)]
+    started = time.perf_counter()
+    for path in picks: lookup(path)
+    return (time.perf_counter() - started) / samples * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commits", type=int, default=1_000_000)
+    parser.add_argument("--paths", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--legacy", action="store_true", help="인덱스 없는 예전 스키마도 함께 측정")
+    args = parser.parse_args()
+
+    random.seed(0)
+    paths = [f"/home/user/file_{i}.txt" for i in range(args.paths)]
+    checkpoints = [n for n in (10_000, 100_000, 1_000_000, 10_000_000) if n < args.commits] + [args.commits]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(Path(tmp) / "index.db")
+        ensure_schema(conn, None)
+        with conn:
+            conn.executemany("INSERT INTO paths (id, path) VALUES (?, ?)", [(i + 1, p) for i, p in enumerate(paths)])
+        legacy_conn = None
+        if args.legacy:
+            legacy_conn = sqlite3.connect(Path(tmp) / "legacy.db")
+            legacy_conn.execute("CREATE TABLE commits (id INTEGER PRIMARY KEY AUTOINCREMENT, file_path TEXT NOT NULL, "
+                                "object_hash TEXT NOT NULL, message TEXT, timestamp TEXT NOT NULL, "
+                                "type TEXT NOT NULL DEFAULT 'auto')")
+
+        print(f"{'commits':>12} {'head_hash (us)':>16}" + (f" {'legacy (us)':>14}" if args.legacy else ""))
+        filled = 0
+        for target in checkpoints:
+            for start in range(filled, target, 100_000):
+                _fill(conn, False, start, min(start + 100_000, target), paths)
+                if legacy_conn: _fill(legacy_conn, True, start, min(start + 100_000, target), paths)
+            filled = target
+            line = f"{target:>12,} {_time_lookups(lambda p: head_hash(conn, p), paths, args.samples):>16.1f}"
+            if legacy_conn:
+                # 전체 스캔이라 느리므로 표본 수를 줄입니다.
+                legacy_us = _time_lookups(lambda p: legacy_conn.execute(LEGACY_HEAD, (p,)).fetchone(), paths,
+                                          max(args.samples // 100, 5))
+                line += f" {legacy_us:>14.1f}"
+            print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
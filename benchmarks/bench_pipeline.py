@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""스냅샷 파이프라인 부하 테스트: 저장 폭주, 이벤트 -> 커밋 지연, 저장소 증가, 타임라인 읽기.
+
+    python benchmarks/bench_pipeline.py --files 100 --rounds 5 --output before.json
+    python benchmarks/bench_pipeline.py --scenario timeline --history 10000,100000,1000000
+    python benchmarks/bench_pipeline.py --scenario chunking --chunk-data 64M
+    python benchmarks/compare.py before.json after.json
+
+임시 FILEGIT_DIR 안에서 데몬과 같은 구성(WatcherEventHandler -> SnapshotScheduler ->
+create_auto_snapshot -> CommitWriter)을 띄우고, 크기가 여러 가지인 파일 N개에
+편집기 자동 저장 같은 연속 저장을 일으킵니다. 기본값은 옵저버를 거치지 않고 이벤트를
+핸들러에 직접 넣어 파이프라인만 잽니다. --observer를 주면 실제 watchdog 옵저버
+(inotify 등)를 거칩니다.
+
+storm 결과:
+  latency      파일을 쓰고 나서 그 내용이 DB에 커밋되기까지의 시간 (초, 커밋된 쓰기만)
+  throughput   초당 커밋 수와 초당 저장 바이트 수
+  store        객체 저장소와 DB가 늘어난 크기, 저장한 논리 바이트 대비 비율
+  phases       데몬 지표(filegit_metrics)의 구간별 지연 시간 요약
+timeline 결과: 이력 길이별 첫 페이지, 스크롤, 중간 지점 페이지, 헤드 조회 시간 (밀리초)
+chunking 결과: 청크 경계 찾기와 청크 저장의 처리량, 평균 청크 크기, 앞쪽에 몇 바이트를
+  끼워 넣은 뒤 다시 저장했을 때 새로 써야 했던 청크 비율
+
+결과는 JSON 하나로 출력되며(--output으로 파일 저장), 같은 --seed면 같은 부하를 만듭니다.
+네트워크는 쓰지 않습니다.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import copy
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# 모듈들이 import 시점에 FILEGIT_DIR을 읽으므로, 실제 저장소를 건드리지 않도록 먼저 임시 디렉토리로 돌립니다.
+WORK_DIR = Path(tempfile.mkdtemp(prefix="filegit-bench-"))
+os.environ["FILEGIT_DIR"] = str(WORK_DIR / "repo")
+
+from watchdog.events import FileModifiedEvent, FileMovedEvent  # noqa: E402
+from watchdog.observers import Observer  # noqa: E402
+
+from filegit_config import capture_options, DEFAULT_CONFIG  # noqa: E402
+from filegit_daemon import create_auto_snapshot, SnapshotScheduler, WatcherEventHandler, WatchManager  # noqa: E402
+from filegit_db import connect, ensure_schema, history_page, head_hash, all_heads, CommitWriter, DB_PATH  # noqa: E402
+from filegit_metrics import METRICS  # noqa: E402
+from filegit_store import capture_file, split_chunks, sync_pending, OBJECTS_DIR  # noqa: E402
+
+RESULT_VERSION = 1
+# 대시보드(filegit.PAGE_SIZE)와 같은 페이지 크기
+TIMELINE_PAGE_SIZE = 200
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    if text.endswith("B"): text = text[:-1]
+    unit = text[-1] if text and text[-1] in _UNITS else ""
+    return int(float(text[:len(text) - len(unit)]) * _UNITS[unit])
+
+
+def random_bytes(rng: random.Random, size: int) -> bytes:
+    # Random.randbytes()는 3.9부터 있습니다.
+    return rng.getrandbits(size * 8).to_bytes(size, "little") if size else b""
+
+
+def parse_size_mix(text: str) -> list[tuple[int, float]]:
+    """"4K:50,1M:10" -> [(4096, 50), (1048576, 10)] (크기:가중치, 가중치 생략 시 1)"""
+    mix = []
+    for part in text.split(","):
+        size, _, weight = part.partition(":")
+        mix.append((max(parse_size(size), 32), float(weight or 1)))
+    return mix
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values: return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    return {"count": len(ordered), "mean": sum(ordered) / len(ordered), "p50": pick(0.5), "p90": pick(0.9),
+            "p99": pick(0.99), "max": ordered[-1]}
+
+
+def dir_size(path: Path) -> tuple[int, int]:
+    total = files = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+                files += 1
+            except FileNotFoundError:
+                pass
+    return total, files
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "-C", str(ROOT), "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+            "cpus": os.cpu_count(), "sqlite": sqlite3.sqlite_version, "commit": commit}
+
+
+# --- 저장 폭주 ---
+class SyntheticFile:
+    """내용이 매번 달라지는 파일 하나. 앞쪽에 쓰기 순번을 찍고 임의 위치 몇 바이트를 바꿉니다."""
+
+    def __init__(self, path: Path, size: int, rng: random.Random, binary: bool):
+        self.path = path
+        # 텍스트는 16진 문자열이라 압축률이 절반쯤 되고, 바이너리는 압축되지 않습니다.
+        raw = random_bytes(rng, size if binary else (size + 1) // 2)
+        self.content = bytearray(raw if binary else raw.hex().encode()[:size])
+        self.rng = rng
+
+    def mutate(self, seq: int):
+        self.content[:16] = f"{seq:016d}".encode()
+        offset = self.rng.randrange(16, max(len(self.content) - 64, 17))
+        self.content[offset:offset + 64] = random_bytes(self.rng, min(64, len(self.content) - offset))
+
+    def save(self, atomic: bool) -> Path | None:
+        """내용을 저장하고, 원자적 저장이면 이름을 바꾸기 전의 임시 경로를 반환합니다."""
+        target = self.path.with_name(f".{self.path.name}.tmp") if atomic else self.path
+        with open(target, "wb") as f:
+            f.write(self.content)
+        if not atomic: return None
+        os.replace(target, self.path)
+        return target
+
+
+class LatencyRecorder:
+    """쓴 내용의 해시 -> 쓴 시각을 기억해 두었다가, 그 해시가 커밋되는 순간 지연 시간을 잽니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._written: dict[tuple[str, str], float] = {}
+        self.latencies: list[float] = []
+        self.commits = 0
+        self.unmatched = 0
+        self.last_commit: float | None = None
+
+    def written(self, path: str, digest: str):
+        with self._lock: self._written[(path, digest)] = time.perf_counter()
+
+    def committed(self, batch):
+        now = time.perf_counter()
+        with self._lock:
+            self.last_commit = now
+            for file_path, object_hash, *_ in batch:
+                self.commits += 1
+                written_at = self._written.pop((file_path, object_hash), None)
+                if written_at is None:
+                    # 쓰는 도중의 파일을 읽은 경우 (다음 이벤트가 곧 제대로 된 내용을 다시 기록함)
+                    self.unmatched += 1
+                else:
+                    self.latencies.append(now - written_at)
+
+
+def wait_idle(scheduler: SnapshotScheduler, writer: CommitWriter, settle: float, timeout: float) -> bool:
+    """늦게 도착하는 이벤트를 settle초 기다린 뒤, 스케줄러와 작성기가 모두 빌 때까지 기다립니다."""
+    deadline = time.monotonic() + timeout
+    time.sleep(settle)
+    while time.monotonic() < deadline:
+        stats = scheduler.stats()
+        if not stats["pending"] and not stats["running"]:
+            return writer.flush(timeout=max(deadline - time.monotonic(), 0.1))
+        time.sleep(0.01)
+    return False
+
+
+def run_storm(args) -> dict:
+    rng = random.Random(args.seed)
+    files_dir = WORK_DIR / "files"
+    files_dir.mkdir()
+    OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    conn = connect(DB_PATH)
+    ensure_schema(conn, DB_PATH)
+    conn.close()
+
+    mix = parse_size_mix(args.sizes)
+    sizes = rng.choices([size for size, _ in mix], weights=[weight for _, weight in mix], k=args.files)
+    files = [SyntheticFile(files_dir / f"file_{i:05d}.dat", size, rng, args.binary) for i, size in enumerate(sizes)]
+    for f in files: f.save(atomic=False)
+
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    config["daemon"].update(workers=args.workers, quiet_window=args.quiet_window)
+    if args.fsync: config["store"]["fsync"] = args.fsync
+    if args.chunk_threshold is not None: config["store"]["chunk_threshold"] = parse_size(args.chunk_threshold)
+    capture_opts = capture_options(config)
+
+    recorder = LatencyRecorder()
+    writer = CommitWriter(DB_PATH, batch_size=config["db"]["batch_size"],
+                          flush_interval=config["db"]["flush_interval"],
+                          before_commit=sync_pending, after_commit=recorder.committed)
+    scheduler = SnapshotScheduler.from_config(lambda path: create_auto_snapshot(path, writer, capture_opts), config)
+    handler = WatcherEventHandler(scheduler)
+    observer = Observer()
+    manager = WatchManager(observer, handler)
+    handler.manager = manager
+
+    saves = logical_bytes = 0
+    # 스냅샷마다 찍는 로그가 결과 JSON과 섞이지 않도록 데몬처럼 로그 파일로 보냅니다.
+    with open(WORK_DIR / "daemon.log", "w") as log, contextlib.redirect_stdout(log):
+        manager.apply({str(f.path) for f in files})
+        scheduler.start()
+        if args.observer: observer.start()
+        # 처음 만든 파일들은 재지 않고 먼저 한 번 기록해 둡니다. (이후는 "수정"만 측정)
+        for f in files: handler.dispatch(FileModifiedEvent(str(f.path)))
+        wait_idle(scheduler, writer, args.quiet_window, args.timeout)
+        baseline_store, _ = dir_size(OBJECTS_DIR)
+        baseline_commits = recorder.commits
+        recorder.latencies.clear()
+        recorder.unmatched = 0
+        METRICS.reset()
+
+        seq = 0
+        started = time.perf_counter()
+        for round_index in range(args.rounds):
+            round_started = time.perf_counter()
+            active = rng.sample(files, max(1, int(len(files) * args.active)))
+            for _ in range(args.saves):
+                for f in active:
+                    seq += 1
+                    f.mutate(seq)
+                    tmp_path = f.save(args.atomic)
+                    recorder.written(str(f.path), hashlib.sha256(f.content).hexdigest())
+                    if not args.observer:
+                        event = (FileMovedEvent(str(tmp_path), str(f.path)) if tmp_path
+                                 else FileModifiedEvent(str(f.path)))
+                        handler.dispatch(event)
+                    saves += 1
+                    logical_bytes += len(f.content)
+                if args.save_gap: time.sleep(args.save_gap)
+            print(f"round {round_index + 1}/{args.rounds}: {len(active)} file(s) x {args.saves} save(s)",
+                  file=sys.stderr)
+            remaining = args.interval - (time.perf_counter() - round_started)
+            if remaining > 0 and round_index + 1 < args.rounds: time.sleep(remaining)
+        writes_done = time.perf_counter()
+        settle = args.quiet_window + (0.5 if args.observer else 0)
+        drained = wait_idle(scheduler, writer, settle, args.timeout)
+
+        if args.observer:
+            observer.stop()
+            observer.join()
+        scheduler.stop()
+        writer.close()
+
+    elapsed = (recorder.last_commit or writes_done) - started
+    store_bytes, store_files = dir_size(OBJECTS_DIR)
+    db_bytes = sum(p.stat().st_size for p in DB_PATH.parent.glob(DB_PATH.name + "*"))
+    commits = recorder.commits - baseline_commits
+    phases = METRICS.snapshot()
+    return {
+        "drained": drained,
+        "files": len(files),
+        "saves": saves,
+        "commits": commits,
+        "unmatched_commits": recorder.unmatched,
+        # 조용한 구간 안에서 하나로 합쳐져 따로 기록되지 않은 저장의 비율
+        "coalesced_ratio": 1 - commits / saves if saves else 0,
+        "elapsed": elapsed,
+        "write_phase": writes_done - started,
+        "latency": percentiles(recorder.latencies),
+        "throughput": {"commits_per_sec": commits / elapsed if elapsed else 0,
+                       "saves_per_sec": saves / elapsed if elapsed else 0,
+                       "bytes_per_sec": logical_bytes / elapsed if elapsed else 0},
+        "store": {"logical_bytes": logical_bytes, "object_bytes": store_bytes - baseline_store,
+                  "object_files": store_files, "db_bytes": db_bytes,
+                  "growth_ratio": (store_bytes - baseline_store) / logical_bytes if logical_bytes else 0},
+        "phases": phases["histograms"],
+        "counters": phases["counters"],
+    }
+
+
+# --- 타임라인 읽기 ---
+def _fill_history(conn, start: int, stop: int, other_paths: int):
+    # 대상 파일(path_id 1)과 다른 파일들의 커밋을 섞어 넣어, 인덱스가 없으면 느려지는 모양을 만듭니다.
+    rows = []
+    for i in range(start, stop):
+        rows.append((1, f"{i:064x}", 1_700_000_000_000_000 + i * 1000, "manual" if i % 50 == 0 else "auto"))
+        if other_paths: rows.append((2 + i % other_paths, f"{i:063x}f", 1_700_000_000_000_000 + i * 1000 + 1, "auto"))
+    with conn:
+        conn.executemany("INSERT INTO commits (path_id, object_hash, timestamp, type) VALUES (?, ?, ?, ?)", rows)
+
+
+def _timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat): fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def run_timeline(args) -> list[dict]:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = connect(DB_PATH)
+    ensure_schema(conn, DB_PATH)
+    target = str(WORK_DIR / "files" / "long_history.txt")
+    with conn:
+        conn.execute("INSERT INTO paths (id, path) VALUES (1, ?)", (target,))
+        conn.executemany("INSERT INTO paths (id, path) VALUES (?, ?)",
+                         [(i + 2, str(WORK_DIR / "files" / f"other_{i}.txt")) for i in range(args.other_paths)])
+
+    results, filled = [], 0
+    for size in sorted(int(n) for n in args.history.split(",")):
+        for start in range(filled, size, 100_000):
+            _fill_history(conn, start, min(start + 100_000, size), args.other_paths)
+        filled = size
+        print(f"timeline: {size:,} commit(s)", file=sys.stderr)
+
+        def scroll():
+            before = None
+            for _ in range(args.scroll_pages):
+                page = history_page(conn, target, before=before, limit=TIMELINE_PAGE_SIZE + 1)
+                if len(page) <= TIMELINE_PAGE_SIZE: break
+                last = page[TIMELINE_PAGE_SIZE - 1]
+                before = (last["timestamp"], last["id"])
+
+        middle = (1_700_000_000_000_000 + size // 2 * 1000, 2 ** 62)
+        results.append({
+            "commits": size,
+            "first_page_ms": _timed(lambda: history_page(conn, target, limit=TIMELINE_PAGE_SIZE + 1), args.repeat),
+            "scroll_ms_per_page": _timed(scroll, max(args.repeat // 10, 1)) / args.scroll_pages,
+            "middle_page_ms": _timed(lambda: history_page(conn, target, before=middle,
+                                                          limit=TIMELINE_PAGE_SIZE + 1), args.repeat),
+            "newer_page_ms": _timed(lambda: history_page(conn, target, after=middle, limit=TIMELINE_PAGE_SIZE),
+                                    args.repeat),
+            "head_hash_ms": _timed(lambda: head_hash(conn, target), args.repeat),
+            "all_heads_ms": _timed(lambda: all_heads(conn), max(args.repeat // 10, 1)),
+        })
+    conn.close()
+    return results
+
+
+# --- 청크 나누기 ---
+def run_chunking(args) -> dict:
+    size = parse_size(args.chunk_data)
+    data = random_bytes(random.Random(args.seed), size)
+    # 첫 실행이 페이지 캐시와 할당을 데우도록 한 번 더 돌려 나중 것만 잽니다.
+    list(split_chunks(io.BytesIO(data)))
+    started = time.perf_counter()
+    chunks = list(split_chunks(io.BytesIO(data)))
+    split_seconds = time.perf_counter() - started
+
+    files_dir = WORK_DIR / "files"
+    files_dir.mkdir(exist_ok=True)
+    target = files_dir / "chunked.bin"
+    target.write_bytes(data)
+    started = time.perf_counter()
+    capture_file(target, chunk_threshold=1)
+    capture_seconds = time.perf_counter() - started
+    # 앞쪽에 바이트를 끼워 넣어도 그 부근의 청크만 새로 써야 합니다.
+    target.write_bytes(data[:4096] + b"inserted" + data[4096:])
+    second = capture_file(target, chunk_threshold=1)
+    reused = len(set(second.chunks) & {hashlib.sha256(c).hexdigest() for c in chunks})
+    return {
+        "data_bytes": size,
+        "split_seconds": split_seconds,
+        "split_bytes_per_sec": size / split_seconds if split_seconds else 0,
+        "capture_seconds": capture_seconds,
+        "capture_bytes_per_sec": size / capture_seconds if capture_seconds else 0,
+        "mean_chunk_bytes": size / len(chunks) if chunks else 0,
+        # 다시 저장할 때 새로 써야 했던 청크의 비율 (작을수록 좋음)
+        "rewritten_ratio": 1 - reused / len(second.chunks) if second.chunks else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=("storm", "timeline", "chunking", "all"), default="all")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="결과 JSON을 저장할 파일 (기본값: 표준 출력)")
+    parser.add_argument("--keep", action="store_true", help="끝난 뒤 임시 FILEGIT_DIR을 지우지 않음")
+    storm = parser.add_argument_group("storm")
+    storm.add_argument("--files", type=int, default=100)
+    storm.add_argument("--sizes", default="1K:50,16K:30,256K:15,2M:5", help="크기:가중치 목록")
+    storm.add_argument("--binary", action="store_true", help="압축되지 않는 임의 바이트로 채움 (기본값: 텍스트)")
+    storm.add_argument("--rounds", type=int, default=5)
+    storm.add_argument("--active", type=float, default=1.0, help="라운드마다 저장할 파일 비율")
+    storm.add_argument("--saves", type=int, default=3, help="라운드마다 파일 하나를 연달아 저장하는 횟수")
+    storm.add_argument("--save-gap", type=float, default=0.02, help="연속 저장 사이 간격(초)")
+    storm.add_argument("--interval", type=float, default=1.0, help="라운드 시작 간격(초)")
+    storm.add_argument("--atomic", action="store_true", help="임시 파일에 쓴 뒤 이름을 바꿔 저장")
+    storm.add_argument("--observer", action="store_true", help="실제 watchdog 옵저버로 이벤트를 받음")
+    storm.add_argument("--workers", type=int, default=4)
+    storm.add_argument("--quiet-window", type=float, default=0.3)
+    storm.add_argument("--fsync", choices=("none", "batched", "always"))
+    storm.add_argument("--chunk-threshold", help="예: 1M (기본값: 설정 기본값)")
+    storm.add_argument("--timeout", type=float, default=300, help="처리가 끝나기를 기다리는 최대 시간(초)")
+    timeline = parser.add_argument_group("timeline")
+    timeline.add_argument("--history", default="10000,100000,1000000", help="측정할 이력 길이 목록")
+    timeline.add_argument("--other-paths", type=int, default=1000)
+    timeline.add_argument("--scroll-pages", type=int, default=20)
+    timeline.add_argument("--repeat", type=int, default=200)
+    chunking = parser.add_argument_group("chunking")
+    chunking.add_argument("--chunk-data", default="64M", help="청크로 나눌 임의 데이터 크기")
+    args = parser.parse_args()
+
+    report = {"benchmark": "pipeline", "version": RESULT_VERSION,
+              "started_at": datetime.now().isoformat(timespec="seconds"), "env": environment(),
+              "params": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()}, "results": {}}
+    try:
+        if args.scenario in ("storm", "all"): report["results"]["storm"] = run_storm(args)
+        if args.scenario in ("timeline", "all"):
+            # 폭주 시나리오가 남긴 커밋과 섞이지 않도록 새 DB에서 잽니다.
+            for p in DB_PATH.parent.glob(DB_PATH.name + "*"): p.unlink()
+            report["results"]["timeline"] = run_timeline(args)
+        if args.scenario in ("chunking", "all"): report["results"]["chunking"] = run_chunking(args)
+    finally:
+        if args.keep:
+            print(f"kept {WORK_DIR}", file=sys.stderr)
+        else:
+            shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""가벼운 명령의 시작 시간이 예산 안에 있는지 확인합니다.
+
+    python benchmarks/check_import_time.py
+    python benchmarks/check_import_time.py --import-budget-ms 80 --output startup.json
+
+`python -X importtime -c "import filegit"`으로 CLI 모듈의 import 시간을 재고, 가벼운
+명령에는 필요 없는 무거운 모듈(TUI, 데몬, DB, 객체 저장소, diff)이 딸려 오지 않는지
+확인합니다. 그리고 watch-list와 --help를 실제로 실행해 빈 인터프리터 대비 걸린 시간을
+잽니다. 모두 --repeat번 재서 가장 빠른 값을 씁니다. 예산을 넘거나 금지된 모듈이
+import되면 종료 코드 1로 끝납니다.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+CLI_SCRIPT = ROOT / "filegit.py"
+
+# `import filegit`만으로는 불러오면 안 되는 모듈들 (해당 명령 안에서만 import)
+FORBIDDEN_MODULES = ("textual", "daemon", "watchdog", "difflib", "sqlite3", "filegit_db", "filegit_store",
+                     "filegit_gc", "filegit_hashcache", "filegit_preview", "filegit_tui", "filegit_daemon",
+                     "filegit_blame", "filegit_bulk", "filegit_fsck", "filegit_search")
+COMMANDS = (("watch-list",), ("--help",))
+
+
+def measure_import(env: dict) -> tuple[float, set[str]]:
+    """filegit import에 걸린 누적 시간(ms)과 함께 import된 모듈 이름들."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import filegit"], env=env, cwd=ROOT,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        error = "\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:"))
+        sys.exit(f"cannot import filegit:\n{error}")
+    cumulative_us, modules = None, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"): continue
+        _, cumulative, name = (field.strip() for field in line[len("import time:"):].split("|"))
+        if not cumulative.isdigit(): continue   # 머리글 줄
+        modules.add(name)
+        if name == "filegit": cumulative_us = int(cumulative)
+    return (cumulative_us or 0) / 1000, modules
+
+
+def measure_command(args: list[str], env: dict) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, *args], env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--import-budget-ms", type=float, default=100, help="import filegit 누적 시간 예산")
+    parser.add_argument("--command-budget-ms", type=float, default=150,
+                        help="가벼운 명령 실행 시간 예산 (빈 인터프리터 시작 시간 제외)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="결과 JSON을 저장할 파일")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="filegit-startup-") as tmp:
+        # 실제 저장소나 실행 중인 데몬의 상태에 따라 결과가 달라지지 않도록 빈 저장소에서 잽니다.
+        env = {**os.environ, "FILEGIT_DIR": tmp,
+               "PYTHONPATH": os.pathsep.join(filter(None, (str(ROOT), os.environ.get("PYTHONPATH"))))}
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        measure_import(env)     # .pyc 만들기
+        samples = [measure_import(env) for _ in range(args.repeat)]
+        import_ms = min(ms for ms, _ in samples)
+        modules = samples[0][1]
+        forbidden = sorted(name for name in modules if name.split(".")[0] in FORBIDDEN_MODULES)
+        baseline_ms = min(measure_command(["-c", "pass"], env) for _ in range(args.repeat))
+        commands = {}
+        for command in COMMANDS:
+            elapsed = min(measure_command([str(CLI_SCRIPT), *command], env) for _ in range(args.repeat))
+            commands[" ".join(command)] = {"total_ms": elapsed, "overhead_ms": elapsed - baseline_ms}
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import filegit took {import_ms:.1f}ms (budget {args.import_budget_ms:.0f}ms)")
+    if forbidden:
+        failures.append(f"import filegit pulled in heavy modules: {', '.join(forbidden)}")
+    for name, timing in commands.items():
+        if timing["overhead_ms"] > args.command_budget_ms:
+            failures.append(f"'filegit {name}' took {timing['overhead_ms']:.1f}ms over interpreter start "
+                            f"(budget {args.command_budget_ms:.0f}ms)")
+
+    report = {"benchmark": "startup", "version": 1,
+              "env": {"python": platform.python_version(), "platform": platform.platform()},
+              "params": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+              "results": {"import_ms": import_ms, "interpreter_ms": baseline_ms, "commands": commands,
+                          "forbidden_modules": forbidden, "module_count": len(modules)},
+              "failures": failures}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+    for failure in failures: print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""두 벤치마크 결과 JSON을 비교해 숫자 지표마다 변화율을 보여줍니다.
+
+    python benchmarks/compare.py before.json after.json
+    python benchmarks/compare.py before.json after.json --threshold 15 --fail
+
+지표 이름에 per_sec가 들어가면 클수록 좋은 값, 나머지(지연 시간, 크기 등)는 작을수록
+좋은 값으로 봅니다. (카운터처럼 부하의 양을 따라가는 값은 판정하지 않음)
+--threshold(%)보다 나빠진 지표는 REGRESSION으로 표시하고,
+--fail을 주면 하나라도 있을 때 종료 코드 1로 끝납니다.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# 측정 조건이지 성능이 아닌 값들
+IGNORED_KEYS = {"drained", "files", "saves", "count", "commits", "object_files", "data_bytes"}
+# 부하의 양을 따라 변하는 값들: 보여 주기만 하고 좋아졌는지 나빠졌는지는 판정하지 않습니다.
+NEUTRAL_KEYS = {"counters", "coalesced_ratio", "sum", "mean_chunk_bytes"}
+
+
+def flatten(value, prefix: str = "") -> dict[str, float]:
+    """중첩된 결과를 "storm.latency.p99" 같은 이름 -> 숫자로 폅니다. 목록은 commits 값으로 구분합니다."""
+    flat = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in IGNORED_KEYS and not isinstance(item, (dict, list)): continue
+            flat.update(flatten(item, f"{prefix}{key}."))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            label = item.get("commits", i) if isinstance(item, dict) else i
+            flat.update(flatten(item, f"{prefix}{label}."))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        flat[prefix.rstrip(".")] = value
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="회귀로 볼 변화율(%%)")
+    parser.add_argument("--fail", action="store_true", help="회귀가 있으면 종료 코드 1")
+    args = parser.parse_args()
+
+    reports = [json.loads(path.read_text()) for path in (args.before, args.after)]
+    if reports[0].get("params") != reports[1].get("params"):
+        print("warning: the two runs used different parameters", file=sys.stderr)
+    before, after = (flatten(report.get("results", {})) for report in reports)
+
+    regressions = 0
+    print(f"{'metric':<52} {'before':>14} {'after':>14} {'change':>9}")
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if "per_sec" in name else change
+        flag = ""
+        if NEUTRAL_KEYS & set(name.split(".")):
+            pass
+        elif worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif worse < -args.threshold:
+            flag = "  improved"
+        print(f"{name:<52} {old:>14.6g} {new:>14.6g} {change:>+8.1f}%{flag}")
+    for name in sorted(before.keys() ^ after.keys()):
+        print(f"{name:<52} {'only in ' + ('before' if name in before else 'after'):>29}")
+    if args.fail and regressions: sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,21 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
-import sqlite3
-import shutil
 from pathlib import Path
-from datetime import datetime
-import hashlib
 import click
-import difflib
 import json
 import os
-import sys
 import signal
-from daemon import DaemonContext
-from daemon.pidfile import PIDLockFile
+import time
 
-# --- TUI 관련 import ---
-from textual.app import App, ComposeResult, on
-from textual.widgets import Header, Footer, DataTable, Static, Input
-from textual.containers import Vertical, Horizontal
-from textual.screen import ModalScreen
-from textual.binding import Binding
+# 셸 스크립트나 훅에서 자주 불리는 가벼운 명령(watch, unwatch, watch-list 등)이 빨리 끝나도록,
+# 여기서는 가벼운 모듈만 import합니다. DB, 객체 저장소, TUI, 데몬은 필요한 명령 안에서 불러옵니다.
+from filegit_config import load_config, set_option, get_option, FILEGIT_DIR
+from filegit_watchlist import load_watchlist, save_watchlist, normalize_entry, is_glob, expand_entry, expand_watchlist
+import filegit_ipc
+from filegit_ipc import DaemonUnavailable, DaemonError
 
 # --- 설정 (데몬과 공유) ---
-FILEGIT_DIR = Path.home() / ".filegit"
-OBJECTS_DIR = FILEGIT_DIR / "objects"
-DB_PATH = FILEGIT_DIR / "index.db"
 WATCHLIST_PATH = FILEGIT_DIR / "watchlist.json"
 PID_FILE_PATH = FILEGIT_DIR / "daemon.pid"
 LOG_FILE_PATH = FILEGIT_DIR / "daemon.log"
@@ -34,237 +24,6 @@ LOG_FILE_PATH = FILEGIT_DIR / "daemon.log"
 DAEMON_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "filegit_daemon.py")
 
 
-def get_file_hash(filepath: Path) -> str | None:
-    if not filepath.exists(): return None
-    hasher = hashlib.sha256()
-    with open(filepath, "rb") as f:
-        while chunk := f.read(8192): hasher.update(chunk)
-    return hasher.hexdigest()
-
-
-def format_timestamp(ts_iso: str) -> str:
-    dt_obj = datetime.fromisoformat(ts_iso)
-    return dt_obj.strftime('%y-%m-%d %H:%M:%S')
-
-
-def setup_repo():
-    OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    with conn:
-        conn.execute("""
-                     CREATE TABLE IF NOT EXISTS commits
-                     (
-                         id
-                         INTEGER
-                         PRIMARY
-                         KEY
-                         AUTOINCREMENT,
-                         file_path
-                         TEXT
-                         NOT
-                         NULL,
-                         object_hash
-                         TEXT
-                         NOT
-                         NULL,
-                         message
-                         TEXT,
-                         timestamp
-                         TEXT
-                         NOT
-                         NULL,
-                         type
-                         TEXT
-                         NOT
-                         NULL
-                         DEFAULT
-                         'auto'
-                     );
-                     """)
-    return conn
-
-
-# --- TUI 애플리케이션 (이전과 동일) ---
-class CommitInputScreen(ModalScreen):
-    # ... (생략, 이전과 동일)
-    def __init__(self, commit_id: int): super().__init__(); self.commit_id = commit_id
-
-    def compose(self) -> ComposeResult:
-        dialog = Vertical(Static("커밋 메시지를 입력하세요 (ESC: 취소):"), Input(placeholder="메시지...", id="commit-input"),
-                          id="commit-dialog")
-        dialog.styles.align = ("center", "middle")
-        dialog.styles.width = 60
-        dialog.styles.height = 5
-        dialog.styles.border = ("thick", "dodgerblue")
-        yield dialog
-
-    def on_mount(self) -> None: self.query_one(Input).focus()
-
-    def on_input_submitted(self, event: Input.Submitted) -> None: self.dismiss(event.value or None)
-
-
-class DashboardApp(App):
-    # ... (생략, 이전과 동일)
-    BINDINGS = [
-        Binding("q", "quit", "종료"), Binding("a", "add_snapshot", "스냅샷 추가(A)"),
-        Binding("c", "commit_message", "커밋 메시지(C)"), Binding("r", "restore_selected", "선택 버전으로 복원(R)"),
-        Binding("f", "forget_file", "추적 중단(F)"), Binding("s", "refresh_status", "상태 새로고침(S)"),
-    ]
-
-    def __init__(self, filepath: Path):
-        super().__init__();
-        self.filepath = filepath;
-        self.conn = setup_repo()
-        self.timeline_panel = DataTable(id="timeline_table");
-        self.content_panel = Static(id="content_view", expand=True)
-        self.diff_panel = Static(id="diff_view", expand=True);
-        self.header = Header()
-        self.current_row_key = None;
-        self.is_forget_pending = False
-
-    def compose(self) -> ComposeResult:
-        left_pane = Vertical(self.timeline_panel, self.diff_panel, id="left-pane")
-        main_container = Horizontal(left_pane, self.content_panel, id="main-container")
-        main_container.styles.height = "1fr";
-        left_pane.styles.width = "60%";
-        left_pane.styles.min_width = 40;
-        left_pane.styles.border_right = ("solid", "dodgerblue")
-        self.timeline_panel.styles.height = "60%";
-        self.timeline_panel.styles.border_bottom = ("solid", "dodgerblue")
-        self.diff_panel.styles.height = "40%";
-        self.diff_panel.styles.padding = (0, 1)
-        self.content_panel.styles.width = "40%";
-        self.content_panel.styles.padding = (0, 1)
-        yield self.header;
-        yield main_container;
-        yield Footer()
-
-    def on_mount(self) -> None:
-        self.timeline_panel.cursor_type = "row";
-        self.timeline_panel.add_columns("타입", "날짜", "해시", "메시지");
-        self.refresh_all()
-
-    def refresh_all(self):
-        self.update_header(); self.load_timeline()
-
-    def update_header(self):
-        current_hash = get_file_hash(self.filepath);
-        style_map = {"success": "darkgreen", "warning": "darkgoldenrod", "error": "darkred"};
-        style = "success"
-        if not current_hash:
-            style, status_text = "error", "[DELETED]"
-        else:
-            cursor = self.conn.cursor();
-            cursor.execute("SELECT object_hash FROM commits WHERE file_path = ? ORDER BY timestamp DESC LIMIT 1",
-                           (str(self.filepath),));
-            last_commit = cursor.fetchone()
-            if not last_commit or current_hash != last_commit['object_hash']:
-                style, status_text = "warning", "[MODIFIED]"
-            else:
-                style, status_text = "success", "[up-to-date]"
-        self.header.text = f"📜 {self.filepath.name}";
-        self.header.sub_text = f"상태: {status_text}";
-        self.header.styles.background = style_map.get(style, "darkblue")
-
-    def load_timeline(self):
-        self.timeline_panel.clear();
-        cursor = self.conn.cursor();
-        cursor.execute("SELECT * FROM commits WHERE file_path = ? ORDER BY timestamp DESC", (str(self.filepath),));
-        logs = cursor.fetchall()
-        last_commit = logs[0] if logs else None;
-        current_hash = get_file_hash(self.filepath);
-        is_modified = not last_commit or (current_hash and current_hash != last_commit['object_hash'])
-        if is_modified and current_hash:
-            marker = "(temp)";
-            ts = format_timestamp(datetime.now().isoformat());
-            msg = "저장되지 않은 변경 사항";
-            prev_hash = last_commit['object_hash'] if last_commit else None
-            self.timeline_panel.add_row(marker, ts, current_hash[:12], msg, key=f"{current_hash}|{prev_hash}|temp|temp")
-        for i, log in enumerate(logs):
-            marker = "(*)" if log['type'] == 'manual' else "(')";
-            ts = format_timestamp(log['timestamp']);
-            msg = log['message'] or "";
-            prev_hash = logs[i + 1]['object_hash'] if i + 1 < len(logs) else None
-            self.timeline_panel.add_row(marker, ts, log['object_hash'][:12], msg,
-                                        key=f"{log['object_hash']}|{prev_hash}|{log['id']}|{log['type']}")
-
-    @on(DataTable.RowHighlighted)
-    def update_views(self, event: DataTable.RowHighlighted) -> None:
-        self.current_row_key = event.row_key;
-        if not self.current_row_key or not self.current_row_key.value: return
-        current_hash, prev_hash, _, _ = self.current_row_key.value.split('|', 4)
-        if current_hash and (OBJECTS_DIR / current_hash).exists():
-            content_path = OBJECTS_DIR / current_hash;
-        else:
-            content_path = self.filepath
-        try:
-            self.content_panel.update(content_path.read_text(encoding='utf-8'))
-        except Exception:
-            self.content_panel.update("[내용을 읽을 수 없습니다]")
-        if not prev_hash or prev_hash == 'None': self.diff_panel.update("[첫 커밋이므로 이전 버전 없음]"); return
-        try:
-            prev_content = (OBJECTS_DIR / prev_hash).read_text(encoding='utf-8').splitlines()
-            if "temp" in self.current_row_key.value:
-                current_content = self.filepath.read_text(encoding='utf-8').splitlines()
-            else:
-                current_content = (OBJECTS_DIR / current_hash).read_text(encoding='utf-8').splitlines()
-            diff = difflib.unified_diff(prev_content, current_content, fromfile='a', tofile='b', lineterm='');
-            self.diff_panel.update("\n".join(diff))
-        except Exception:
-            self.diff_panel.update("[Diff 생성 중 오류]")
-
-    def action_add_snapshot(self) -> None:
-        current_hash = get_file_hash(self.filepath);
-        if not current_hash: self.notify("파일을 찾을 수 없습니다.", severity="error"); return
-        shutil.copy(self.filepath, OBJECTS_DIR / current_hash)
-        with self.conn: self.conn.execute("INSERT INTO commits (file_path, object_hash, timestamp) VALUES (?, ?, ?)",
-                                          (str(self.filepath), current_hash, datetime.now().isoformat()))
-        self.notify("✨ 스냅샷을 추가했습니다.", title="Snapshot Added");
-        self.refresh_all()
-
-    def action_commit_message(self) -> None:
-        if not self.current_row_key: self.notify("먼저 타임라인에서 행을 선택하세요.", severity="warning", timeout=2); return
-        key_value = self.current_row_key.value;
-        _, _, commit_id, commit_type = key_value.split('|', 4)
-        if commit_type == 'manual': self.notify("이미 수동 커밋입니다.", severity="warning"); return
-        if commit_type == 'temp': self.notify("먼저 스냅샷을 추가(A)해야 커밋할 수 있습니다.", severity="error"); return
-
-        def on_submit(message: str | None):
-            if message:
-                with self.conn: self.conn.execute("UPDATE commits SET type = 'manual', message = ? WHERE id = ?",
-                                                  (message, int(commit_id)))
-                self.notify(f"📌 커밋 완료: {message}");
-                self.refresh_all()
-
-        self.push_screen(CommitInputScreen(int(commit_id)), on_submit)
-
-    def action_restore_selected(self) -> None:
-        if not self.current_row_key: self.notify("먼저 타임라인에서 행을 선택하세요.", severity="warning", timeout=2); return
-        key_value = self.current_row_key.value;
-        selected_hash, _, _, commit_type = key_value.split('|', 4)
-        if commit_type == 'temp': self.notify("현재 작업중인 버전입니다.", severity="information"); return
-        shutil.copy(OBJECTS_DIR / selected_hash, self.filepath);
-        self.notify(f"✅ [{selected_hash[:7]}] 버전으로 복원 완료!", title="Restore");
-        self.refresh_all()
-
-    def action_forget_file(self) -> None:
-        if self.is_forget_pending:
-            with self.conn:
-                self.conn.execute("DELETE FROM commits WHERE file_path = ?", (str(self.filepath),)); self.exit(
-                    message=f"'{self.filepath.name}'의 모든 이력을 삭제했습니다.")
-        else:
-            self.notify("정말로 삭제하시려면 5초 안에 'F'를 다시 누르세요.", severity="error", timeout=5);
-            self.is_forget_pending = True;
-            self.set_timer(5, self.cancel_forget)
-
-    def cancel_forget(self) -> None:
-        if self.is_forget_pending: self.is_forget_pending = False; self.notify("삭제가 취소되었습니다.")
-
-    def action_refresh_status(self) -> None:
-        self.refresh_all(); self.notify("상태를 새로고침했습니다.", title="Refresh")
-
-
 # --- Click CLI ---
 @click.group()
 def cli(): pass
@@ -272,58 +31,359 @@ def cli(): pass
 
 @cli.command()
 def init():
+    from filegit_db import setup_repo
     setup_repo()
     click.echo(f"✅ filegit 시스템이 초기화되었습니다: {FILEGIT_DIR}")
 
 
-@cli.command(help="파일의 타임라인 대시보드를 엽니다.")
-@click.argument('filepath', type=click.Path(exists=True, resolve_path=True))
-def timeline(filepath):
-    DashboardApp(Path(filepath)).run()
-
+@cli.command(help="파일의 타임라인 대시보드를 엽니다. 파일을 주지 않으면 저장소 전체 대시보드를 엽니다.")
+@click.argument('filepath', required=False, type=click.Path(exists=True, resolve_path=True))
+@click.option('--at', 'commit_id', type=int, help="처음에 선택할 커밋 번호 (grep 결과의 #번호)")
+def timeline(filepath, commit_id):
+    from filegit_tui import DashboardApp, RepoDashboardApp
+    if filepath is None and commit_id is not None:
+        # 커밋 번호만 주면 그 커밋의 파일을 엽니다.
+        from filegit_db import setup_repo
+        conn = setup_repo()
+        row = conn.execute("SELECT p.path FROM commits c JOIN paths p ON p.id = c.path_id WHERE c.id = ?",
+                           (commit_id,)).fetchone()
+        conn.close()
+        if not row: raise click.UsageError(f"#{commit_id} 커밋이 없습니다.")
+        filepath = row[0]
+    if filepath is not None:
+        DashboardApp(Path(filepath), start_commit=commit_id).run()
+        return
+    # 저장소 대시보드에서 고른 파일을 열고, 그 대시보드를 닫으면 저장소 대시보드로 돌아옵니다.
+    selected = None
+    while target := RepoDashboardApp(select=selected).run():
+        selected, start_commit = target
+        DashboardApp(Path(selected), start_commit=start_commit).run()
+
+
+@cli.command(help="객체 저장소를 델타 압축된 팩 파일로 다시 묶습니다.")
+@click.option('--max-chain', type=click.IntRange(0),
+              help="델타 체인 최대 길이 (작을수록 오래된 버전 읽기가 빠름, 기본값: 10)")
+def repack(max_chain):
+    from filegit_db import setup_repo
+    from filegit_gc import packed_garbage, forget_packed, DEFAULT_GRACE_PERIOD
+    from filegit_store import repack as repack_objects, DEFAULT_MAX_CHAIN
+    if max_chain is None: max_chain = DEFAULT_MAX_CHAIN
+    conn = setup_repo()
+    histories, current_path, history = [], None, []
+    # 파일별로 최신 버전부터 모아 델타 베이스 순서를 정합니다.
+    for row in conn.execute("SELECT path_id, object_hash FROM commits ORDER BY path_id, timestamp DESC, id DESC"):
+        if row['path_id'] != current_path:
+            if history: histories.append(history)
+            current_path, history = row['path_id'], []
+        history.append(row['object_hash'])
+    if history: histories.append(history)
+    # GC가 팩에만 남아 있다고 표시한, 더 이상 참조되지 않는 객체는 새 팩에서 뺍니다.
+    drop = packed_garbage(conn, grace=get_option(load_config(), "gc.grace_period", DEFAULT_GRACE_PERIOD))
+
+    stats = repack_objects(histories, max_chain=max_chain, drop=drop)
+    if drop: forget_packed(conn, drop)
+    conn.close()
+    if stats['dropped']: click.echo(f"🗑️ 참조되지 않는 객체 {stats['dropped']}개를 팩에서 뺐습니다.")
+    if not stats['objects']: click.echo("묶을 객체가 없습니다."); return
+    click.echo(f"📦 객체 {stats['objects']}개를 팩으로 묶었습니다. (델타 {stats['deltas']}개)")
+    click.echo(f"   {stats['bytes_before']:,} bytes -> {stats['bytes_after']:,} bytes")
+
+
+def _report_gc(stats: dict):
+    removed = stats['objects'] + stats['chunks']
+    click.echo(f"♻️ 객체 {removed}개를 지워 {stats['bytes']:,} bytes를 회수했습니다.")
+    if stats['packed']: click.echo(f"   팩 안의 객체 {stats['packed']}개는 다음 'repack' 때 정리됩니다.")
+    if stats['deferred']: click.echo(f"   최근에 쓰인 객체 {stats['deferred']}개는 나중에 다시 확인합니다.")
+
+
+@cli.command(help="보존 규칙에 따라 오래된 버전을 지우고 그 객체를 정리합니다.")
+@click.argument('filepath', required=False, type=click.Path(resolve_path=True))
+@click.option('--all', 'all_files', is_flag=True, help="모든 파일에 적용")
+@click.option('--before', type=click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%dT%H:%M:%S"]),
+              help="이 날짜 이전의 버전만 삭제")
+@click.option('--keep-last', type=click.IntRange(1), help="가장 최근 N개 버전은 남김")
+@click.option('--keep-manual', '--auto-only', 'keep_manual', is_flag=True,
+              help="수동 커밋은 남기고 자동 커밋만 삭제 (--auto-only는 같은 옵션의 다른 이름)")
+def clean(filepath, all_files, before, keep_last, keep_manual):
+    if bool(filepath) == all_files: raise click.UsageError("파일 경로나 --all 중 하나를 지정하세요.")
+    if before is None and keep_last is None:
+        raise click.UsageError("--before나 --keep-last 중 하나 이상을 지정하세요.")
+    from filegit_db import setup_repo, prune_history
+    from filegit_gc import collect_garbage, DEFAULT_GRACE_PERIOD
+    conn = setup_repo()
+    with conn:
+        deleted = prune_history(conn, None if all_files else filepath,
+                                before=int(before.timestamp() * 1_000_000) if before else None,
+                                keep_last=keep_last, keep_manual=keep_manual)
+    click.echo(f"🧹 버전 {deleted}개를 삭제했습니다. (각 파일의 최신 버전은 항상 남습니다)")
+    _report_gc(collect_garbage(conn, grace=get_option(load_config(), "gc.grace_period", DEFAULT_GRACE_PERIOD)))
+    conn.close()
+
+
+@cli.command(help="더 이상 어떤 버전도 가리키지 않는 객체를 지웁니다.")
+@click.option('--full', is_flag=True, help="저장소 전체를 훑어 예전에 남은 객체까지 찾습니다.")
+def gc(full):
+    from filegit_db import setup_repo
+    from filegit_gc import collect_garbage, queue_unreferenced, DEFAULT_GRACE_PERIOD
+    conn = setup_repo()
+    if full: click.echo(f"🔍 참조되지 않는 객체 {queue_unreferenced(conn)}개를 찾았습니다.")
+    _report_gc(collect_garbage(conn, grace=get_option(load_config(), "gc.grace_period", DEFAULT_GRACE_PERIOD)))
+    conn.close()
+
+
+FSCK_MAX_LISTED = 20
+
+
+@cli.command(help="모든 객체를 다시 해시해 빠졌거나 손상된 객체, 참조되지 않는 객체를 찾습니다.")
+@click.option('--workers', type=click.IntRange(1), help="병렬 프로세스 수 (기본값: CPU 수)")
+@click.option('-v', '--verbose', is_flag=True, help="참조되지 않는 객체의 해시도 모두 보여줌")
+def fsck(workers, verbose):
+    from filegit_db import setup_repo
+    from filegit_fsck import check_repository, DEFAULT_WORKERS
+    conn = setup_repo()
+    reported = 0
+
+    def progress(report):
+        nonlocal reported
+        if report['objects'] - reported < 10000: return
+        reported = report['objects']
+        click.echo(f"  ... 객체 {reported:,}개 확인됨", err=True)
 
-# --- 데몬 및 워치리스트 관리 명령어 ---
-def get_watchlist() -> set:
-    if not WATCHLIST_PATH.exists(): return set()
-    with open(WATCHLIST_PATH, 'r') as f:
+    try:
+        report = check_repository(conn, workers=workers or DEFAULT_WORKERS, progress=progress)
+        problems = report['missing'] + report['corrupt']
+        # 문제가 있는 객체를 가리키는 버전을 보여줘야 어떤 파일의 이력이 다쳤는지 알 수 있습니다.
+        owners = {object_hash: conn.execute("""
+                                            SELECT c.id, p.path
+                                            FROM commits c
+                                                     JOIN paths p ON p.id = c.path_id
+                                            WHERE c.object_hash = ?
+                                            ORDER BY c.id
+                                            LIMIT 3
+                                            """, (object_hash,)).fetchall()
+                  for kind in ('missing', 'corrupt') for object_hash, _ in report[kind][:FSCK_MAX_LISTED]}
+    finally:
+        conn.close()
+    seconds = max(report['seconds'], 1e-6)
+    click.echo(f"🔍 객체 {report['objects']:,}개, {report['bytes']:,} bytes를 {report['seconds']:.1f}초 동안 확인했습니다. "
+               f"({report['objects'] / seconds:,.0f} objects/s, {report['bytes'] / seconds / 1e6:,.1f} MB/s)")
+    for label, kind in (("빠진", 'missing'), ("손상된", 'corrupt')):
+        if not report[kind]: continue
+        click.echo(f"❌ {label} 객체 {len(report[kind])}개:")
+        for object_hash, detail in report[kind][:FSCK_MAX_LISTED]:
+            click.echo(f"   {object_hash}  {detail}")
+            for row in owners.get(object_hash, []): click.echo(f"      #{row['id']}  {row['path']}")
+        if len(report[kind]) > FSCK_MAX_LISTED: click.echo(f"   ... 외 {len(report[kind]) - FSCK_MAX_LISTED}개")
+    if report['dangling']:
+        click.echo(f"🗑️ 참조되지 않는 객체/청크 {len(report['dangling'])}개 ('filegit gc --full'로 정리할 수 있습니다)")
+        if verbose:
+            for object_hash in report['dangling']: click.echo(f"   {object_hash}")
+    if problems: raise SystemExit(1)
+    click.echo("✅ 빠졌거나 손상된 객체가 없습니다.")
+
+
+@cli.command(name="migrate-objects", help="예전의 평평한 배치로 남은 객체를 하위 디렉토리(objects/ab/...)로 옮깁니다.")
+def migrate_objects():
+    from filegit_store import migrate_layout
+    stats = migrate_layout()
+    moved = stats['objects'] + stats['chunks']
+    if not moved: click.echo("옮길 객체가 없습니다."); return
+    click.echo(f"📂 객체 {stats['objects']:,}개, 청크 {stats['chunks']:,}개를 하위 디렉토리로 옮겼습니다.")
+
+
+@cli.command(name="config", help="설정(config.json)을 보거나 바꿉니다.")
+@click.option('--list', 'list_options', is_flag=True, help="기본값을 포함한 현재 설정을 보여줍니다.")
+@click.option('--set', 'set_pair', nargs=2, metavar="KEY VALUE", help="예: --set auto_cleanup.enabled true")
+def config_command(list_options, set_pair):
+    if set_pair:
+        key, raw = set_pair
         try:
-            return set(json.load(f))
+            value = json.loads(raw)
         except json.JSONDecodeError:
-            return set()
+            value = raw
+        set_option(key, value)
+        click.echo(f"✅ {key} = {json.dumps(value, ensure_ascii=False)} (실행 중인 데몬은 재시작해야 반영됩니다)")
+    if list_options or not set_pair:
+        click.echo(json.dumps(load_config(), indent=2, ensure_ascii=False))
+
+
+@cli.command(help="기존 무압축 객체들을 제자리에서 압축합니다. (중단 후 다시 실행하면 이어서 진행)")
+@click.option('--codec', default="zlib", show_default=True, help="압축 코덱 이름")
+def compress(codec):
+    from filegit_store import compress_store, codec_by_name, CODECS
+    choices = [name for name, _, _ in CODECS.values() if name != "raw"]
+    if codec not in choices:
+        raise click.BadParameter(f"'{codec}' is not one of {', '.join(choices)}", param_hint="'--codec'")
+
+    def progress(stats):
+        if stats['objects'] % 100 == 0: click.echo(f"  ... {stats['objects']}개 압축됨")
+
+    stats = compress_store(codec_by_name(codec), progress=progress)
+    saved = stats['bytes_before'] - stats['bytes_after']
+    click.echo(f"🗜️ 객체 {stats['objects']}개를 압축했습니다. (이미 압축됨: {stats['skipped']}개)")
+    click.echo(f"   {stats['bytes_before']:,} bytes -> {stats['bytes_after']:,} bytes ({saved:,} bytes 절약)")
+
+
+@cli.command(name="snapshot-all", help="감시 중인 모든 파일(또는 PATTERN에 맞는 파일)의 스냅샷을 한 번에 만듭니다.")
+@click.argument('pattern', required=False)
+@click.option('-m', '--message', help="수동 커밋으로 기록하고 이 메시지를 붙임")
+@click.option('--workers', type=click.IntRange(1), help="병렬 작업 수 (기본값: CPU 수)")
+def snapshot_all(pattern, message, workers):
+    from filegit_bulk import snapshot_paths, DEFAULT_WORKERS
+    from filegit_config import capture_options
+    from filegit_db import setup_repo
+    paths = sorted(expand_entry(normalize_entry(pattern))) if pattern else expand_watchlist(load_watchlist())
+    if not paths: click.echo("스냅샷할 파일이 없습니다."); return
+    started = time.monotonic()
+    conn = setup_repo()
+    stats = snapshot_paths(conn, paths, capture_options(load_config()), workers=workers or DEFAULT_WORKERS,
+                           message=message)
+    conn.close()
+    click.echo(f"📸 파일 {stats['files']}개 중 {stats['created']}개의 새 버전을 기록했습니다. "
+               f"({stats['bytes']:,} bytes, {time.monotonic() - started:.1f}s)")
+    for path, error in stats['failed']: click.echo(f"   ⚠️ {path}: {error}", err=True)
+
+
+@cli.command(name="import", help="git 저장소나 날짜별 사본 디렉토리에서 파일의 이력을 가져옵니다.")
+@click.argument('filepath', type=click.Path(resolve_path=True))
+@click.option('--git', 'git_repo', type=click.Path(exists=True, file_okay=False, resolve_path=True),
+              help="이력을 가져올 git 저장소")
+@click.option('--git-path', help="저장소 안에서의 파일 경로 (기본값: FILEPATH의 저장소 기준 상대 경로)")
+@click.option('--copies', 'copies_dir', type=click.Path(exists=True, file_okay=False, resolve_path=True),
+              help="날짜별 사본이 든 디렉토리 (이름 속 날짜, 없으면 수정 시각 순)")
+@click.option('--pattern', default="*", show_default=True, help="--copies에서 가져올 파일 패턴")
+@click.option('--workers', type=click.IntRange(1), help="병렬 작업 수 (기본값: CPU 수)")
+def import_command(filepath, git_repo, git_path, copies_dir, pattern, workers):
+    if bool(git_repo) == bool(copies_dir): raise click.UsageError("--git이나 --copies 중 하나를 지정하세요.")
+    import subprocess
+    from filegit_bulk import (import_versions, iter_git_versions, iter_dated_copies, GitBlobReader,
+                              DEFAULT_WORKERS)
+    from filegit_config import capture_options
+    from filegit_db import setup_repo
+    conn = setup_repo()
+    options = capture_options(load_config())
+    try:
+        if git_repo:
+            if git_path is None:
+                try:
+                    git_path = str(Path(filepath).relative_to(git_repo))
+                except ValueError:
+                    raise click.UsageError("FILEPATH가 저장소 밖에 있습니다. --git-path로 저장소 안의 경로를 지정하세요.")
+            reader = GitBlobReader(Path(git_repo))
+            try:
+                stats = import_versions(conn, filepath, iter_git_versions(Path(git_repo), git_path, reader), options,
+                                        workers=workers or DEFAULT_WORKERS)
+            finally:
+                reader.close()
+        else:
+            stats = import_versions(conn, filepath, iter_dated_copies(Path(copies_dir), pattern), options,
+                                    workers=workers or DEFAULT_WORKERS)
+    except subprocess.CalledProcessError as e:
+        raise click.ClickException(f"git 이력을 읽을 수 없습니다: {e.stderr.strip()}")
+    finally:
+        conn.close()
+    if not stats['versions']: click.echo("가져올 버전이 없습니다."); return
+    click.echo(f"📥 버전 {stats['imported']}개를 가져왔습니다. (건너뜀 {stats['skipped']}개, 새 객체 {stats['objects']}개)")
+
+
+GREP_MAX_LINES = 5
+
+
+@cli.command(help="저장된 모든 버전에서 PATTERN을 찾습니다. (대소문자 구분 없음, 세 글자 이상)")
+@click.argument('pattern')
+@click.argument('filepath', required=False, type=click.Path(resolve_path=True))
+@click.option('-n', '--limit', default=50, show_default=True, type=click.IntRange(1), help="보여 줄 최대 커밋 수")
+@click.option('-l', '--list', 'list_only', is_flag=True, help="찾은 줄 없이 커밋만 보여줌")
+def grep(pattern, filepath, limit, list_only):
+    from filegit_db import setup_repo, format_timestamp
+    from filegit_search import index_pending, pending_count, search, matching_lines
+    conn = setup_repo()
+    try:
+        # 보통은 스냅샷 때 이미 색인되어 있고, 데몬 밖에서 생긴 버전만 여기서 색인합니다.
+        pending = pending_count(conn)
+        if pending >= 1000: click.echo(f"검색 색인을 만드는 중입니다... (객체 {pending:,}개)", err=True)
+        index_pending(conn)
+        hits = search(conn, pattern, filepath, limit=limit)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    finally:
+        conn.close()
+    if not hits: click.echo("찾는 내용이 든 버전이 없습니다."); return
+    lines = {}
+    for hit in hits:
+        marker = "(*)" if hit.commit_type == 'manual' else "(')"
+        click.echo(f"{hit.path}  #{hit.commit_id}  {format_timestamp(hit.timestamp)} {marker} {hit.message or ''}".rstrip())
+        if list_only: continue
+        # 여러 커밋이 같은 객체를 가리키면 한 번만 읽습니다.
+        if hit.object_hash not in lines: lines[hit.object_hash] = matching_lines(hit.object_hash, pattern, GREP_MAX_LINES)
+        for lineno, line in lines[hit.object_hash]: click.echo(f"    {lineno}: {line}")
+    if len(hits) == limit: click.echo("... 결과가 더 있을 수 있습니다. (--limit으로 늘릴 수 있음)")
+    click.echo("'filegit timeline <파일> --at <#번호>'로 그 버전을 열 수 있습니다.")
+
+
+@cli.command(help="파일의 줄마다 그 줄을 마지막으로 바꾼 커밋을 보여줍니다.")
+@click.argument('filepath', type=click.Path(resolve_path=True))
+@click.option('--at', 'commit_id', type=int, help="이 커밋 번호의 버전을 봄 (기본값: 가장 최근 버전)")
+def blame(filepath, commit_id):
+    from filegit_blame import blame as blame_file
+    from filegit_db import setup_repo, format_timestamp
+    conn = setup_repo()
+    try:
+        result = blame_file(conn, filepath, commit_id)
+    finally:
+        conn.close()
+    if result is None:
+        click.echo("기록된 버전이 없습니다." if commit_id is None else f"이 파일에는 #{commit_id} 커밋이 없습니다.")
+        return
+    width = len(str(len(result.lines)))
+    for lineno, (origin, line) in enumerate(zip(result.origins, result.lines), 1):
+        info = result.commits.get(origin)
+        label = f"#{origin:<6} {format_timestamp(info['timestamp'])}" if info else f"{'?':<7} {'':17}"
+        click.echo(f"{label} {lineno:>{width}}| {line}")
 
 
-def save_watchlist(watchlist: set):
-    with open(WATCHLIST_PATH, 'w') as f:
-        json.dump(list(watchlist), f, indent=2)
+# --- 데몬 및 워치리스트 관리 명령어 ---
+def get_watchlist() -> set:
+    return load_watchlist()
 
 
 @cli.command()
-@click.argument('filepath', type=click.Path(exists=True, resolve_path=True))
-def watch(filepath):
-    """파일을 자동 감시 목록에 추가합니다."""
-    abs_path = str(Path(filepath).resolve());
+@click.argument('target')
+def watch(target):
+    """파일, 디렉토리 또는 glob 패턴(예: '~/notes/*.md')을 자동 감시 목록에 추가합니다."""
+    entry = normalize_entry(target)
     FILEGIT_DIR.mkdir(exist_ok=True)
-    watchlist = get_watchlist()
-    if abs_path not in watchlist:
-        watchlist.add(abs_path);
-        save_watchlist(watchlist)
-        click.echo(f"✅ '{Path(filepath).name}'을(를) 감시 목록에 추가했습니다. 데몬을 재시작하세요.")
-    else:
-        click.echo(f"이미 감시 중인 파일입니다.")
+    try:
+        added = filegit_ipc.request("watch", entry=entry)["changed"]
+    except DaemonUnavailable:
+        watchlist = get_watchlist()
+        added = entry not in watchlist
+        if added:
+            watchlist.add(entry)
+            save_watchlist(watchlist)
+    if not added: click.echo("이미 감시 중인 항목입니다."); return
+    click.echo(f"✅ '{entry}'을(를) 감시 목록에 추가했습니다. 실행 중인 데몬에 자동으로 반영됩니다.")
+    if not is_glob(entry) and not Path(entry).exists():
+        click.echo("   아직 존재하지 않는 경로입니다. 파일이 생기면 감시를 시작합니다.")
 
 
 @cli.command()
-@click.argument('filepath', type=click.Path(resolve_path=True))
-def unwatch(filepath):
-    """파일을 자동 감시 목록에서 제거합니다."""
-    abs_path = str(Path(filepath).resolve());
-    watchlist = get_watchlist()
-    if abs_path in watchlist:
-        watchlist.remove(abs_path);
-        save_watchlist(watchlist)
-        click.echo(f"🗑️ '{Path(filepath).name}'을(를) 감시 목록에서 제거했습니다. 데몬을 재시작하세요.")
+@click.argument('target')
+def unwatch(target):
+    """파일, 디렉토리 또는 glob 패턴을 자동 감시 목록에서 제거합니다."""
+    entry = normalize_entry(target)
+    try:
+        removed = filegit_ipc.request("unwatch", entry=entry)["changed"]
+    except DaemonUnavailable:
+        watchlist = get_watchlist()
+        removed = entry in watchlist
+        if removed:
+            watchlist.remove(entry);
+            save_watchlist(watchlist)
+    if removed:
+        click.echo(f"🗑️ '{entry}'을(를) 감시 목록에서 제거했습니다. 실행 중인 데몬에 자동으로 반영됩니다.")
     else:
-        click.echo(f"감시 목록에 없는 파일입니다.")
+        click.echo("감시 목록에 없는 항목입니다.")
 
 
 @cli.command(name="watch-list")
@@ -343,6 +403,9 @@ def daemon_start():
         click.echo("데몬이 이미 실행 중인 것 같습니다. 먼저 'daemon-stop'을 실행하세요.");
         return
 
+    from daemon import DaemonContext
+    from daemon.pidfile import PIDLockFile
+
     # 로그 파일 스트림 열기
     log_file = open(LOG_FILE_PATH, 'w+')
 
@@ -355,7 +418,7 @@ def daemon_start():
         stderr=log_file,
     )
 
-    click.echo("데몬을 시작합니다... (로그: ~/.filegit/daemon.log)")
+    click.echo(f"데몬을 시작합니다... (로그: {LOG_FILE_PATH})")
     try:
         with daemon_context:
             # 데몬 프로세스 안에서 데몬 스크립트의 메인 함수를 실행
@@ -365,6 +428,31 @@ def daemon_start():
         click.echo(f"데몬 시작 실패: {e}", err=True)
 
 
+@cli.command(name="daemon-stats")
+@click.option('--prometheus', is_flag=True, help="Prometheus 텍스트 형식으로 출력")
+def daemon_stats(prometheus):
+    """데몬의 카운터와 구간별 지연 시간(p50/p95/p99)을 보여줍니다."""
+    try:
+        metrics = filegit_ipc.request("metrics", format="prometheus" if prometheus else "json")
+    except (DaemonUnavailable, DaemonError):
+        click.echo("🔴 데몬이 실행 중이지 않습니다."); return
+    if prometheus: click.echo(metrics, nl=False); return
+
+    click.echo("--- 카운터 ---")
+    for name, value in sorted(metrics['counters'].items()):
+        click.echo(f"{name:<28} {value:>16,.0f}")
+    counters = metrics['counters']
+    captured = counters.get('store.bytes_captured', 0)
+    if captured:
+        deduplicated = counters.get('store.bytes_deduplicated', 0)
+        click.echo(f"{'(dedup ratio)':<28} {deduplicated / captured:>16.1%}")
+    click.echo("\n--- 지연 시간 (ms) ---")
+    click.echo(f"{'':<24} {'count':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for name, h in sorted(metrics['histograms'].items()):
+        click.echo(f"{name:<24} {h['count']:>9,} {h['p50'] * 1000:>9.2f} {h['p95'] * 1000:>9.2f} "
+                   f"{h['p99'] * 1000:>9.2f} {h['max'] * 1000:>9.2f}")
+
+
 @cli.command(name="daemon-stop")
 def daemon_stop():
     """filegit 자동 감시 데몬을 종료합니다."""
@@ -389,9 +477,40 @@ def daemon_stop():
         click.echo(f"데몬 종료 중 오류 발생: {e}", err=True)
 
 
+def tail_lines(path: Path, count: int) -> list[str]:
+    """파일 끝에서부터 블록 단위로 읽어 마지막 count줄을 반환합니다. (로그 전체를 읽지 않음)"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        data = b""
+        while end > 0 and data.count(b"\n") <= count:
+            start = max(0, end - 8192)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+    return [line.decode('utf-8', errors='replace') for line in data.splitlines()[-count:]]
+
+
 @cli.command(name="daemon-status")
 def daemon_status():
     """데몬의 실행 상태와 로그를 보여줍니다."""
+    try:
+        status = filegit_ipc.request("status")
+        stats = filegit_ipc.request("stats")
+    except (DaemonUnavailable, DaemonError):
+        status = None
+    if status:
+        uptime = int(status['uptime'])
+        click.echo(f"🟢 데몬이 실행 중입니다. (PID: {status['pid']}, 실행 시간: "
+                   f"{uptime // 3600}h {uptime % 3600 // 60}m {uptime % 60}s)")
+        click.echo(f"   감시 항목 {status['entries']}개, 디렉토리 감시 {status['watches']}개, "
+                   f"대기 중인 스냅샷 {status['pending']}개")
+        scheduler, writer = stats['scheduler'], stats['writer']
+        click.echo(f"   스냅샷 {scheduler['snapshots']}회 (새 버전 {scheduler['created']}개, 오류 {scheduler['errors']}개), "
+                   f"DB 기록 대기 {writer['pending']}개")
+        return
+
+    # 제어 소켓에 연결할 수 없으면 PID 파일과 로그로 확인합니다.
     if not PID_FILE_PATH.exists():
         click.echo("🔴 데몬이 실행 중이지 않습니다.");
         return
@@ -404,24 +523,16 @@ def daemon_status():
 
         if LOG_FILE_PATH.exists():
             click.echo("\n--- 최신 로그 (daemon.log) ---")
-            with open(LOG_FILE_PATH, 'r') as log:
-                # 마지막 10줄만 보여주기
-                lines = log.readlines()
-                for line in lines[-10:]:
-                    click.echo(line.strip())
+            for line in tail_lines(LOG_FILE_PATH, 10): click.echo(line)
 
     except (OSError, ValueError):
         click.echo("🟡 데몬이 비정상적으로 종료된 것 같습니다. PID 파일을 정리하세요. ('daemon-stop' 실행)")
 
 
+def main():
+    """콘솔 스크립트(filegit) 진입점. 명령어들은 @cli.command로 이미 등록되어 있습니다."""
+    cli()
+
+
 if __name__ == '__main__':
-    # 메인 CLI에 모든 명령어 등록
-    cli.add_command(init)
-    cli.add_command(timeline)
-    cli.add_command(watch)
-    cli.add_command(unwatch)
-    cli.add_command(watch_list)
-    cli.add_command(daemon_start)
-    cli.add_command(daemon_stop)
-    cli.add_command(daemon_status)
-    cli()
\ No newline at end of file
+    main()
@@ -0,0 +1,118 @@
+# filegit_blame.py
+from __future__ import annotations
+
+import difflib
+import sqlite3
+import zlib
+from array import array
+from typing import NamedTuple
+
+from filegit_search import read_text
+
+
+class Blame(NamedTuple):
+    lines: list[str]
+    origins: list[int]              # 줄마다 그 줄을 들여온 커밋 ID
+    commits: dict[int, sqlite3.Row]  # origins에 나오는 커밋들의 (id, timestamp, type, message)
+
+
+def _encode(origins: list[int]) -> bytes:
+    return zlib.compress(array("q", origins).tobytes(), 1)
+
+
+def _decode(blob: bytes) -> list[int]:
+    origins = array("q")
+    origins.frombytes(zlib.decompress(blob))
+    return origins.tolist()
+
+
+def _read_lines(object_hash: str) -> list[str]:
+    # 바이너리이거나 너무 큰 버전은 빈 파일처럼 다룹니다. (그 다음 버전의 줄은 모두 새로 들어온 줄)
+    try:
+        text = read_text(object_hash)
+    except (OSError, ValueError, zlib.error):
+        text = None
+    return text.splitlines() if text is not None else []
+
+
+def _carry(prev_lines: list[str], prev_origins: list[int], lines: list[str], commit_id: int) -> list[int]:
+    """이전 버전의 주석을 새 버전으로 옮깁니다. 그대로 남은 줄은 출처를 물려받고, 나머지는 commit_id."""
+    # 스냅샷 사이의 변경은 보통 몇 줄이므로, 같은 앞뒤 부분을 먼저 떼고 가운데만 비교합니다.
+    head, limit = 0, min(len(prev_lines), len(lines))
+    while head < limit and prev_lines[head] == lines[head]: head += 1
+    tail = 0
+    while tail < limit - head and prev_lines[-1 - tail] == lines[-1 - tail]: tail += 1
+    origins = [commit_id] * len(lines)
+    origins[:head] = prev_origins[:head]
+    if tail: origins[len(lines) - tail:] = prev_origins[len(prev_lines) - tail:]
+    prev_mid, mid = prev_lines[head:len(prev_lines) - tail], lines[head:len(lines) - tail]
+    if prev_mid and mid:
+        matcher = difflib.SequenceMatcher(None, prev_mid, mid, autojunk=False)
+        for a, b, size in matcher.get_matching_blocks():
+            origins[head + b:head + b + size] = prev_origins[head + a:head + a + size]
+    return origins
+
+
+def blame(conn: sqlite3.Connection, file_path: str, commit_id: int | None = None) -> Blame | None:
+    """파일의 한 버전(기본값: 가장 최근)의 줄마다 그 줄을 들여온 커밋을 찾습니다.
+
+    주석은 커밋마다 blame_cache에 저장해 둡니다. 캐시가 있는 가장 가까운 이전 버전에서
+    시작해 이어지는 버전들과 한 번씩만 비교하므로, 이력이 길어도 처음 한 번을 빼면 새로
+    생긴 버전만 계산합니다. 그 버전이 없으면 None을 반환합니다.
+    """
+    path_row = conn.execute("SELECT id FROM paths WHERE path = ?", (file_path,)).fetchone()
+    if not path_row: return None
+    where, params = "", []
+    if commit_id is not None:
+        target = conn.execute("SELECT timestamp FROM commits WHERE id = ? AND path_id = ?",
+                              (commit_id, path_row[0])).fetchone()
+        if not target: return None
+        where, params = "AND (c.timestamp, c.id) <= (?, ?)", [target[0], commit_id]
+    # 최신에서 거꾸로, 주석이 캐시된 버전이 나올 때까지 읽습니다.
+    rows = conn.execute(f"""
+                        SELECT c.id, c.timestamp, c.object_hash, b.origins
+                        FROM commits c
+                                 LEFT JOIN blame_cache b ON b.commit_id = c.id
+                        WHERE c.path_id = ? {where}
+                        ORDER BY c.timestamp DESC, c.id DESC
+                        """, (path_row[0], *params))
+    steps = []
+    for row in rows:
+        steps.append(row)
+        if row['origins'] is not None: break
+    rows.close()
+    if not steps: return None
+    steps.reverse()
+
+    base = steps[0]
+    if base['origins'] is not None:
+        prev_hash, lines, origins = base['object_hash'], _read_lines(base['object_hash']), _decode(base['origins'])
+        steps = steps[1:]
+    else:
+        prev_hash, lines, origins = None, [], []
+    computed = []
+    for step in steps:
+        if step['object_hash'] != prev_hash:
+            new_lines = _read_lines(step['object_hash'])
+            origins = _carry(lines, origins, new_lines, step['id'])
+            lines, prev_hash = new_lines, step['object_hash']
+        computed.append((step['id'], path_row[0], step['timestamp'], _encode(origins)))
+    if computed:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO blame_cache (commit_id, path_id, timestamp, origins) "
+                             "VALUES (?, ?, ?, ?)", computed)
+    # 캐시된 주석의 줄 수가 내용과 다르면(객체가 바뀌었거나 읽을 수 없으면) 모자란 줄은 출처 없음(0)으로 둡니다.
+    origins = (origins + [0] * len(lines))[:len(lines)]
+    return Blame(lines, origins, commit_info(conn, set(origins)))
+
+
+def commit_info(conn: sqlite3.Connection, commit_ids) -> dict[int, sqlite3.Row]:
+    ids = [commit_id for commit_id in commit_ids if commit_id]
+    info = {}
+    # SQLite의 바인딩 변수 개수 제한을 넘지 않도록 나눠서 조회합니다.
+    for i in range(0, len(ids), 500):
+        part = ids[i:i + 500]
+        for row in conn.execute(f"SELECT id, timestamp, type, message FROM commits WHERE id IN "
+                                f"({', '.join('?' * len(part))})", part):
+            info[row['id']] = row
+    return info
@@ -0,0 +1,192 @@
+# filegit_bulk.py
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+from filegit_db import all_heads, insert_commit, get_path_id, now_timestamp
+from filegit_hashcache import refresh_file_hash, remember_file_hash
+from filegit_search import index_pending
+from filegit_store import capture_file, store_bytes, sync_pending
+
+# 해시와 압축(hashlib, zlib)은 GIL을 놓고 돌기 때문에 스레드만으로도 여러 코어를 씁니다.
+DEFAULT_WORKERS = os.cpu_count() or 4
+
+
+# --- 여러 파일 한 번에 스냅샷 ---
+def snapshot_paths(conn: sqlite3.Connection, paths: list[str], capture_opts: dict, workers: int = DEFAULT_WORKERS,
+                   message: str | None = None) -> dict:
+    """파일들을 병렬로 캡처하고, 바뀐 파일의 커밋을 하나의 트랜잭션으로 기록합니다.
+
+    해시 캐시의 stat이 그대로이고 헤드와 같은 파일은 읽지 않습니다. message가 있으면
+    수동 커밋으로 기록합니다. 새 버전은 검색 색인에도 넣습니다. 통계(files, created,
+    unchanged, bytes)와 실패한 파일 목록(failed: [(경로, 오류)])을 반환합니다.
+    """
+    heads = all_heads(conn)
+
+    def capture(path: str):
+        filepath = Path(path)
+        try:
+            cached = refresh_file_hash(filepath)
+            if cached and cached == heads.get(path): return None
+            captured = capture_file(filepath, **capture_opts)
+        except OSError as e:
+            return e
+        if captured and captured.stable:
+            remember_file_hash(filepath, captured.stat, captured.object_hash, captured.hashed_at_ns)
+        return captured
+
+    stats = {"files": len(paths), "created": 0, "unchanged": 0, "bytes": 0, "failed": []}
+    rows = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot-all") as pool:
+        for path, captured in zip(paths, pool.map(capture, paths)):
+            if isinstance(captured, OSError):
+                stats["failed"].append((path, str(captured)))
+            elif captured is None or captured.object_hash == heads.get(path):
+                stats["unchanged"] += 1
+            else:
+                rows.append((path, captured))
+                stats["bytes"] += captured.size
+
+    # 커밋이 가리킬 객체들을 먼저 디스크에 확정한 뒤 한 번에 기록합니다.
+    sync_pending()
+    with conn:
+        for path, captured in rows:
+            insert_commit(conn, path, captured.object_hash, now_timestamp(), 'manual' if message else 'auto',
+                          message, chunks=captured.chunks, size=captured.size)
+    stats["created"] = len(rows)
+    index_pending(conn)
+    return stats
+
+
+# --- 다른 곳의 이력 가져오기 ---
+class ImportedVersion(NamedTuple):
+    timestamp: int              # 마이크로초
+    message: str | None
+    commit_type: str
+    content: bytes | Path       # 내용 자체, 또는 그대로 캡처할 사본 파일의 경로
+
+
+def git_history(repo: Path, path: str) -> list[tuple[str, int, str, str]]:
+    """파일을 바꾼 커밋들을 오래된 순으로: (커밋, 커밋 시각(초), 제목, 그 커밋에서의 경로). 이름 변경도 따라갑니다."""
+    out = subprocess.run(["git", "-C", str(repo), "log", "--follow", "--format=%x00%H%x09%ct%x09%s", "--name-only",
+                          "--", path], capture_output=True, text=True, check=True).stdout
+    history = []
+    for record in out.split("\0")[1:]:
+        header, _, names = record.partition("\n")
+        commit, committed_at, subject = header.split("\t", 2)
+        names = [name for name in names.splitlines() if name]
+        # 파일 내용이 바뀌지 않은 병합 커밋은 경로가 비어 있습니다.
+        if names: history.append((commit, int(committed_at), subject, names[-1]))
+    history.reverse()
+    return history
+
+
+class GitBlobReader:
+    """`git cat-file --batch` 프로세스 하나로 "커밋:경로"의 내용을 차례로 읽습니다."""
+
+    def __init__(self, repo: Path):
+        self._proc = subprocess.Popen(["git", "-C", str(repo), "cat-file", "--batch"], stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE)
+
+    def read(self, commit: str, path: str) -> bytes | None:
+        self._proc.stdin.write(f"{commit}:{path}\n".encode())
+        self._proc.stdin.flush()
+        header = self._proc.stdout.readline().split()
+        if len(header) != 3 or header[1] != b"blob": return None   # 삭제된 파일 등 ("... missing")
+        data = self._proc.stdout.read(int(header[2]))
+        self._proc.stdout.read(1)
+        return data
+
+    def close(self):
+        self._proc.stdin.close()
+        self._proc.wait()
+
+
+def iter_git_versions(repo: Path, path: str, reader: GitBlobReader):
+    for commit, committed_at, subject, path_at_commit in git_history(repo, path):
+        data = reader.read(commit, path_at_commit)
+        if data is None: continue
+        # 내용은 여기(한 스레드)서 순서대로 읽고, 해시와 압축, 쓰기만 병렬로 돌립니다.
+        yield ImportedVersion(committed_at * 1_000_000, subject, 'manual', data)
+
+
+# 파일 이름 안의 날짜: 2024-07-12, 20240712, 2024-07-12_153000, 2024-07-12T15-30-00 ...
+_DATE_IN_NAME = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})(?:[T _.-]?(\d{2})[:.-]?(\d{2})(?:[:.-]?(\d{2}))?)?")
+
+
+def copy_timestamp(path: Path) -> int:
+    """사본의 시각: 파일 이름에 날짜가 있으면 그 날짜, 없으면 수정 시각."""
+    match = _DATE_IN_NAME.search(path.name)
+    if match:
+        try:
+            return int(datetime(*(int(part or 0) for part in match.groups())).timestamp() * 1_000_000)
+        except ValueError:
+            pass
+    return path.stat().st_mtime_ns // 1000
+
+
+def iter_dated_copies(directory: Path, pattern: str = "*") -> list[ImportedVersion]:
+    copies = [p for p in directory.glob(pattern) if p.is_file() and not p.name.startswith(".")]
+    versions = [ImportedVersion(copy_timestamp(p), f"imported from {p.name}", 'auto', p) for p in copies]
+    return sorted(versions, key=lambda version: version.timestamp)
+
+
+def import_versions(conn: sqlite3.Connection, file_path: str, versions, capture_opts: dict,
+                    workers: int = DEFAULT_WORKERS) -> dict:
+    """버전들을 객체로 저장하고 file_path의 커밋으로 기록합니다.
+
+    객체 쓰기는 workers개의 스레드에서 병렬로 하되, 메모리에 올라가는 내용이 너무
+    많아지지 않도록 동시에 진행 중인 작업 수를 제한합니다. 이미 같은 시각에 같은
+    내용으로 기록된 버전과, 바로 앞 버전과 내용이 같은 버전은 건너뜁니다. 커밋은 모두
+    저장한 뒤 하나의 트랜잭션으로 기록합니다.
+    """
+    path_id = get_path_id(conn, file_path)
+    existing = set()
+    if path_id is not None:
+        existing = {(row[0], row[1]) for row in
+                    conn.execute("SELECT object_hash, timestamp FROM commits WHERE path_id = ?", (path_id,))}
+
+    def store(version: ImportedVersion):
+        if isinstance(version.content, Path):
+            captured = capture_file(version.content, **capture_opts)
+            if captured is None: raise FileNotFoundError(version.content)
+            return captured.object_hash, captured.stored, captured.chunks, captured.size
+        return *store_bytes(version.content, **capture_opts), len(version.content)
+
+    stats = {"versions": 0, "imported": 0, "skipped": 0, "objects": 0}
+    rows, prev_hash = [], None
+
+    def collect(version: ImportedVersion, future):
+        nonlocal prev_hash
+        object_hash, stored, chunks, size = future.result()
+        stats["versions"] += 1
+        stats["objects"] += stored
+        if (object_hash, version.timestamp) in existing or object_hash == prev_hash:
+            stats["skipped"] += 1
+        else:
+            rows.append((version, object_hash, chunks, size))
+        prev_hash = object_hash
+
+    inflight: deque = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import") as pool:
+        for version in versions:
+            inflight.append((version, pool.submit(store, version)))
+            if len(inflight) >= workers * 2: collect(*inflight.popleft())
+        while inflight: collect(*inflight.popleft())
+
+    sync_pending()
+    with conn:
+        for version, object_hash, chunks, size in rows:
+            insert_commit(conn, file_path, object_hash, version.timestamp, version.commit_type, version.message,
+                          chunks=chunks, size=size)
+    stats["imported"] = len(rows)
+    index_pending(conn)
+    return stats
@@ -0,0 +1,125 @@
+# filegit_config.py
+from __future__ import annotations
+
+import copy
+import json
+import os
+from pathlib import Path
+
+# --- 설정 (메인 스크립트 및 데몬과 공유) ---
+FILEGIT_DIR = Path(os.environ.get("FILEGIT_DIR") or Path.home() / ".filegit")
+CONFIG_PATH = FILEGIT_DIR / "config.json"
+
+DEFAULT_CONFIG = {
+    "daemon": {
+        # 스냅샷 워커 스레드 수
+        "workers": 4,
+        # 같은 파일의 이벤트를 하나로 합치는 조용한 구간(초)
+        "quiet_window": 0.3,
+        # 파일별 스냅샷 최소 간격(초)과 분당 최대 스냅샷 수 (0: 제한 없음)
+        "min_interval": 0,
+        "max_per_minute": 0,
+        # 패턴별 제한 덮어쓰기. 예: {"*.log": {"min_interval": 60, "max_per_minute": 1}}
+        "rate_limits": {},
+        # 시작 시 따라잡기 검사(데몬이 꺼져 있던 동안의 변경 찾기)에 쓰는 스레드 수
+        "catchup_workers": 8,
+    },
+    "watch": {
+        # 디렉토리/glob 항목 아래에서 기록하지 않을 파일 이름 패턴 (직접 추가한 파일에는 적용하지 않음)
+        # 편집기의 스왑/백업/잠금 파일(vim은 쓰기 권한을 4913이라는 파일로 확인함)과, filegit 자신의
+        # .*.tmp를 포함한 원자적 저장의 임시 파일
+        "ignore": ["*.swp", "*.swx", "*~", "4913", ".#*", "*.tmp"],
+    },
+    "store": {
+        # 객체 fsync 정책: none / batched (DB 커밋 직전에 모아서) / always (객체마다)
+        "fsync": "batched",
+        # 이 크기(바이트) 이상인 파일은 내용 기반 청크로 나눠 저장합니다. (0: 사용 안 함)
+        "chunk_threshold": 64 * 1024 * 1024,
+    },
+    "gc": {
+        # 데몬이 GC 후보를 확인하는 주기(초), 한 번에 처리하는 후보 수, 배치 사이 쉬는 시간(초)
+        "interval": 60,
+        "batch_size": 256,
+        "pause": 0.1,
+        # 이 시간(초) 안에 쓰인 객체는 지우지 않습니다.
+        "grace_period": 600,
+    },
+    "auto_cleanup": {
+        # 켜면 데몬이 interval초마다 rules를 모든 파일에 적용합니다.
+        # 규칙 예: {"pattern": "*.log", "keep_last": 20}, {"older_than_days": 90, "keep_manual": true}
+        "enabled": False,
+        "interval": 3600,
+        "rules": [],
+    },
+    "metrics": {
+        # 스냅샷 하나가 이 시간(초) 이상 걸리면 구간별 소요 시간을 로그에 남깁니다. (0: 끔)
+        "trace_threshold": 0,
+        # 지정하면 dump_interval초마다 Prometheus 텍스트 형식으로 메트릭을 이 파일에 씁니다.
+        "prometheus_file": "",
+        "dump_interval": 15,
+    },
+    "log": {
+        # daemon.log가 이 크기(바이트)를 넘으면 daemon.log.1, .2 ...로 돌리고 backups개까지 보관합니다.
+        "max_bytes": 10 * 1024 * 1024,
+        "backups": 3,
+    },
+    "db": {
+        # 그룹 커밋: 이만큼 모이거나 이 시간(초)이 지나면 한 트랜잭션으로 기록
+        "batch_size": 64,
+        "flush_interval": 0.2,
+    },
+}
+
+
+def _merge(base: dict, override: dict) -> dict:
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def load_config() -> dict:
+    """기본값 위에 config.json의 내용을 덮어쓴 설정을 반환합니다."""
+    return _merge(copy.deepcopy(DEFAULT_CONFIG), load_user_config())
+
+
+def load_user_config() -> dict:
+    """기본값을 합치지 않은 config.json 내용 그대로."""
+    try:
+        with open(CONFIG_PATH, 'r') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return {}
+
+
+def set_option(dotted_key: str, value):
+    """config.json의 점 표기 키 하나를 바꿔 저장합니다. (기본값은 파일에 쓰지 않음)"""
+    config = load_user_config()
+    node = config
+    *parents, last = dotted_key.split('.')
+    for part in parents:
+        if not isinstance(node.get(part), dict): node[part] = {}
+        node = node[part]
+    node[last] = value
+    CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = CONFIG_PATH.with_name(f".{CONFIG_PATH.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(config, f, indent=2)
+    os.replace(tmp_path, CONFIG_PATH)
+
+
+def get_option(config: dict, dotted_key: str, default=None):
+    """'daemon.quiet_window' 같은 점 표기 키로 설정 값을 꺼냅니다."""
+    node = config
+    for part in dotted_key.split('.'):
+        if not isinstance(node, dict) or part not in node: return default
+        node = node[part]
+    return node
+
+
+def capture_options(config: dict) -> dict:
+    """store 설정을 capture_file()의 키워드 인자로 바꿉니다."""
+    return {"fsync": get_option(config, "store.fsync", "batched"),
+            "chunk_threshold": get_option(config, "store.chunk_threshold", 0)}
@@ -1,150 +1,725 @@
 # filegit_daemon.py
 from __future__ import annotations
 
+import os
 import time
-import json
+import errno
+import heapq
+import sqlite3
+import sys
+import fnmatch
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import sqlite3
-import shutil
-import hashlib
 from datetime import datetime
 
+from filegit_hashcache import get_file_hash, get_hash_cache, refresh_file_hash, remember_file_hash
+from filegit_store import capture_file, sync_pending, migrate_layout, FSYNC_BATCHED
+from filegit_config import load_config, get_option, capture_options, FILEGIT_DIR
+from filegit_watchlist import (WATCHLIST_PATH, load_watchlist, save_watchlist, expand_watchlist, is_glob, glob_base,
+                               is_internal)
+from filegit_db import connect, ensure_schema, now_timestamp, all_heads, fill_commit_sizes, CommitWriter
+from filegit_gc import collect_garbage, apply_retention
+from filegit_search import index_pending
+from filegit_ipc import ControlServer
+from filegit_metrics import METRICS
+
 # --- 설정 및 헬퍼 (메인 스크립트와 공유) ---
-FILEGIT_DIR = Path.home() / ".filegit"
 OBJECTS_DIR = FILEGIT_DIR / "objects"
 DB_PATH = FILEGIT_DIR / "index.db"
-WATCHLIST_PATH = FILEGIT_DIR / "watchlist.json"
+LOG_FILE_PATH = FILEGIT_DIR / "daemon.log"
+
+# 감시 목록 파일 변경 알림을 놓쳤을 때를 대비한 주기적 확인 간격(초)
+WATCHLIST_POLL_INTERVAL = 5
 
 
-def get_file_hash(filepath: Path) -> str | None:
-    if not filepath.exists(): return None
-    hasher = hashlib.sha256()
-    with open(filepath, "rb") as f:
-        while chunk := f.read(8192): hasher.update(chunk)
-    return hasher.hexdigest()
+def create_auto_snapshot(filepath_str: str, writer: CommitWriter, capture_opts: dict | None = None,
+                         trace_threshold: float = 0) -> bool:
+    """파일 변경 시 자동 스냅샷을 생성합니다. 새 버전을 기록했으면 True를 반환합니다.
 
+    trace_threshold초 이상 걸린 스냅샷은 구간별(해시, 객체 쓰기 등) 소요 시간을 로그에 남깁니다.
+    """
+    started = time.perf_counter()
+    with METRICS.trace() as spans:
+        created = _create_auto_snapshot(filepath_str, writer, capture_opts)
+    elapsed = time.perf_counter() - started
+    METRICS.observe("snapshot.total", elapsed)
+    METRICS.inc("snapshots.created" if created else "snapshots.unchanged")
+    if trace_threshold and elapsed >= trace_threshold:
+        phases: dict[str, float] = {}
+        for name, seconds in spans: phases[name] = phases.get(name, 0) + seconds
+        detail = ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in phases.items())
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Slow snapshot {filepath_str}: "
+              f"{elapsed * 1000:.1f}ms ({detail})")
+    return created
 
-def create_auto_snapshot(filepath_str: str, conn):
-    """파일 변경 시 자동 스냅샷을 생성합니다."""
+
+def _create_auto_snapshot(filepath_str: str, writer: CommitWriter, capture_opts: dict | None) -> bool:
     filepath = Path(filepath_str)
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT object_hash FROM commits WHERE file_path = ? ORDER BY timestamp DESC LIMIT 1",
-        (filepath_str,)
-    )
-    last_hash_row = cursor.fetchone()
-    last_hash = last_hash_row[0] if last_hash_row else None
-
-    current_hash = get_file_hash(filepath)
-
-    if current_hash and current_hash != last_hash:
-        # 객체 저장소에 파일 복사
-        if not OBJECTS_DIR.exists(): OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
-        shutil.copy(filepath, OBJECTS_DIR / current_hash)
-
-        # DB에 기록
-        with conn:
-            conn.execute(
-                "INSERT INTO commits (file_path, object_hash, timestamp, type) VALUES (?, ?, ?, 'auto')",
-                (filepath_str, current_hash, datetime.now().isoformat())
-            )
+    with METRICS.timer("snapshot.head_lookup"):
+        last_hash = writer.head_hash(filepath_str)
+
+    # stat이 해시 캐시와 같으면 파일을 읽지 않고 건너뜁니다. (racy로 남은 기록은 한 번 다시 확인)
+    with METRICS.timer("snapshot.stat_check"):
+        cached_hash = refresh_file_hash(filepath)
+    if cached_hash and cached_hash == last_hash: return False
+
+    # 파일을 한 번만 읽으며 해시를 구하고 객체로 저장합니다. (이미 있는 객체는 쓰지 않음)
+    captured = capture_file(filepath, **(capture_opts or {"fsync": FSYNC_BATCHED}))
+    if captured is None: return False
+    if captured.stable: remember_file_hash(filepath, captured.stat, captured.object_hash, captured.hashed_at_ns)
+    current_hash = captured.object_hash
+
+    if current_hash != last_hash:
+        # DB 기록은 그룹 커밋 작성기에 맡깁니다.
+        writer.add(filepath_str, current_hash, now_timestamp(), chunks=captured.chunks, size=captured.size)
         # 로그 파일에 기록하기 위해 print 사용
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Snapshot for {filepath_str}: {current_hash[:7]}")
+        return True
+    return False
+
+
+# --- 스냅샷 스케줄러 ---
+class RateLimit:
+    """파일 하나에 적용되는 스냅샷 빈도 제한."""
+
+    def __init__(self, min_interval: float = 0, max_per_minute: int = 0):
+        self.min_interval = min_interval
+        self.max_per_minute = max_per_minute
+
+
+class SnapshotScheduler:
+    """파일별 이벤트를 조용한 구간 동안 모았다가 워커 풀에서 스냅샷을 만듭니다.
+
+    같은 파일에 대한 스냅샷은 동시에 하나만 실행되며, 실행 중에 들어온 이벤트는
+    끝난 뒤 한 번 더 처리됩니다. 빈도 제한에 걸린 이벤트는 버리지 않고 허용되는
+    시각까지 미뤄서, 마지막 상태는 항상 기록되도록 합니다.
+    """
+
+    def __init__(self, snapshot_fn, workers: int = 4, quiet_window: float = 0.3,
+                 default_limit: RateLimit | None = None, pattern_limits: dict | None = None):
+        self.snapshot_fn = snapshot_fn
+        self.quiet_window = quiet_window
+        self.default_limit = default_limit or RateLimit()
+        self.pattern_limits = pattern_limits or {}
+        self._cond = threading.Condition()
+        self._due: dict[str, float] = {}        # 경로 -> 실행 예정 시각 (monotonic)
+        self._heap: list[tuple[float, str]] = []
+        self._running: set[str] = set()
+        self._rerun: set[str] = set()
+        self._queued_at: dict[str, float] = {}  # 경로 -> 처음 이벤트가 들어온 시각 (대기 시간 측정용)
+        self._history: dict[str, deque] = {}    # 경로 -> 최근 스냅샷 시각
+        self._stopped = False
+        self.counters = {"submitted": 0, "snapshots": 0, "created": 0, "errors": 0}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot")
+        self._thread = threading.Thread(target=self._dispatch_loop, name="snapshot-dispatch", daemon=True)
+
+    @classmethod
+    def from_config(cls, snapshot_fn, config: dict) -> SnapshotScheduler:
+        def limit(options: dict) -> RateLimit:
+            return RateLimit(options.get("min_interval", 0) or 0, options.get("max_per_minute", 0) or 0)
+
+        return cls(snapshot_fn,
+                   workers=get_option(config, "daemon.workers", 4),
+                   quiet_window=get_option(config, "daemon.quiet_window", 0.3),
+                   default_limit=limit(get_option(config, "daemon", {})),
+                   pattern_limits={pattern: limit(options) for pattern, options in
+                                   get_option(config, "daemon.rate_limits", {}).items()})
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+        self._pool.shutdown(wait=True)
+
+    def limit_for(self, path: str) -> RateLimit:
+        for pattern, limit in self.pattern_limits.items():
+            if fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(Path(path).name, pattern): return limit
+        return self.default_limit
+
+    def submit(self, path: str):
+        """파일 변경 이벤트를 등록합니다. 옵저버 스레드에서 호출되므로 곧바로 반환합니다."""
+        with self._cond:
+            self.counters["submitted"] += 1
+            if path in self._running:
+                self._rerun.add(path)
+                return
+            self._schedule(path, time.monotonic() + self.quiet_window)
+
+    def _schedule(self, path: str, when: float):
+        self._queued_at.setdefault(path, time.monotonic())
+        when = self._allowed_at(path, when)
+        self._due[path] = when
+        heapq.heappush(self._heap, (when, path))
+        self._cond.notify()
+
+    def _allowed_at(self, path: str, when: float) -> float:
+        limit = self.limit_for(path)
+        history = self._history.get(path)
+        if not history: return when
+        if limit.min_interval: when = max(when, history[-1] + limit.min_interval)
+        if limit.max_per_minute:
+            while history and history[0] < when - 60: history.popleft()
+            if len(history) >= limit.max_per_minute: when = max(when, history[-limit.max_per_minute] + 60)
+        return when
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = time.monotonic()
+                    # 더 늦게 다시 예약된 항목은 힙에 남은 옛 기록이므로 건너뜁니다.
+                    while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                        heapq.heappop(self._heap)
+                    if self._heap and self._heap[0][0] <= now: break
+                    self._cond.wait(timeout=(self._heap[0][0] - now) if self._heap else None)
+                if self._stopped: return
+                _, path = heapq.heappop(self._heap)
+                del self._due[path]
+                self._running.add(path)
+            self._pool.submit(self._run, path)
+
+    def run_now(self, path: str) -> bool:
+        """조용한 구간과 빈도 제한 없이 지금 바로 스냅샷을 만들고 끝날 때까지 기다립니다.
+
+        같은 파일의 스냅샷이 실행 중이면 끝나기를 기다린 뒤 실행하고, 예약되어 있던 것은 취소합니다.
+        """
+        with self._cond:
+            while path in self._running: self._cond.wait()
+            self._due.pop(path, None)
+            self._running.add(path)
+        return self._run(path)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self.counters, "pending": len(self._due), "running": len(self._running)}
+
+    def _run(self, path: str) -> bool:
+        created = False
+        with self._cond: queued_at = self._queued_at.pop(path, None)
+        # 조용한 구간과 빈도 제한으로 미뤄진 시간을 포함합니다.
+        if queued_at is not None: METRICS.observe("scheduler.queue_wait", time.monotonic() - queued_at)
+        try:
+            created = self.snapshot_fn(path)
+        except Exception as e:
+            print(f"Error creating snapshot for {path}: {e}")
+            with self._cond: self.counters["errors"] += 1
+        finally:
+            with self._cond:
+                self.counters["snapshots"] += 1
+                self.counters["created"] += bool(created)
+                self._running.discard(path)
+                self._cond.notify_all()
+                if created:
+                    history = self._history.setdefault(path, deque())
+                    history.append(time.monotonic())
+                    limit = self.limit_for(path)
+                    while len(history) > max(limit.max_per_minute, 1): history.popleft()
+                if path in self._rerun:
+                    self._rerun.discard(path)
+                    self._schedule(path, time.monotonic() + self.quiet_window)
+        return created
+
+
+# --- 감시 목록 관리 ---
+class WatchMatcher:
+    """감시 목록 항목(파일/디렉토리/glob)을 분류해 두고, 이벤트 경로가 감시 대상인지 판정합니다.
+
+    ignore는 파일 이름 패턴 목록으로, 디렉토리와 glob 항목에 걸린 파일에만 적용됩니다.
+    """
+
+    def __init__(self, entries, ignore=()):
+        self.files: set[str] = set()
+        self.dirs: set[str] = set()
+        self.globs: list[str] = []
+        self.ignore = tuple(ignore)
+        for entry in entries:
+            if is_glob(entry):
+                self.globs.append(entry)
+            elif os.path.isdir(entry):
+                self.dirs.add(entry)
+            else:
+                self.files.add(entry)
+
+    def matches(self, path: str) -> bool:
+        if path in self.files: return True
+        if is_internal(path): return False
+        if self.ignored(path): return False
+        if self.dirs:
+            parent = os.path.dirname(path)
+            while True:
+                if parent in self.dirs: return True
+                next_parent = os.path.dirname(parent)
+                if next_parent == parent: break
+                parent = next_parent
+        return any(fnmatch.fnmatch(path, pattern) for pattern in self.globs)
+
+    def ignored(self, path: str) -> bool:
+        name = os.path.basename(path)
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.ignore)
+
+
+def _ancestors(path: str):
+    parent = os.path.dirname(path)
+    while parent != path:
+        yield parent
+        path, parent = parent, os.path.dirname(parent)
+
+
+def _existing_ancestor(path: str) -> str:
+    while not os.path.isdir(path):
+        parent = os.path.dirname(path)
+        if parent == path: break
+        path = parent
+    return path
+
+
+class WatchManager:
+    """감시 목록이 바뀔 때 옵저버의 디렉토리 감시를 필요한 만큼만 추가/제거합니다.
+
+    감시는 파일이 아니라 디렉토리 단위로 걸리므로, 같은 디렉토리의 파일 여러 개는
+    감시 하나를 공유합니다. 아직 존재하지 않는 디렉토리는 가장 가까운 상위 디렉토리를
+    대신 감시하다가, 디렉토리가 생기면 다시 계산합니다.
+    """
+
+    def __init__(self, observer, handler, ignore=()):
+        self.observer = observer
+        self.handler = handler
+        self.ignore = tuple(ignore)
+        self.entries: frozenset = frozenset()
+        self.matcher = WatchMatcher((), self.ignore)
+        self.watches: dict[tuple[str, bool], object] = {}
+        self.has_pending = False
+        self.refresh_requested = threading.Event()
+
+    def _desired_watches(self, entries) -> tuple[set[tuple[str, bool]], bool]:
+        wanted: dict[str, bool] = {}
+        pending = False
+        for entry in entries:
+            if is_glob(entry):
+                directory = glob_base(entry)
+                recursive = "**" in entry or is_glob(os.path.dirname(entry))
+            elif os.path.isdir(entry):
+                directory, recursive = entry, True
+            else:
+                directory, recursive = os.path.dirname(entry), False
+            existing = _existing_ancestor(directory)
+            if existing != directory:
+                directory, recursive, pending = existing, False, True
+            wanted[directory] = wanted.get(directory, False) or recursive
+
+        # 재귀 감시 아래에 있는 디렉토리는 따로 감시하지 않습니다.
+        recursive_dirs = {d for d, r in wanted.items() if r}
+        desired = {(directory, recursive) for directory, recursive in wanted.items()
+                   if not any(ancestor in recursive_dirs for ancestor in _ancestors(directory))}
+        return desired, pending
+
+    def apply(self, entries):
+        """감시 목록을 적용합니다. 옵저버 조작은 메인 스레드에서만 호출해야 합니다."""
+        entries = frozenset(entries)
+        desired, self.has_pending = self._desired_watches(entries)
+        changed = entries != self.entries or desired != set(self.watches)
+        self.entries = entries
+        self.matcher = WatchMatcher(entries, self.ignore)
+        if not changed: return
+
+        for key in set(self.watches) - desired:
+            try:
+                self.observer.unschedule(self.watches.pop(key))
+            except (KeyError, OSError):
+                pass
+        failures, limit_error = 0, None
+        for key in sorted(desired - set(self.watches)):
+            directory, recursive = key
+            try:
+                self.watches[key] = self.observer.schedule(self.handler, directory, recursive=recursive)
+            except OSError as e:
+                failures += 1
+                if e.errno in (errno.ENOSPC, errno.EMFILE):
+                    limit_error = e
+                else:
+                    print(f"Warning: cannot watch {directory}: {e}")
+        if limit_error is not None:
+            setting = "max_user_watches" if limit_error.errno == errno.ENOSPC else "max_user_instances"
+            print(f"Error: inotify limit reached, {failures} director(ies) are NOT watched ({limit_error}). "
+                  f"Raise it with: sudo sysctl fs.inotify.{setting}=524288")
+        print(f"Watching {len(entries)} entr(ies) with {len(self.watches)} directory watch(es)"
+              + (" (some paths do not exist yet)" if self.has_pending else ""))
+
+    @property
+    def watched_dirs(self) -> set[str]:
+        return {directory for directory, _ in self.watches}
 
 
 # --- Watchdog 이벤트 핸들러 ---
 class WatcherEventHandler(FileSystemEventHandler):
-    def __init__(self, watchlist: set):
+    """감시 대상 파일의 이벤트를 스케줄러에 넘기기만 합니다. (옵저버 스레드를 막지 않음)"""
+
+    def __init__(self, scheduler: SnapshotScheduler):
         super().__init__()
-        self.watchlist = watchlist
-        self.conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        self.scheduler = scheduler
+        self.manager: WatchManager | None = None
+
+    def _dispatch_path(self, path: str):
+        with METRICS.timer("event.dispatch"):
+            METRICS.inc("events.received")
+            filepath_str = str(Path(path).resolve())
+            if self.manager.matcher.matches(filepath_str):
+                METRICS.inc("events.matched")
+                self.scheduler.submit(filepath_str)
+
+    def _directory_changed(self, path: str, removed: bool):
+        # 기다리던 디렉토리가 생겼거나, 감시 중인 디렉토리가 사라졌으면 감시를 다시 계산합니다.
+        if self.manager.has_pending or (removed and path in self.manager.watched_dirs):
+            self.manager.refresh_requested.set()
 
     def on_modified(self, event):
-        if not event.is_directory:
-            filepath_str = str(Path(event.src_path).resolve())
-            if filepath_str in self.watchlist:
-                try:
-                    # 파일 쓰기가 완료될 시간을 벌어주기 위한 약간의 지연
-                    time.sleep(0.1)
-                    create_auto_snapshot(filepath_str, self.conn)
-                except Exception as e:
-                    print(f"Error creating snapshot for {filepath_str}: {e}")
+        if not event.is_directory: self._dispatch_path(event.src_path)
+
+    def on_created(self, event):
+        if event.is_directory:
+            self._directory_changed(event.src_path, removed=False)
+        else:
+            self._dispatch_path(event.src_path)
+
+    def on_deleted(self, event):
+        if event.is_directory: self._directory_changed(event.src_path, removed=True)
+
+    def on_moved(self, event):
+        if event.is_directory:
+            self._directory_changed(event.src_path, removed=True)
+            self._directory_changed(event.dest_path, removed=False)
+        else:
+            # 임시 파일에 쓴 뒤 이름을 바꿔 저장하는 편집기 대응
+            self._dispatch_path(event.dest_path)
+
+
+class WatchlistEventHandler(FileSystemEventHandler):
+    """watchlist.json이 바뀌면 메인 루프에 다시 읽으라고 알립니다."""
+
+    def __init__(self, reload_requested: threading.Event):
+        super().__init__()
+        self.reload_requested = reload_requested
+
+    def on_any_event(self, event):
+        paths = (getattr(event, "src_path", None), getattr(event, "dest_path", None))
+        if str(WATCHLIST_PATH) in paths: self.reload_requested.set()
+
+
+# --- 시작 시 따라잡기 검사 ---
+def catch_up(entries, scheduler: SnapshotScheduler, workers: int = 8, ignore=()):
+    """데몬이 꺼져 있던 동안 바뀐 파일을 찾아 스냅샷 대기열에 넣습니다.
+
+    별도 스레드에서 실행되며, 실제 스냅샷은 실시간 이벤트와 같은 스케줄러가 만듭니다.
+    해시는 공유 해시 캐시를 거치므로 바뀌지 않은 파일은 stat만 확인합니다.
+    """
+    started = time.monotonic()
+    matcher = WatchMatcher(entries, ignore)
+    paths = [path for path in expand_watchlist(entries) if path in matcher.files or not matcher.ignored(path)]
+    conn = connect(DB_PATH)
+    heads = all_heads(conn)
+    conn.close()
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Catch-up scan: checking {len(paths)} file(s) "
+          f"with {workers} worker(s).")
+
+    def changed(path: str) -> bool:
+        try:
+            current_hash = get_file_hash(Path(path))
+        except OSError as e:
+            print(f"Catch-up: cannot read {path}: {e}")
+            return False
+        return bool(current_hash) and current_hash != heads.get(path)
+
+    changed_count = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="catch-up") as pool:
+        for done, (path, is_changed) in enumerate(zip(paths, pool.map(changed, paths)), 1):
+            if is_changed:
+                scheduler.submit(path)
+                changed_count += 1
+            if done % 1000 == 0:
+                print(f"Catch-up: {done}/{len(paths)} checked, {changed_count} changed "
+                      f"({time.monotonic() - started:.1f}s)")
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Catch-up scan done: {changed_count} of {len(paths)} "
+          f"file(s) changed while the daemon was stopped ({time.monotonic() - started:.2f}s).")
+
+
+def maintenance(config: dict, stop: threading.Event):
+    """보존 규칙(auto_cleanup)을 주기적으로 적용하고, GC 후보를 작은 배치로 나눠 정리합니다.
+    예전의 평평한 배치로 남은 객체도 같은 방식으로 조금씩 하위 디렉토리로 옮기고, 크기를 모르는
+    예전 커밋의 크기를 채웁니다.
+
+    배치마다 짧은 트랜잭션 하나만 쓰고 배치 사이에 쉬므로 스냅샷 기록을 오래 막지 않습니다.
+    """
+    interval = get_option(config, "gc.interval", 60)
+    batch_size = get_option(config, "gc.batch_size", 256)
+    pause = get_option(config, "gc.pause", 0.1)
+    grace = get_option(config, "gc.grace_period", 600)
+    cleanup_enabled = get_option(config, "auto_cleanup.enabled", False)
+    cleanup_interval = get_option(config, "auto_cleanup.interval", 3600)
+    rules = get_option(config, "auto_cleanup.rules", [])
+    next_cleanup = time.monotonic()
+    # 크기 채우기는 커서를 이어 가며 한 바퀴만 돕니다. (읽을 수 없는 객체를 주기마다 다시 읽지 않도록)
+    size_cursor = ""
+    conn = connect(DB_PATH)
+    try:
+        while not stop.wait(interval):
+            try:
+                if cleanup_enabled and rules and time.monotonic() >= next_cleanup:
+                    next_cleanup = time.monotonic() + cleanup_interval
+                    deleted = apply_retention(conn, rules)
+                    if deleted:
+                        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Auto cleanup removed {deleted} "
+                              f"commit(s).")
+                moved = 0
+                while not stop.is_set():
+                    stats = migrate_layout(limit=batch_size)
+                    if not stats["objects"] + stats["chunks"]: break
+                    moved += stats["objects"] + stats["chunks"]
+                    stop.wait(pause)
+                if moved:
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Moved {moved} object(s) to the sharded "
+                          f"layout.")
+                filled = 0
+                while size_cursor is not None and not stop.is_set():
+                    count, size_cursor = fill_commit_sizes(conn, batch_size=batch_size, max_batches=1,
+                                                           after=size_cursor)
+                    filled += count
+                    stop.wait(pause)
+                if filled:
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Recorded sizes of {filled} older "
+                          f"object(s).")
+                reclaimed, removed = 0, 0
+                cycle_started = now_timestamp() + 1
+                while not stop.is_set():
+                    stats = collect_garbage(conn, batch_size=batch_size, grace=grace, max_batches=1,
+                                            queued_before=cycle_started)
+                    if not stats["processed"]: break
+                    reclaimed += stats["bytes"]
+                    removed += stats["objects"] + stats["chunks"]
+                    stop.wait(pause)
+                if removed:
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] GC removed {removed} object(s), "
+                          f"reclaimed {reclaimed:,} bytes.")
+            except (sqlite3.Error, OSError) as e:
+                print(f"Maintenance failed, will retry: {e}")
+    finally:
+        conn.close()
+
+
+def search_indexer(wake: threading.Event, stop: threading.Event):
+    """커밋이 기록될 때마다 깨어나 새 객체를 검색 색인에 넣습니다.
+
+    커밋 작성기 스레드가 객체를 다시 읽느라 다음 배치를 늦추지 않도록 따로 돕니다.
+    """
+    conn = connect(DB_PATH)
+    try:
+        while True:
+            wake.wait()
+            if stop.is_set(): break
+            wake.clear()
+            try:
+                with METRICS.timer("search.index"):
+                    indexed = index_pending(conn)
+                METRICS.inc("search.indexed", indexed)
+            except sqlite3.Error as e:
+                print(f"Search indexing failed, will retry: {e}")
+    finally:
+        conn.close()
+
+
+# --- 제어 소켓 ---
+class DaemonControl:
+    """제어 소켓(filegit_ipc)으로 들어온 요청을 처리합니다. 각 메서드가 op 하나입니다."""
+
+    def __init__(self, writer: CommitWriter, scheduler: SnapshotScheduler, manager: WatchManager):
+        self.writer = writer
+        self.scheduler = scheduler
+        self.manager = manager
+        self.started_at = time.time()
+        self._watchlist_lock = threading.Lock()
+
+    def handlers(self) -> dict:
+        return {"status": self.status, "head": self.head, "snapshot": self.snapshot, "watch": self.watch,
+                "unwatch": self.unwatch, "flush": self.flush, "stats": self.stats, "metrics": self.metrics}
+
+    def status(self) -> dict:
+        return {"pid": os.getpid(), "started_at": self.started_at, "uptime": time.time() - self.started_at,
+                "entries": len(self.manager.entries), "watches": len(self.manager.watches),
+                "pending": self.scheduler.stats()["pending"]}
+
+    def head(self, path: str) -> dict:
+        """커밋 대기 중인 행까지 반영한 헤드 해시와, 해시 캐시에 있는 현재 파일 해시.
+
+        큰 파일을 읽느라 제어 소켓이 막히지 않도록 stat만 보고(racy 기록의 재확인은 스냅샷에
+        맡김), 캐시에 없으면 current는 None입니다. 그때는 클라이언트가 직접 해시합니다.
+        """
+        try:
+            current = get_hash_cache().lookup(path, os.stat(path))
+        except (OSError, sqlite3.Error):
+            current = None
+        return {"head": self.writer.head_hash(path), "current": current}
+
+    def snapshot(self, path: str) -> dict:
+        created = self.scheduler.run_now(path)
+        self.writer.flush(timeout=10)
+        return {"created": created, "head": self.writer.head_hash(path)}
+
+    def _update_watchlist(self, entry: str, add: bool) -> bool:
+        # 파일만 바꾸면 메인 루프가 변경을 감지해 감시에 반영합니다. (옵저버는 메인 스레드에서만 조작)
+        with self._watchlist_lock:
+            watchlist = load_watchlist()
+            if (entry in watchlist) == add: return False
+            if add:
+                watchlist.add(entry)
+            else:
+                watchlist.discard(entry)
+            save_watchlist(watchlist)
+        self.manager.refresh_requested.set()
+        return True
+
+    def watch(self, entry: str) -> dict:
+        return {"changed": self._update_watchlist(entry, add=True)}
+
+    def unwatch(self, entry: str) -> dict:
+        return {"changed": self._update_watchlist(entry, add=False)}
+
+    def flush(self, timeout: float = 10) -> dict:
+        return {"flushed": self.writer.flush(timeout=timeout)}
+
+    def stats(self) -> dict:
+        return {"scheduler": self.scheduler.stats(), "writer": self.writer.stats()}
+
+    def metrics(self, format: str = "json"):
+        return METRICS.to_prometheus() if format == "prometheus" else METRICS.snapshot()
+
+
+# --- 로그 회전과 메트릭 파일 ---
+def rotate_log(max_bytes: int, backups: int):
+    """daemon.log가 max_bytes를 넘으면 번호를 붙여 밀어내고 새 파일로 바꿉니다.
+
+    데몬의 stdout/stderr가 로그 파일을 가리킬 때만 동작하며, 새 파일을 같은 파일 디스크립터에
+    dup2하므로 print()를 쓰는 코드는 그대로 새 파일에 기록됩니다.
+    """
+    if not max_bytes: return
+    try:
+        st = LOG_FILE_PATH.stat()
+        if st.st_size < max_bytes or not os.path.samestat(os.fstat(1), st): return
+    except OSError:
+        return
+    sys.stdout.flush()
+    sys.stderr.flush()
+    for i in range(backups - 1, 0, -1):
+        older = LOG_FILE_PATH.with_name(f"{LOG_FILE_PATH.name}.{i}")
+        if older.exists(): os.replace(older, LOG_FILE_PATH.with_name(f"{LOG_FILE_PATH.name}.{i + 1}"))
+    if backups:
+        os.replace(LOG_FILE_PATH, LOG_FILE_PATH.with_name(f"{LOG_FILE_PATH.name}.1"))
+    else:
+        LOG_FILE_PATH.unlink()
+    fd = os.open(LOG_FILE_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.dup2(fd, 1)
+        os.dup2(fd, 2)
+    finally:
+        os.close(fd)
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Log rotated.")
+
+
+def dump_metrics(path: Path, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            METRICS.dump_prometheus(path)
+        except OSError as e:
+            print(f"Cannot write metrics to {path}: {e}")
 
 
 # --- 데몬 메인 함수 ---
 def run_daemon():
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] FileGit Daemon starting...")
 
-    if not WATCHLIST_PATH.exists():
-        WATCHLIST_PATH.write_text("[]")
-
-    try:
-        with open(WATCHLIST_PATH, 'r') as f:
-            watchlist_files = set(json.load(f))
-    except (json.JSONDecodeError, FileNotFoundError):
-        watchlist_files = set()
+    # 데몬이 시작될 때 필요한 디렉토리와 DB 스키마가 최신 상태가 되도록 보장
+    OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    conn = connect(DB_PATH)
+    ensure_schema(conn, DB_PATH)
+    conn.close()
 
-    print(f"Watching {len(watchlist_files)} file(s).")
+    if not WATCHLIST_PATH.exists():
+        save_watchlist(set())
 
-    event_handler = WatcherEventHandler(watchlist_files)
+    config = load_config()
+    capture_opts = capture_options(config)
+    stop_maintenance = threading.Event()
+    index_wanted = threading.Event()
+    index_wanted.set()  # 데몬 밖에서 생긴 버전도 시작할 때 한 번 색인합니다.
+    writer = CommitWriter(DB_PATH, batch_size=get_option(config, "db.batch_size", 64),
+                          flush_interval=get_option(config, "db.flush_interval", 0.2),
+                          before_commit=sync_pending, after_commit=lambda batch: index_wanted.set())
+    threading.Thread(target=search_indexer, name="search-index", daemon=True,
+                     args=(index_wanted, stop_maintenance)).start()
+    trace_threshold = get_option(config, "metrics.trace_threshold", 0)
+    scheduler = SnapshotScheduler.from_config(
+        lambda path: create_auto_snapshot(path, writer, capture_opts, trace_threshold), config)
+    scheduler.start()
+    event_handler = WatcherEventHandler(scheduler)
     observer = Observer()
+    manager = WatchManager(observer, event_handler, get_option(config, "watch.ignore", []))
+    event_handler.manager = manager
+    manager.apply(load_watchlist())
+    # 감시 목록 파일 자체도 감시해서, watch/unwatch가 데몬 재시작 없이 반영되게 합니다.
+    observer.schedule(WatchlistEventHandler(manager.refresh_requested), str(FILEGIT_DIR), recursive=False)
 
-    watch_dirs = {str(Path(p).parent) for p in watchlist_files}
-    for path in watch_dirs:
-        if Path(path).exists():
-            observer.schedule(event_handler, path, recursive=False)
-        else:
-            print(f"Warning: Directory not found, cannot watch: {path}")
+    def watchlist_mtime():
+        try:
+            return WATCHLIST_PATH.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
 
+    last_mtime = watchlist_mtime()
+    control = ControlServer(DaemonControl(writer, scheduler, manager).handlers())
     observer.start()
+    # 옵저버를 먼저 시작해야 검사 도중의 변경도 놓치지 않고, 검사가 실시간 이벤트를 늦추지 않습니다.
+    threading.Thread(target=catch_up, name="catch-up", daemon=True,
+                     args=(manager.entries, scheduler, get_option(config, "daemon.catchup_workers", 8),
+                           manager.ignore)).start()
+    threading.Thread(target=maintenance, name="maintenance", daemon=True, args=(config, stop_maintenance)).start()
+    if prometheus_file := get_option(config, "metrics.prometheus_file", ""):
+        threading.Thread(target=dump_metrics, name="metrics", daemon=True,
+                         args=(Path(prometheus_file).expanduser(), get_option(config, "metrics.dump_interval", 15),
+                               stop_maintenance)).start()
+    log_max_bytes = get_option(config, "log.max_bytes", 0)
+    log_backups = get_option(config, "log.backups", 3)
     try:
+        control.start()
         while True:
-            # TODO: 워치리스트 파일 변경 감지 및 옵저버 리로드 기능 추가 가능
-            time.sleep(5)
+            requested = manager.refresh_requested.wait(timeout=WATCHLIST_POLL_INTERVAL)
+            manager.refresh_requested.clear()
+            mtime = watchlist_mtime()
+            if mtime != last_mtime:
+                last_mtime = mtime
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Watchlist changed, reloading.")
+                manager.apply(load_watchlist())
+            elif requested:
+                manager.apply(manager.entries)
+            rotate_log(log_max_bytes, log_backups)
     except Exception as e:
         print(f"Daemon stopped due to an error: {e}")
+    finally:
+        control.stop()
+        stop_maintenance.set()
+        index_wanted.set()
         observer.stop()
+        observer.join()
+        scheduler.stop()
+        writer.close()
 
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] FileGit Daemon stopped.")
-    observer.join()
 
 
 if __name__ == "__main__":
-    # 데몬이 시작될 때 필요한 디렉토리와 DB 테이블이 생성되도록 보장
-    if not DB_PATH.exists():
-        conn = sqlite3.connect(DB_PATH)
-        with conn:
-            conn.execute("""
-                         CREATE TABLE IF NOT EXISTS commits
-                         (
-                             id
-                             INTEGER
-                             PRIMARY
-                             KEY
-                             AUTOINCREMENT,
-                             file_path
-                             TEXT
-                             NOT
-                             NULL,
-                             object_hash
-                             TEXT
-                             NOT
-                             NULL,
-                             message
-                             TEXT,
-                             timestamp
-                             TEXT
-                             NOT
-                             NULL,
-                             type
-                             TEXT
-                             NOT
-                             NULL
-                             DEFAULT
-                             'auto'
-                         );
-                         """)
-        conn.close()
-    run_daemon()
\ No newline at end of file
+    run_daemon()
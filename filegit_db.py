@@ -0,0 +1,653 @@
+# filegit_db.py
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+from filegit_config import FILEGIT_DIR
+from filegit_metrics import METRICS
+from filegit_store import manifest_chunks, object_size, OBJECTS_DIR
+
+# --- 설정 (메인 스크립트 및 데몬과 공유) ---
+DB_PATH = FILEGIT_DIR / "index.db"
+
+BUSY_TIMEOUT_MS = 5000
+
+
+def connect(db_path: Path = DB_PATH, check_same_thread: bool = True) -> sqlite3.Connection:
+    """WAL 모드와 busy timeout이 설정된 연결을 엽니다.
+
+    WAL에서는 읽기와 쓰기가 서로를 막지 않으므로, 대시보드가 열려 있어도
+    데몬의 기록이 "database is locked"로 실패하지 않습니다.
+    """
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    # WAL에서는 NORMAL이어도 커밋이 손상되지 않으며, 체크포인트 때만 fsync합니다.
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+# --- 스키마 마이그레이션 ---
+def _iso_to_timestamp(ts_iso: str) -> int:
+    return int(datetime.fromisoformat(ts_iso).timestamp() * 1_000_000)
+
+
+def _migrate_v1(conn: sqlite3.Connection):
+    """최초 스키마: 경로와 ISO 문자열 시각을 그대로 저장하는 commits 테이블."""
+    conn.execute("""
+                 CREATE TABLE IF NOT EXISTS commits
+                 (
+                     id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                     file_path   TEXT NOT NULL,
+                     object_hash TEXT NOT NULL,
+                     message     TEXT,
+                     timestamp   TEXT NOT NULL,
+                     type        TEXT NOT NULL DEFAULT 'auto'
+                 )
+                 """)
+
+
+def _migrate_v2(conn: sqlite3.Connection):
+    """경로를 paths 테이블로 분리하고, 시각을 정수(마이크로초)로 바꾸고, 헤드 조회용 인덱스를 추가합니다."""
+    conn.create_function("iso_to_timestamp", 1, _iso_to_timestamp)
+    conn.execute("""
+                 CREATE TABLE paths
+                 (
+                     id   INTEGER PRIMARY KEY,
+                     path TEXT NOT NULL UNIQUE
+                 )
+                 """)
+    conn.execute("""
+                 CREATE TABLE commits_v2
+                 (
+                     id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                     path_id     INTEGER NOT NULL REFERENCES paths (id),
+                     object_hash TEXT    NOT NULL,
+                     message     TEXT,
+                     timestamp   INTEGER NOT NULL,
+                     type        TEXT    NOT NULL DEFAULT 'auto'
+                 )
+                 """)
+    conn.execute("INSERT INTO paths (path) SELECT DISTINCT file_path FROM commits ORDER BY file_path")
+    conn.execute("""
+                 INSERT INTO commits_v2 (id, path_id, object_hash, message, timestamp, type)
+                 SELECT c.id, p.id, c.object_hash, c.message, iso_to_timestamp(c.timestamp), c.type
+                 FROM commits c JOIN paths p ON p.path = c.file_path
+                 """)
+    conn.execute("DROP TABLE commits")
+    conn.execute("ALTER TABLE commits_v2 RENAME TO commits")
+    conn.execute("CREATE INDEX commits_path_time ON commits (path_id, timestamp)")
+
+
+def _migrate_v3(conn: sqlite3.Connection):
+    """GC를 위한 테이블을 추가합니다.
+
+    커밋 행이 지워지면 트리거가 그 객체를 gc_candidates에 넣고, GC는 후보만 조금씩
+    확인해서 더 이상 참조되지 않는 객체를 지웁니다. 청크 객체가 쓰는 청크는
+    chunk_refs에 기록해 두어, 청크도 참조가 모두 사라졌을 때만 지웁니다.
+    """
+    conn.execute("CREATE INDEX commits_object ON commits (object_hash)")
+    conn.execute("""
+                 CREATE TABLE gc_candidates
+                 (
+                     object_hash TEXT PRIMARY KEY,
+                     queued_at   INTEGER NOT NULL,
+                     packed      INTEGER NOT NULL DEFAULT 0
+                 ) WITHOUT ROWID
+                 """)
+    conn.execute("CREATE INDEX gc_candidates_queue ON gc_candidates (packed, queued_at)")
+    conn.execute("""
+                 CREATE TRIGGER commits_gc_queue
+                     AFTER DELETE
+                     ON commits
+                 BEGIN
+                     INSERT OR IGNORE INTO gc_candidates (object_hash, queued_at)
+                     VALUES (OLD.object_hash, CAST(strftime('%s', 'now') AS INTEGER) * 1000000);
+                 END
+                 """)
+    conn.execute("""
+                 CREATE TABLE chunk_refs
+                 (
+                     object_hash TEXT NOT NULL,
+                     chunk_hash  TEXT NOT NULL,
+                     PRIMARY KEY (object_hash, chunk_hash)
+                 ) WITHOUT ROWID
+                 """)
+    conn.execute("CREATE INDEX chunk_refs_chunk ON chunk_refs (chunk_hash)")
+    conn.execute("""
+                 CREATE TABLE gc_chunks
+                 (
+                     chunk_hash TEXT PRIMARY KEY,
+                     queued_at  INTEGER NOT NULL
+                 ) WITHOUT ROWID
+                 """)
+    # 이미 저장된 청크 객체의 청크 참조를 채웁니다.
+    for (object_hash,) in conn.execute("SELECT DISTINCT object_hash FROM commits").fetchall():
+        conn.executemany("INSERT OR IGNORE INTO chunk_refs (object_hash, chunk_hash) VALUES (?, ?)",
+                         ((object_hash, chunk_hash) for chunk_hash in manifest_chunks(object_hash)))
+
+
+def _migrate_v4(conn: sqlite3.Connection):
+    """전문 검색 색인을 추가합니다.
+
+    객체 하나는 한 번만 색인합니다. 커밋 행이 추가되면 트리거가 처음 보는 객체를
+    search_objects에 대기(state 0)로 넣고, filegit_search.index_pending()이 내용을 읽어
+    search_text(FTS5, rowid = search_objects.id)에 넣습니다. 내용은 객체 저장소에 이미
+    있으므로 색인만 저장하는(contentless) 테이블을 씁니다.
+    """
+    conn.execute("""
+                 CREATE TABLE search_objects
+                 (
+                     id          INTEGER PRIMARY KEY,
+                     object_hash TEXT    NOT NULL UNIQUE,
+                     state       INTEGER NOT NULL DEFAULT 0
+                 )
+                 """)
+    conn.execute("CREATE INDEX search_objects_pending ON search_objects (id) WHERE state = 0")
+    try:
+        # trigram은 부분 문자열 검색이 되지만 SQLite 3.34 이상에서만 쓸 수 있습니다.
+        conn.execute("CREATE VIRTUAL TABLE search_text USING fts5(content, content='', tokenize='trigram')")
+    except sqlite3.OperationalError:
+        conn.execute("CREATE VIRTUAL TABLE search_text USING fts5(content, content='')")
+    conn.execute("""
+                 CREATE TRIGGER commits_search_queue
+                     AFTER INSERT
+                     ON commits
+                 BEGIN
+                     INSERT OR IGNORE INTO search_objects (object_hash) VALUES (NEW.object_hash);
+                 END
+                 """)
+    # 이미 있는 객체는 대기로 넣어 두고, 내용은 처음 검색할 때(또는 데몬이) 색인합니다.
+    conn.execute("""
+                 INSERT INTO search_objects (object_hash)
+                 SELECT object_hash FROM commits GROUP BY object_hash ORDER BY MIN(id)
+                 """)
+
+
+def _migrate_v5(conn: sqlite3.Connection):
+    """blame 주석 캐시를 추가합니다.
+
+    커밋마다 줄별 출처 커밋 ID 배열을 저장해 두고(filegit_blame), 다음 버전은 이전 버전의
+    주석에서 이어서 계산합니다. 커밋이 이력 중간에 끼어들거나 지워지면 그 뒤 버전들의
+    주석이 달라지므로 트리거가 그 파일의 이후 캐시를 지웁니다. 캐시를 (path_id, timestamp)로도
+    색인해 두어, 한꺼번에 많이 지울 때도 이미 비워진 범위만 다시 봅니다.
+    """
+    conn.execute("""
+                 CREATE TABLE blame_cache
+                 (
+                     commit_id INTEGER PRIMARY KEY,
+                     path_id   INTEGER NOT NULL,
+                     timestamp INTEGER NOT NULL,
+                     origins   BLOB    NOT NULL
+                 )
+                 """)
+    conn.execute("CREATE INDEX blame_cache_path_time ON blame_cache (path_id, timestamp, commit_id)")
+    conn.execute("""
+                 CREATE TRIGGER commits_blame_insert
+                     AFTER INSERT
+                     ON commits
+                 BEGIN
+                     DELETE FROM blame_cache
+                     WHERE path_id = NEW.path_id AND (timestamp, commit_id) > (NEW.timestamp, NEW.id);
+                 END
+                 """)
+    conn.execute("""
+                 CREATE TRIGGER commits_blame_delete
+                     AFTER DELETE
+                     ON commits
+                 BEGIN
+                     DELETE FROM blame_cache
+                     WHERE path_id = OLD.path_id AND (timestamp, commit_id) >= (OLD.timestamp, OLD.id);
+                 END
+                 """)
+
+
+def _migrate_v6(conn: sqlite3.Connection):
+    """저장소 전체 대시보드를 위한 요약 테이블을 추가합니다.
+
+    파일마다 버전 수, 버전 크기의 합(logical_bytes, 압축·청크 중복 제거·델타 전의 논리 크기),
+    마지막 변경을 path_stats에 미리 모아 두고, 커밋 행이 추가되거나 지워질 때 트리거가
+    고칩니다. 대시보드는 commits를 GROUP BY로 훑지 않고 이 테이블만 읽습니다. 버전 크기는
+    commits.size에 기록하며, 이미 있는 커밋은 크기를 모르는 상태(NULL, unsized로 셈)로
+    두었다가 fill_commit_sizes()가 조금씩 채웁니다. 여러 파일의
+    최근 커밋을 시간순으로 합쳐 읽을 수 있도록 timestamp 인덱스도 추가합니다.
+    """
+    conn.execute("ALTER TABLE commits ADD COLUMN size INTEGER")
+    conn.execute("CREATE INDEX commits_time ON commits (timestamp)")
+    conn.execute("CREATE INDEX commits_unsized ON commits (object_hash) WHERE size IS NULL")
+    conn.execute("""
+                 CREATE TABLE path_stats
+                 (
+                     path_id        INTEGER PRIMARY KEY,
+                     versions       INTEGER NOT NULL,
+                     logical_bytes  INTEGER NOT NULL,
+                     unsized        INTEGER NOT NULL,
+                     last_timestamp INTEGER NOT NULL,
+                     last_commit_id INTEGER NOT NULL
+                 )
+                 """)
+    conn.execute("""
+                 CREATE TRIGGER commits_stats_insert
+                     AFTER INSERT
+                     ON commits
+                 BEGIN
+                     INSERT INTO path_stats (path_id, versions, logical_bytes, unsized, last_timestamp, last_commit_id)
+                     VALUES (NEW.path_id, 1, coalesce(NEW.size, 0), NEW.size IS NULL, NEW.timestamp, NEW.id)
+                     ON CONFLICT (path_id) DO UPDATE
+                         SET versions       = versions + 1,
+                             logical_bytes  = logical_bytes + excluded.logical_bytes,
+                             unsized        = unsized + excluded.unsized,
+                             last_commit_id = CASE
+                                                  WHEN (excluded.last_timestamp, excluded.last_commit_id)
+                                                      > (last_timestamp, last_commit_id)
+                                                      THEN excluded.last_commit_id
+                                                  ELSE last_commit_id END,
+                             last_timestamp = max(last_timestamp, excluded.last_timestamp);
+                 END
+                 """)
+    # 마지막 버전이 지워졌을 때만 남은 버전 중 가장 최근 것을 (path_id, timestamp) 인덱스로 찾습니다.
+    conn.execute("""
+                 CREATE TRIGGER commits_stats_delete
+                     AFTER DELETE
+                     ON commits
+                 BEGIN
+                     UPDATE path_stats
+                     SET versions      = versions - 1,
+                         logical_bytes = logical_bytes - coalesce(OLD.size, 0),
+                         unsized       = unsized - (OLD.size IS NULL)
+                     WHERE path_id = OLD.path_id;
+                     UPDATE path_stats
+                     SET (last_timestamp, last_commit_id) = (SELECT c.timestamp, c.id
+                                                             FROM commits c
+                                                             WHERE c.path_id = OLD.path_id
+                                                             ORDER BY c.timestamp DESC, c.id DESC
+                                                             LIMIT 1)
+                     WHERE path_id = OLD.path_id AND last_commit_id = OLD.id AND versions > 0;
+                     DELETE FROM path_stats WHERE path_id = OLD.path_id AND versions = 0;
+                 END
+                 """)
+    conn.execute("""
+                 CREATE TRIGGER commits_stats_size
+                     AFTER UPDATE OF size
+                     ON commits
+                 BEGIN
+                     UPDATE path_stats
+                     SET logical_bytes = logical_bytes + coalesce(NEW.size, 0) - coalesce(OLD.size, 0),
+                         unsized       = unsized + (NEW.size IS NULL) - (OLD.size IS NULL)
+                     WHERE path_id = NEW.path_id;
+                 END
+                 """)
+    # 이미 있는 커밋으로 한 번만 채웁니다.
+    conn.execute("""
+                 INSERT INTO path_stats (path_id, versions, logical_bytes, unsized, last_timestamp, last_commit_id)
+                 SELECT path_id, COUNT(*), 0, COUNT(*), MAX(timestamp), 0
+                 FROM commits
+                 GROUP BY path_id
+                 """)
+    conn.execute("""
+                 UPDATE path_stats
+                 SET last_commit_id = (SELECT c.id
+                                       FROM commits c
+                                       WHERE c.path_id = path_stats.path_id
+                                       ORDER BY c.timestamp DESC, c.id DESC
+                                       LIMIT 1)
+                 """)
+
+
+MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4, _migrate_v5, _migrate_v6]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def ensure_schema(conn: sqlite3.Connection, db_path: Path = DB_PATH):
+    """index.db를 최신 스키마로 올립니다.
+
+    버전은 PRAGMA user_version에 기록하며, 각 마이그레이션은 BEGIN IMMEDIATE
+    트랜잭션 안에서 실행되어 실패하면 통째로 되돌려집니다. 기존 데이터가 있는
+    DB를 올리기 전에는 index.db.v<버전>.bak 백업을 남깁니다.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"index.db schema v{version} is newer than this filegit (v{SCHEMA_VERSION})")
+    if version == SCHEMA_VERSION: return
+
+    has_data = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'commits'").fetchone()
+    if has_data and db_path and Path(db_path).exists():
+        backup_path = Path(f"{db_path}.v{version}.bak")
+        if not backup_path.exists():
+            backup = sqlite3.connect(backup_path)
+            conn.backup(backup)
+            backup.close()
+
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 다른 프로세스가 먼저 올렸을 수 있으므로 잠금을 잡은 뒤 다시 확인합니다.
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= target:
+                    conn.execute("ROLLBACK")
+                    continue
+                MIGRATIONS[target - 1](conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.isolation_level = isolation_level
+
+
+# --- 조회/기록 헬퍼 ---
+def setup_repo() -> sqlite3.Connection:
+    """객체 디렉토리를 만들고, 스키마가 최신인 DB 연결을 엽니다."""
+    OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    conn = connect(DB_PATH)
+    ensure_schema(conn, DB_PATH)
+    return conn
+
+
+def now_timestamp() -> int:
+    """커밋 시각 (epoch 기준 마이크로초)."""
+    return time.time_ns() // 1000
+
+
+def format_timestamp(ts: int) -> str:
+    return datetime.fromtimestamp(ts / 1_000_000).strftime('%y-%m-%d %H:%M:%S')
+
+
+def get_path_id(conn: sqlite3.Connection, file_path: str, create: bool = False) -> int | None:
+    row = conn.execute("SELECT id FROM paths WHERE path = ?", (file_path,)).fetchone()
+    if row: return row[0]
+    if not create: return None
+    return conn.execute("INSERT INTO paths (path) VALUES (?)", (file_path,)).lastrowid
+
+
+def head_hash(conn: sqlite3.Connection, file_path: str) -> str | None:
+    """파일의 가장 최근 커밋 해시. (path_id, timestamp) 인덱스만 읽습니다."""
+    row = conn.execute("""
+                       SELECT c.object_hash
+                       FROM commits c
+                       WHERE c.path_id = (SELECT id FROM paths WHERE path = ?)
+                       ORDER BY c.timestamp DESC, c.id DESC
+                       LIMIT 1
+                       """, (file_path,)).fetchone()
+    return row[0] if row else None
+
+
+def all_heads(conn: sqlite3.Connection) -> dict[str, str]:
+    """모든 파일의 가장 최근 커밋 해시를 한 번의 쿼리로 가져옵니다."""
+    rows = conn.execute("""
+                        SELECT p.path,
+                               (SELECT c.object_hash
+                                FROM commits c
+                                WHERE c.path_id = p.id
+                                ORDER BY c.timestamp DESC, c.id DESC
+                                LIMIT 1) AS object_hash
+                        FROM paths p
+                        """)
+    return {row['path']: row['object_hash'] for row in rows if row['object_hash']}
+
+
+def insert_commit(conn: sqlite3.Connection, file_path: str, object_hash: str, timestamp: int,
+                  commit_type: str = 'auto', message: str | None = None, chunks=(), size: int | None = None) -> int:
+    """커밋 행을 추가합니다. 청크 객체면 chunks에 청크 해시들을 넘겨 GC가 참조를 알 수 있게 합니다.
+
+    size는 버전(내용)의 크기로, 파일별 요약(path_stats)에 더해집니다.
+    """
+    path_id = get_path_id(conn, file_path, create=True)
+    if chunks:
+        conn.executemany("INSERT OR IGNORE INTO chunk_refs (object_hash, chunk_hash) VALUES (?, ?)",
+                         ((object_hash, chunk_hash) for chunk_hash in chunks))
+    return conn.execute("INSERT INTO commits (path_id, object_hash, message, timestamp, type, size) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (path_id, object_hash, message, timestamp, commit_type, size)).lastrowid
+
+
+def history_page(conn: sqlite3.Connection, file_path: str, before: tuple[int, int] | None = None,
+                 after: tuple[int, int] | None = None, limit: int = 200) -> list[sqlite3.Row]:
+    """파일 이력의 한 페이지를 (timestamp, id) 키셋으로 가져옵니다.
+
+    before를 주면 그보다 오래된 커밋을 최신순으로, after를 주면 그보다 새로운
+    커밋을 오래된 순으로 반환합니다. 둘 다 없으면 가장 최신 커밋부터 시작합니다.
+    """
+    where, params, order = "", [], "DESC"
+    if before is not None:
+        where, params = "AND (c.timestamp, c.id) < (?, ?)", list(before)
+    elif after is not None:
+        where, params, order = "AND (c.timestamp, c.id) > (?, ?)", list(after), "ASC"
+    return conn.execute(f"""
+                        SELECT c.id, c.object_hash, c.message, c.timestamp, c.type
+                        FROM commits c
+                        WHERE c.path_id = (SELECT id FROM paths WHERE path = ?) {where}
+                        ORDER BY c.timestamp {order}, c.id {order}
+                        LIMIT ?
+                        """, (file_path, *params, limit)).fetchall()
+
+
+def recent_commits(conn: sqlite3.Connection, before: tuple[int, int] | None = None,
+                   limit: int = 200) -> list[sqlite3.Row]:
+    """모든 파일의 커밋을 합쳐 최신순으로 한 페이지 가져옵니다. (timestamp 인덱스를 따라 읽음)"""
+    where, params = "", []
+    if before is not None: where, params = "WHERE (c.timestamp, c.id) < (?, ?)", list(before)
+    return conn.execute(f"""
+                        SELECT c.id, c.object_hash, c.message, c.timestamp, c.type, c.size, p.path
+                        FROM commits c
+                                 JOIN paths p ON p.id = c.path_id
+                        {where}
+                        ORDER BY c.timestamp DESC, c.id DESC
+                        LIMIT ?
+                        """, (*params, limit)).fetchall()
+
+
+def file_stats(conn: sqlite3.Connection) -> list[sqlite3.Row]:
+    """이력이 있는 모든 파일의 요약 (path, versions, logical_bytes, unsized, last_timestamp, last_commit_id).
+
+    path_stats에 미리 모아 둔 값만 읽으므로 커밋 수와 상관없이 파일 수만큼만 읽습니다.
+    """
+    return conn.execute("""
+                        SELECT p.path, s.versions, s.logical_bytes, s.unsized, s.last_timestamp, s.last_commit_id
+                        FROM path_stats s
+                                 JOIN paths p ON p.id = s.path_id
+                        ORDER BY s.last_timestamp DESC, s.last_commit_id DESC
+                        """).fetchall()
+
+
+def fill_commit_sizes(conn: sqlite3.Connection, batch_size: int = 256, max_batches: int | None = None,
+                      after: str = "") -> tuple[int, str | None]:
+    """크기를 모르는 커밋(스키마 v6 이전에 기록된 커밋)의 크기를 객체에서 구해 채웁니다.
+
+    객체는 트랜잭션 밖에서 읽고, 배치마다 짧은 트랜잭션 하나로 기록합니다. 읽을 수 없는
+    객체는 크기를 모르는 채로 건너뜁니다. (fsck로 확인) 해시 순서로 after 다음부터 읽으며
+    (크기를 채운 객체 수, 다음 호출의 after로 넘길 커서)를 반환합니다. 끝까지 읽었으면
+    커서는 None이므로, 커서를 이어 넘기면 읽을 수 없는 객체를 다시 읽지 않습니다.
+    """
+    filled, last, batches = 0, after, 0
+    while max_batches is None or batches < max_batches:
+        hashes = [row[0] for row in conn.execute("""
+                                                 SELECT DISTINCT object_hash
+                                                 FROM commits
+                                                 WHERE size IS NULL AND object_hash > ?
+                                                 ORDER BY object_hash
+                                                 LIMIT ?
+                                                 """, (last, batch_size))]
+        if not hashes: return filled, None
+        last, batches = hashes[-1], batches + 1
+        sizes = []
+        for object_hash in hashes:
+            try:
+                sizes.append((object_size(object_hash), object_hash))
+            except (OSError, ValueError, zlib.error):
+                pass
+        with conn:
+            conn.executemany("UPDATE commits SET size = ? WHERE object_hash = ? AND size IS NULL", sizes)
+        filled += len(sizes)
+    return filled, last
+
+
+def delete_file_history(conn: sqlite3.Connection, file_path: str):
+    conn.execute("DELETE FROM commits WHERE path_id = (SELECT id FROM paths WHERE path = ?)", (file_path,))
+
+
+def prune_history(conn: sqlite3.Connection, file_path: str | None = None, before: int | None = None,
+                  keep_last: int | None = None, keep_manual: bool = False) -> int:
+    """보존 규칙에 맞지 않는 커밋을 지우고 지운 행 수를 반환합니다.
+
+    조건은 모두 AND로 묶입니다: before(마이크로초)보다 오래되었고, 최신 keep_last개에
+    들지 않고, keep_manual이면 수동 커밋이 아닌(자동 커밋인) 것만 지웁니다.
+    파일의 가장 최근 버전은 어떤 규칙으로도 지우지 않습니다. file_path가 None이면 모든 파일에
+    적용합니다. 지운 커밋의 객체는 트리거를 통해 GC 후보가 됩니다.
+    """
+    where, params = ["rn > ?"], [max(keep_last or 0, 1)]
+    if before is not None:
+        where.append("timestamp < ?")
+        params.append(before)
+    if keep_manual: where.append("type != 'manual'")
+    scope, scope_params = "", []
+    if file_path is not None:
+        scope, scope_params = "WHERE path_id = (SELECT id FROM paths WHERE path = ?)", [file_path]
+    return conn.execute(f"""
+                        DELETE FROM commits
+                        WHERE id IN (SELECT id
+                                     FROM (SELECT id, timestamp, type,
+                                                  ROW_NUMBER() OVER (PARTITION BY path_id
+                                                      ORDER BY timestamp DESC, id DESC) AS rn
+                                           FROM commits {scope})
+                                     WHERE {" AND ".join(where)})
+                        """, (*scope_params, *params)).rowcount
+
+
+class CommitWriter:
+    """커밋 행을 모아 하나의 트랜잭션으로 기록하는 그룹 커밋 작성기.
+
+    add()는 행을 큐에 넣고 곧바로 반환하며, 전용 스레드가 batch_size개가 모이거나
+    가장 오래된 행이 flush_interval초를 기다렸을 때 한 번에 기록합니다.
+    아직 기록되지 않은 행도 head_hash()에는 바로 반영됩니다.
+    """
+
+    def __init__(self, db_path: Path = DB_PATH, batch_size: int = 64, flush_interval: float = 0.2,
+                 before_commit=None, after_commit=None):
+        self.db_path = db_path
+        # 트랜잭션 직전에 호출됩니다. (예: 커밋이 가리킬 객체들을 먼저 fsync)
+        self.before_commit = before_commit
+        # 트랜잭션이 끝난 직후 기록된 행 목록과 함께 호출됩니다. (예: 벤치마크의 지연 시간 측정)
+        self.after_commit = after_commit
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._cond = threading.Condition()
+        self._queue: list[tuple] = []
+        self._oldest: float | None = None
+        self._pending_heads: dict[str, str] = {}
+        self._queued_seq = 0
+        self._written_seq = 0
+        self._flush_requested = False
+        self._stopped = False
+        self._readers = threading.local()
+        self._thread = threading.Thread(target=self._run, name="commit-writer", daemon=True)
+        self._thread.start()
+
+    def _reader(self) -> sqlite3.Connection:
+        if not hasattr(self._readers, "conn"): self._readers.conn = connect(self.db_path)
+        return self._readers.conn
+
+    def head_hash(self, file_path: str) -> str | None:
+        """파일의 가장 최근 커밋 해시를 반환합니다. (큐에 대기 중인 행 포함)"""
+        with self._cond:
+            if file_path in self._pending_heads: return self._pending_heads[file_path]
+        return head_hash(self._reader(), file_path)
+
+    def add(self, file_path: str, object_hash: str, timestamp: int, commit_type: str = 'auto',
+            message: str | None = None, chunks=(), size: int | None = None) -> int:
+        """커밋 행을 큐에 넣고, flush()에 넘길 수 있는 순번을 반환합니다."""
+        with self._cond:
+            self._queue.append((file_path, object_hash, timestamp, commit_type, message, chunks, size))
+            self._pending_heads[file_path] = object_hash
+            if self._oldest is None: self._oldest = time.monotonic()
+            self._queued_seq += 1
+            self._cond.notify_all()
+            return self._queued_seq
+
+    def flush(self, seq: int | None = None, timeout: float | None = None) -> bool:
+        """seq(기본값: 지금까지 큐에 넣은 모든 행)까지 기록될 때까지 기다립니다."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._queued_seq if seq is None else seq
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._written_seq < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0: return False
+                self._cond.wait(timeout=remaining)
+            return True
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"queued": self._queued_seq, "written": self._written_seq, "pending": len(self._queue)}
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _take_batch(self) -> list[tuple] | None:
+        with self._cond:
+            while True:
+                if self._queue:
+                    waited = time.monotonic() - self._oldest
+                    if (self._stopped or self._flush_requested or len(self._queue) >= self.batch_size
+                            or waited >= self.flush_interval):
+                        break
+                    self._cond.wait(timeout=self.flush_interval - waited)
+                elif self._stopped:
+                    return None
+                else:
+                    self._flush_requested = False
+                    self._cond.wait()
+            batch, self._queue, self._oldest = self._queue, [], None
+            return batch
+
+    def _run(self):
+        conn = connect(self.db_path)
+        while (batch := self._take_batch()) is not None:
+            delay = 0.05
+            if self.before_commit:
+                try:
+                    self.before_commit()
+                except OSError as e:
+                    print(f"Commit writer pre-commit hook failed: {e}")
+            started = time.perf_counter()
+            while True:
+                try:
+                    with conn:
+                        for row in batch: insert_commit(conn, *row)
+                    METRICS.observe("db.commit", time.perf_counter() - started)
+                    METRICS.inc("db.rows", len(batch))
+                    METRICS.inc("db.batches")
+                    if self.after_commit: self.after_commit(batch)
+                    break
+                except sqlite3.OperationalError as e:
+                    if "locked" not in str(e) and "busy" not in str(e):
+                        print(f"Commit writer dropped {len(batch)} row(s): {e}")
+                        break
+                    # busy timeout을 넘겨도 잠겨 있으면 행을 잃지 않도록 물러났다가 다시 시도합니다.
+                    print(f"Commit writer retrying after error: {e}")
+                    METRICS.inc("db.retries")
+                    time.sleep(delay)
+                    delay = min(delay * 2, 2.0)
+            with self._cond:
+                written_at = now_timestamp()
+                for _, _, timestamp, *_ in batch:
+                    # 스냅샷 시각부터 DB에 기록될 때까지 걸린 시간 (그룹 커밋 대기 포함)
+                    METRICS.observe("db.commit_lag", (written_at - timestamp) / 1_000_000)
+                self._written_seq += len(batch)
+                for file_path, object_hash, *_ in batch:
+                    if self._pending_heads.get(file_path) == object_hash: del self._pending_heads[file_path]
+                self._cond.notify_all()
+        conn.close()
@@ -0,0 +1,86 @@
+# filegit_fsck.py
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from filegit_store import iter_object_chunks, iter_chunk_data, iter_chunks, iter_loose_objects, iter_packed_objects
+
+# 팩 안의 델타는 순수 파이썬(apply_delta)으로 풀기 때문에 스레드로는 코어를 나눠 쓰지 못합니다.
+# 그래서 스냅샷과 달리 프로세스로 나눕니다.
+DEFAULT_WORKERS = os.cpu_count() or 4
+# 작업 하나에 넘기는 객체 수. 작은 객체가 많을 때 프로세스 사이의 주고받기를 줄입니다.
+VERIFY_BATCH_SIZE = 64
+
+OK, MISSING, CORRUPT = "ok", "missing", "corrupt"
+
+
+def _verify(object_hashes: list[str], chunks: bool = False) -> list[tuple[str, str, int, str]]:
+    """객체들을 끝까지 읽어 내용의 해시가 이름과 같은지 봅니다. 객체마다 (해시, 상태, 크기, 설명).
+    chunks면 객체 대신 청크 저장소의 청크를 읽습니다.
+    """
+    read = iter_chunk_data if chunks else iter_object_chunks
+    results = []
+    for object_hash in object_hashes:
+        hasher, size = hashlib.sha256(), 0
+        try:
+            for chunk in read(object_hash):
+                hasher.update(chunk)
+                size += len(chunk)
+        except FileNotFoundError as e:
+            # 객체 자체나, 청크 객체의 청크, 팩 델타의 베이스가 없는 경우
+            results.append((object_hash, MISSING, size, str(e)))
+            continue
+        except (OSError, ValueError, zlib.error, struct.error) as e:
+            results.append((object_hash, CORRUPT, size, f"{type(e).__name__}: {e}"))
+            continue
+        actual = hasher.hexdigest()
+        if actual == object_hash: results.append((object_hash, OK, size, ""))
+        else: results.append((object_hash, CORRUPT, size, f"content hashes to {actual}"))
+    return results
+
+
+def check_repository(conn: sqlite3.Connection, workers: int = DEFAULT_WORKERS, progress=None) -> dict:
+    """저장된 모든 객체와 커밋이 가리키는 모든 객체를 다시 해시해 확인합니다.
+
+    결과의 missing은 커밋이 가리키지만 읽을 수 없는 객체, corrupt는 내용이 이름(해시)과
+    다르거나 풀 수 없는 객체, dangling은 어떤 커밋도 가리키지 않는 객체와 어떤 객체도 가리키지
+    않는 청크입니다. (각각 해시 목록, missing/corrupt는 (해시, 설명)) 참조되지 않는 청크도 다시
+    해시합니다. 같은 내용이 다시 저장될 때 그 청크를 그대로 재사용하기 때문입니다. 데몬이 도는
+    중이면 막 저장되어 아직 커밋되지 않은 객체와 청크도 dangling에 나올 수 있습니다.
+    objects(청크 포함), bytes, seconds로 처리량을 알 수 있습니다.
+    """
+    started = time.monotonic()
+    referenced = {row[0] for row in conn.execute("SELECT DISTINCT object_hash FROM commits")}
+    stored = set(iter_loose_objects())
+    stored.update(iter_packed_objects())
+    # 참조된 청크는 객체를 읽을 때 함께 확인되므로 참조되지 않는 청크만 따로 읽습니다.
+    live_chunks = {row[0] for row in conn.execute("SELECT DISTINCT chunk_hash FROM chunk_refs")}
+    orphan_chunks = sorted(set(iter_chunks()) - live_chunks)
+    # 해시 순서로 읽어 같은 하위 디렉토리의 객체를 몰아서 읽습니다.
+    targets = sorted(stored | referenced)
+    report = {"objects": 0, "bytes": 0, "seconds": 0.0, "missing": [], "corrupt": [], "dangling": []}
+    vanished = set()
+    batches = [targets[i:i + VERIFY_BATCH_SIZE] for i in range(0, len(targets), VERIFY_BATCH_SIZE)]
+    kinds = [False] * len(batches)
+    for i in range(0, len(orphan_chunks), VERIFY_BATCH_SIZE):
+        batches.append(orphan_chunks[i:i + VERIFY_BATCH_SIZE])
+        kinds.append(True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for results, chunks in zip(pool.map(_verify, batches, kinds), kinds):
+            for object_hash, status, size, detail in results:
+                report["objects"] += 1
+                report["bytes"] += size
+                # 커밋이 가리키지 않는 객체나 청크가 사라졌으면 그 사이 GC가 지운 것입니다.
+                if status == MISSING and (chunks or object_hash not in referenced): vanished.add(object_hash)
+                elif status != OK:
+                    report[status].append((object_hash, f"unreferenced chunk, {detail}" if chunks else detail))
+            if progress: progress(report)
+    report["dangling"] = sorted((stored - referenced | set(orphan_chunks)) - vanished)
+    report["seconds"] = time.monotonic() - started
+    return report
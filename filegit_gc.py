@@ -0,0 +1,193 @@
+# filegit_gc.py
+from __future__ import annotations
+
+import fnmatch
+import os
+import sqlite3
+import time
+
+from filegit_db import now_timestamp, prune_history
+from filegit_store import (find_loose, remove_loose, find_chunk, remove_chunk, manifest_chunks, iter_loose_objects,
+                           iter_chunks, iter_packed_objects, in_pack)
+
+# 이 시간(초) 안에 쓰이거나 다시 쓰인(중복 저장으로 mtime이 갱신된) 객체는 지우지 않습니다.
+# 스냅샷이 객체를 저장한 뒤 커밋 행이 기록되기 전 사이에 GC가 끼어드는 경우를 막습니다.
+DEFAULT_GRACE_PERIOD = 600
+DEFAULT_BATCH_SIZE = 256
+
+
+def _new_stats() -> dict:
+    return {"processed": 0, "objects": 0, "chunks": 0, "packed": 0, "deferred": 0, "bytes": 0}
+
+
+def _is_recent(st: os.stat_result, grace: float) -> bool:
+    return st.st_mtime > time.time() - grace
+
+
+def _collect_objects(conn: sqlite3.Connection, started: int, batch_size: int, grace: float, stats: dict) -> int:
+    rows = conn.execute("""
+                        SELECT object_hash
+                        FROM gc_candidates
+                        WHERE packed = 0 AND queued_at < ?
+                        ORDER BY queued_at
+                        LIMIT ?
+                        """, (started, batch_size)).fetchall()
+    drop, defer, packed, chunk_owners = [], [], [], []
+    for (object_hash,) in rows:
+        if conn.execute("SELECT 1 FROM commits WHERE object_hash = ? LIMIT 1", (object_hash,)).fetchone():
+            drop.append(object_hash)
+            continue
+        path = find_loose(object_hash)
+        try:
+            st = path.stat() if path else None
+        except FileNotFoundError:
+            st = None
+        if st is not None:
+            if _is_recent(st, grace):
+                defer.append(object_hash)
+                continue
+            # 매니페스트를 지우기 전에 청크 목록을 읽어 둡니다.
+            chunk_owners.append((object_hash, manifest_chunks(object_hash)))
+            # 파일을 먼저 지우고 행을 나중에 지워야, 중간에 멈춰도 다음 실행에서 이어서 처리됩니다.
+            remove_loose(object_hash)
+            stats["objects"] += 1
+            stats["bytes"] += st.st_size
+        else:
+            chunk_owners.append((object_hash, []))
+        # 팩에 든 객체는 여기서 지울 수 없으므로 repack이 빼도록 표시만 해 둡니다.
+        if in_pack(object_hash):
+            packed.append(object_hash)
+            stats["packed"] += 1
+        else:
+            drop.append(object_hash)
+
+    now = now_timestamp()
+    with conn:
+        # 지운 매니페스트의 청크는 이번 실행에서 바로 확인하도록 started보다 앞선 시각으로 넣습니다.
+        for object_hash, chunks in chunk_owners:
+            conn.execute("""
+                         INSERT OR IGNORE INTO gc_chunks (chunk_hash, queued_at)
+                         SELECT chunk_hash, ? FROM chunk_refs WHERE object_hash = ?
+                         """, (started - 1, object_hash))
+            conn.executemany("INSERT OR IGNORE INTO gc_chunks (chunk_hash, queued_at) VALUES (?, ?)",
+                             ((chunk_hash, started - 1) for chunk_hash in chunks))
+            conn.execute("DELETE FROM chunk_refs WHERE object_hash = ?", (object_hash,))
+        conn.executemany("DELETE FROM gc_candidates WHERE object_hash = ?", ((h,) for h in drop))
+        conn.executemany("UPDATE gc_candidates SET packed = 1 WHERE object_hash = ?", ((h,) for h in packed))
+        conn.executemany("UPDATE gc_candidates SET queued_at = ? WHERE object_hash = ?", ((now, h) for h in defer))
+    stats["deferred"] += len(defer)
+    return len(rows)
+
+
+def _collect_chunks(conn: sqlite3.Connection, started: int, batch_size: int, grace: float, stats: dict) -> int:
+    rows = conn.execute("SELECT chunk_hash FROM gc_chunks WHERE queued_at < ? ORDER BY queued_at LIMIT ?",
+                        (started, batch_size)).fetchall()
+    drop, defer = [], []
+    for (chunk_hash,) in rows:
+        if conn.execute("SELECT 1 FROM chunk_refs WHERE chunk_hash = ? LIMIT 1", (chunk_hash,)).fetchone():
+            drop.append(chunk_hash)
+            continue
+        path = find_chunk(chunk_hash)
+        try:
+            st = path.stat() if path else None
+        except FileNotFoundError:
+            st = None
+        if st is None:
+            drop.append(chunk_hash)
+            continue
+        if _is_recent(st, grace):
+            defer.append(chunk_hash)
+            continue
+        remove_chunk(chunk_hash)
+        drop.append(chunk_hash)
+        stats["chunks"] += 1
+        stats["bytes"] += st.st_size
+
+    now = now_timestamp()
+    with conn:
+        conn.executemany("DELETE FROM gc_chunks WHERE chunk_hash = ?", ((h,) for h in drop))
+        conn.executemany("UPDATE gc_chunks SET queued_at = ? WHERE chunk_hash = ?", ((now, h) for h in defer))
+    stats["deferred"] += len(defer)
+    return len(rows)
+
+
+def collect_garbage(conn: sqlite3.Connection, batch_size: int = DEFAULT_BATCH_SIZE,
+                    grace: float = DEFAULT_GRACE_PERIOD, max_batches: int | None = None,
+                    queued_before: int | None = None) -> dict:
+    """GC 후보 중 더 이상 어떤 커밋도 가리키지 않는 객체와 청크를 지웁니다.
+
+    후보를 batch_size개씩 처리하고 배치마다 짧은 트랜잭션 하나만 쓰므로, 데몬 안에서
+    max_batches=1로 조금씩 불러도 스냅샷 기록을 오래 막지 않습니다. queued_before(기본값:
+    지금) 뒤에 들어오거나 미뤄진 후보는 다음 실행에서 처리합니다. 회수한 바이트 수를 포함한
+    통계를 반환합니다.
+    """
+    stats = _new_stats()
+    started = queued_before if queued_before is not None else now_timestamp() + 1
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        count = _collect_objects(conn, started, batch_size, grace, stats)
+        if not count: count = _collect_chunks(conn, started, batch_size, grace, stats)
+        if not count: break
+        stats["processed"] += count
+        batches += 1
+    return stats
+
+
+def queue_unreferenced(conn: sqlite3.Connection) -> int:
+    """저장소 전체를 훑어 어떤 커밋도 가리키지 않는 객체와 청크를 GC 후보로 넣습니다.
+
+    GC 테이블이 생기기 전에 지워진 이력의 객체나, 중단된 작업이 남긴 객체를 찾을 때 씁니다.
+    """
+    now = now_timestamp()
+    referenced = {row[0] for row in conn.execute("SELECT DISTINCT object_hash FROM commits")}
+    stored = set(iter_loose_objects())
+    stored.update(iter_packed_objects())
+    orphans = stored - referenced
+    live_chunks = {row[0] for row in conn.execute("SELECT DISTINCT chunk_hash FROM chunk_refs")}
+    chunk_orphans = [chunk_hash for chunk_hash in iter_chunks() if chunk_hash not in live_chunks]
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO gc_candidates (object_hash, queued_at) VALUES (?, ?)",
+                         ((h, now) for h in orphans))
+        conn.executemany("INSERT OR IGNORE INTO gc_chunks (chunk_hash, queued_at) VALUES (?, ?)",
+                         ((h, now) for h in chunk_orphans))
+    return len(orphans) + len(chunk_orphans)
+
+
+def packed_garbage(conn: sqlite3.Connection, grace: float = DEFAULT_GRACE_PERIOD) -> set[str]:
+    """repack 때 팩에서 뺄 객체들: GC가 팩에만 있다고 표시했고 여전히 참조되지 않는 객체."""
+    cutoff = now_timestamp() - int(grace * 1_000_000)
+    rows = conn.execute("""
+                        SELECT g.object_hash
+                        FROM gc_candidates g
+                        WHERE g.packed = 1 AND g.queued_at < ?
+                          AND NOT EXISTS (SELECT 1 FROM commits c WHERE c.object_hash = g.object_hash)
+                        """, (cutoff,))
+    return {row[0] for row in rows}
+
+
+def forget_packed(conn: sqlite3.Connection, object_hashes):
+    """repack이 팩에서 뺀 객체들의 후보 행을 지웁니다."""
+    with conn:
+        conn.executemany("DELETE FROM gc_candidates WHERE object_hash = ?", ((h,) for h in object_hashes))
+
+
+def apply_retention(conn: sqlite3.Connection, rules: list[dict]) -> int:
+    """설정의 보존 규칙(auto_cleanup.rules)을 모든 파일에 적용하고 지운 커밋 수를 반환합니다.
+
+    규칙 예: {"pattern": "*.log", "keep_last": 20}, {"older_than_days": 90, "keep_manual": true}
+    pattern이 없으면 모든 파일에 적용됩니다. auto_only는 keep_manual의 다른 이름입니다.
+    """
+    deleted = 0
+    paths = [row[0] for row in conn.execute("SELECT path FROM paths")]
+    for rule in rules:
+        before = None
+        if rule.get("older_than_days"):
+            before = now_timestamp() - int(rule["older_than_days"] * 86400 * 1_000_000)
+        if before is None and not rule.get("keep_last"): continue
+        pattern = rule.get("pattern")
+        targets = [None] if pattern is None else [p for p in paths if fnmatch.fnmatch(p, pattern)]
+        with conn:
+            for path in targets:
+                deleted += prune_history(conn, path, before=before, keep_last=rule.get("keep_last"),
+                                         keep_manual=bool(rule.get("keep_manual") or rule.get("auto_only")))
+    return deleted
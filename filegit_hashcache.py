@@ -0,0 +1,180 @@
+# filegit_hashcache.py
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import stat
+import threading
+import time
+from pathlib import Path
+
+from filegit_config import FILEGIT_DIR
+from filegit_db import connect
+
+# --- 설정 (메인 스크립트 및 데몬과 공유) ---
+HASHCACHE_PATH = FILEGIT_DIR / "hashcache.db"
+
+# 해시를 계산한 시각과 mtime이 이 간격 안에 있으면 "racily clean"으로 보고 믿지 않습니다.
+# (같은 타임스탬프 틱 안에서 파일이 다시 바뀌면 stat만으로는 구분할 수 없기 때문)
+RACY_WINDOW_NS = 2_000_000_000
+_READ_SIZE = 1024 * 1024
+
+
+def hash_file(filepath: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        while chunk := f.read(_READ_SIZE): hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _stat_key(st: os.stat_result) -> tuple[int, int, int, int, int]:
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns
+
+
+def _racy(st: os.stat_result, hashed_at_ns: int) -> bool:
+    return max(st.st_mtime_ns, st.st_ctime_ns) >= hashed_at_ns - RACY_WINDOW_NS
+
+
+class HashCache:
+    """(device, inode, size, mtime_ns, ctime_ns)가 그대로인 파일은 다시 읽지 않는 해시 캐시.
+
+    데몬과 CLI가 같은 hashcache.db를 공유하며, 재시작 후에도 유지됩니다.
+    """
+
+    def __init__(self, db_path: Path = HASHCACHE_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        if not hasattr(self._local, "conn"):
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = connect(self.db_path)
+            with conn:
+                conn.execute("""
+                             CREATE TABLE IF NOT EXISTS hash_cache
+                             (
+                                 path         TEXT PRIMARY KEY,
+                                 dev          INTEGER NOT NULL,
+                                 ino          INTEGER NOT NULL,
+                                 size         INTEGER NOT NULL,
+                                 mtime_ns     INTEGER NOT NULL,
+                                 ctime_ns     INTEGER NOT NULL,
+                                 hash         TEXT    NOT NULL,
+                                 hashed_at_ns INTEGER NOT NULL
+                             ) WITHOUT ROWID
+                             """)
+            self._local.conn = conn
+        return self._local.conn
+
+    def _row(self, path: str, st: os.stat_result) -> sqlite3.Row | None:
+        row = self._conn().execute(
+            "SELECT dev, ino, size, mtime_ns, ctime_ns, hash, hashed_at_ns FROM hash_cache WHERE path = ?",
+            (path,)).fetchone()
+        return row if row and tuple(row[:5]) == _stat_key(st) else None
+
+    def lookup(self, path: str, st: os.stat_result) -> str | None:
+        """stat이 기록과 같고 racily clean이 아니면 저장된 해시를 반환합니다."""
+        row = self._row(path, st)
+        return row['hash'] if row and not _racy(st, row['hashed_at_ns']) else None
+
+    def store(self, path: str, st: os.stat_result, digest: str, hashed_at_ns: int):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO hash_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (path, *_stat_key(st), digest, hashed_at_ns))
+
+    def cached_hash(self, filepath: Path) -> str | None:
+        """파일을 읽지 않고 stat만으로 확인할 수 있는 해시를 반환합니다. 없으면 None."""
+        try:
+            st = os.stat(filepath)
+            return self.lookup(str(filepath), st)
+        except (OSError, sqlite3.Error):
+            return None
+
+    def refresh(self, filepath: Path) -> str | None:
+        """cached_hash()와 같지만, racily clean이라 믿지 못하던 기록은 다시 읽어 확인합니다.
+
+        데몬은 저장 직후에 캡처하므로 기록이 거의 언제나 racily clean으로 남습니다. 그런
+        기록도 stat이 그대로인 채 RACY_WINDOW_NS가 지났다면 한 번만 다시 읽어 새 시각으로
+        남기므로, 다음부터는 읽지 않고 바로 돌려줍니다. 파일을 읽을 수 있으므로 어차피
+        파일을 읽을 호출자(스냅샷)만 씁니다.
+        """
+        path = str(filepath)
+        try:
+            st = os.stat(path)
+            row = self._row(path, st)
+            if not row: return None
+            if not _racy(st, row['hashed_at_ns']): return row['hash']
+            hashed_at_ns = time.time_ns()
+            # 아직 창 안이면 지금 다시 읽어도 racy이므로 기다립니다.
+            if _racy(st, hashed_at_ns): return None
+            digest = hash_file(filepath)
+            if _stat_key(os.stat(path)) != _stat_key(st): return None
+            self.store(path, st, digest, hashed_at_ns)
+            return digest
+        except (OSError, sqlite3.Error):
+            return None
+
+    def forget(self, path: str):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM hash_cache WHERE path = ?", (path,))
+
+    def get_file_hash(self, filepath: Path) -> str | None:
+        path = str(filepath)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            try:
+                self.forget(path)
+            except sqlite3.Error:
+                pass
+            return None
+        if not stat.S_ISREG(st.st_mode): return None
+
+        try:
+            cached = self.lookup(path, st)
+        except sqlite3.Error:
+            cached = None
+        if cached: return cached
+
+        hashed_at_ns = time.time_ns()
+        digest = hash_file(filepath)
+        # 읽는 도중 파일이 바뀌었다면 그 해시는 캐시에 남기지 않습니다.
+        if _stat_key(os.stat(path)) == _stat_key(st):
+            try:
+                self.store(path, st, digest, hashed_at_ns)
+            except sqlite3.Error:
+                pass
+        return digest
+
+
+_cache: HashCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_hash_cache() -> HashCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None: _cache = HashCache()
+        return _cache
+
+
+def get_file_hash(filepath: Path) -> str | None:
+    """파일의 SHA-256. 변경되지 않은 파일은 공유 해시 캐시에서 바로 돌려줍니다."""
+    return get_hash_cache().get_file_hash(filepath)
+
+
+def cached_file_hash(filepath: Path) -> str | None:
+    return get_hash_cache().cached_hash(filepath)
+
+
+def refresh_file_hash(filepath: Path) -> str | None:
+    return get_hash_cache().refresh(filepath)
+
+
+def remember_file_hash(filepath: Path, st: os.stat_result, digest: str, hashed_at_ns: int):
+    """다른 경로(예: 스냅샷 캡처)에서 이미 구한 해시를 캐시에 남깁니다."""
+    try:
+        get_hash_cache().store(str(filepath), st, digest, hashed_at_ns)
+    except sqlite3.Error:
+        pass
@@ -0,0 +1,107 @@
+# filegit_ipc.py
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import threading
+from pathlib import Path
+
+from filegit_config import FILEGIT_DIR
+
+# --- 설정 (메인 스크립트 및 데몬과 공유) ---
+SOCKET_PATH = FILEGIT_DIR / "daemon.sock"
+
+DEFAULT_TIMEOUT = 2.0
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+
+class DaemonUnavailable(Exception):
+    """데몬이 실행 중이지 않거나 제어 소켓에 연결할 수 없습니다. 호출한 쪽은 직접 처리로 넘어가면 됩니다."""
+
+
+class DaemonError(Exception):
+    """데몬이 요청을 처리하다 실패했습니다."""
+
+
+# --- 클라이언트 (CLI, TUI) ---
+def request(op: str, timeout: float = DEFAULT_TIMEOUT, **params):
+    """데몬에 요청 하나를 보내고 결과를 반환합니다.
+
+    메시지는 한 줄짜리 JSON입니다: {"op": ..., 인자...} -> {"ok": true, "result": ...}
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    with sock:
+        try:
+            sock.connect(str(SOCKET_PATH))
+        except (FileNotFoundError, ConnectionRefusedError, socket.timeout) as e:
+            raise DaemonUnavailable(str(e)) from e
+        try:
+            sock.sendall(json.dumps({"op": op, **params}).encode() + b"\n")
+            line = sock.makefile("rb").readline(MAX_MESSAGE_SIZE)
+        except (socket.timeout, ConnectionError) as e:
+            raise DaemonUnavailable(f"no reply from daemon: {e}") from e
+    if not line: raise DaemonUnavailable("daemon closed the connection")
+    reply = json.loads(line)
+    if not reply.get("ok"): raise DaemonError(reply.get("error", "unknown error"))
+    return reply.get("result")
+
+
+def is_running() -> bool:
+    try:
+        request("status", timeout=0.5)
+        return True
+    except (DaemonUnavailable, DaemonError):
+        return False
+
+
+# --- 서버 (데몬) ---
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # 한 연결에서 여러 요청을 차례로 처리합니다.
+        while line := self.rfile.readline(MAX_MESSAGE_SIZE):
+            try:
+                message = json.loads(line)
+                op = message.pop("op", None)
+                handler = self.server.handlers.get(op)
+                if handler is None: raise ValueError(f"unknown op: {op}")
+                reply = {"ok": True, "result": handler(**message)}
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ControlServer:
+    """데몬 안에서 제어 소켓을 열고, op 이름 -> 함수 표대로 요청을 처리합니다."""
+
+    def __init__(self, handlers: dict, path: Path = SOCKET_PATH):
+        self.handlers = handlers
+        self.path = path
+        self._server: _Server | None = None
+
+    def start(self):
+        if self.path.exists():
+            # 비정상 종료한 데몬이 남긴 소켓이면 지우고, 다른 데몬이 쓰고 있으면 실패합니다.
+            if is_running(): raise RuntimeError(f"another daemon is listening on {self.path}")
+            self.path.unlink()
+        old_umask = os.umask(0o077)
+        try:
+            self._server = _Server(str(self.path), _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.handlers = self.handlers
+        threading.Thread(target=self._server.serve_forever, name="control-socket", daemon=True).start()
+
+    def stop(self):
+        if self._server is None: return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self.path.unlink(missing_ok=True)
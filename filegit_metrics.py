@@ -0,0 +1,124 @@
+# filegit_metrics.py
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# 지연 시간 히스토그램의 버킷 상한(초). 마지막 버킷은 +Inf입니다.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """고정 버킷 히스토그램. 분위수는 버킷 경계로 어림합니다."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max: self.max = value
+
+    def quantile(self, q: float) -> float:
+        if not self.count: return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank: return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        return {"count": self.count, "sum": self.sum, "max": self.max, "p50": self.quantile(0.5),
+                "p95": self.quantile(0.95), "p99": self.quantile(0.99)}
+
+
+class Registry:
+    """카운터와 히스토그램 모음. 여러 스레드에서 동시에 기록해도 됩니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[str, float] = {}
+        self.histograms: dict[str, Histogram] = {}
+        self._trace = threading.local()
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None: histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+        spans = getattr(self._trace, "spans", None)
+        if spans is not None: spans.append((name, seconds))
+
+    @contextmanager
+    def timer(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    @contextmanager
+    def trace(self):
+        """이 스레드에서 기록되는 구간들을 (이름, 초) 목록으로 모읍니다. (스냅샷 하나 추적용)"""
+        outer = getattr(self._trace, "spans", None)
+        spans: list[tuple[str, float]] = []
+        self._trace.spans = spans
+        try:
+            yield spans
+        finally:
+            self._trace.spans = outer
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"counters": dict(self.counters),
+                    "histograms": {name: h.summary() for name, h in self.histograms.items()}}
+
+    def to_prometheus(self, prefix: str = "filegit") -> str:
+        """Prometheus 텍스트 형식으로 내보냅니다."""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                metric = f"{prefix}_{_metric_name(name)}_total"
+                lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+            for name, h in sorted(self.histograms.items()):
+                metric = f"{prefix}_{_metric_name(name)}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, n in zip((*h.buckets, "+Inf"), h.counts):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines += [f"{metric}_sum {h.sum}", f"{metric}_count {h.count}"]
+        return "\n".join(lines) + "\n"
+
+    def dump_prometheus(self, path: Path):
+        """텍스트 파일 수집기(node_exporter 등)가 반쯤 쓰인 파일을 읽지 않도록 교체 방식으로 씁니다."""
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+def _metric_name(name: str) -> str:
+    return name.replace(".", "_").replace("-", "_")
+
+
+# 프로세스 전체가 공유하는 레지스트리
+METRICS = Registry()
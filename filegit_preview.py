@@ -0,0 +1,379 @@
+# filegit_preview.py
+from __future__ import annotations
+
+import bisect
+import codecs
+import difflib
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, TYPE_CHECKING
+
+from filegit_store import iter_object_chunks, raw_object_location
+
+if TYPE_CHECKING:
+    from filegit_tui import TimelineRow
+
+# diff 캐시가 차지할 수 있는 최대 메모리
+PREVIEW_CACHE_BYTES = 64 * 1024 * 1024
+# 압축된 객체는 임시 파일로 풀어 mmap합니다. 열어 둔 임시 파일들이 차지할 수 있는 최대 디스크 크기와 개수
+VIEW_SPOOL_BYTES = 512 * 1024 * 1024
+VIEW_CACHE_ENTRIES = 32
+# 줄 위치는 이 크기의 블록마다 "블록 앞까지의 줄 수"만 기록합니다. (1GB 파일도 색인은 128KB)
+LINE_INDEX_BLOCK = 64 * 1024
+# 앞부분 이만큼에 NUL이 있거나 UTF-8이 아니면 바이너리로 봅니다.
+BINARY_SNIFF_BYTES = 8 * 1024
+HEX_WIDTH = 16
+# diff의 기본 문맥 줄 수와, 펼칠 때 차례로 늘려 갈 문맥 줄 수 (None: 파일 전체)
+DIFF_CONTEXT = 3
+DIFF_EXPAND_STEPS = (3, 10, 50, None)
+# 바뀐 구간이 이보다 길면 줄 단위 diff를 만들지 않고 요약만 보여줍니다.
+DIFF_MAX_LINES = 20000
+_READ_SIZE = 1024 * 1024
+
+
+# --- 내용 뷰 (mmap) ---
+def _looks_binary(sample: bytes, truncated: bool) -> bool:
+    if b"\0" in sample: return True
+    try:
+        # 잘린 샘플의 끝에 걸친 멀티바이트 문자는 오류로 보지 않습니다.
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=not truncated)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+
+class ContentView:
+    """파일이나 객체 내용을 mmap으로 열어 둔 읽기 전용 뷰.
+
+    내용은 메모리에 올리지 않고 필요한 범위만 읽습니다. 줄 위치는 처음 필요할 때 한 번
+    훑어서 블록마다의 줄 수만 기록하고, 블록 안에서는 그때그때 찾습니다.
+    """
+
+    def __init__(self, f, offset: int = 0, spooled: bool = False):
+        self._file = f
+        self._offset = offset
+        self.size = os.fstat(f.fileno()).st_size - offset
+        self.spooled = spooled  # 임시 파일로 풀어 둔 뷰인지 (캐시의 디스크 사용량 계산용)
+        self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size > 0 else None
+        self._block_lines: array | None = None
+        self._lock = threading.Lock()
+        sample = self.read(0, BINARY_SNIFF_BYTES)
+        self.is_binary = _looks_binary(sample, truncated=self.size > len(sample))
+
+    def read(self, start: int, end: int) -> bytes:
+        if self._mm is None: return b""
+        start, end = max(0, start), min(end, self.size)
+        return self._mm[self._offset + start:self._offset + end] if start < end else b""
+
+    def find(self, sub: bytes, start: int, end: int | None = None) -> int:
+        if self._mm is None: return -1
+        end = self.size if end is None else end
+        pos = self._mm.find(sub, self._offset + start, self._offset + end)
+        return pos - self._offset if pos >= 0 else -1
+
+    def rfind(self, sub: bytes, start: int, end: int) -> int:
+        if self._mm is None: return -1
+        pos = self._mm.rfind(sub, self._offset + start, self._offset + end)
+        return pos - self._offset if pos >= 0 else -1
+
+    def _index(self) -> array:
+        with self._lock:
+            if self._block_lines is None:
+                # block_lines[i] = i번째 블록 앞까지의 줄바꿈 수
+                block_lines, total = array("Q", [0]), 0
+                for start in range(0, self.size, LINE_INDEX_BLOCK):
+                    total += self.read(start, start + LINE_INDEX_BLOCK).count(b"\n")
+                    block_lines.append(total)
+                self._block_lines = block_lines
+            return self._block_lines
+
+    def prepare(self):
+        """줄 색인을 미리 만듭니다. 화면 스레드가 처음 그릴 때 파일 전체를 훑지 않도록 작업 스레드에서 부릅니다."""
+        if not self.is_binary: self._index()
+
+    @property
+    def line_count(self) -> int:
+        newlines = self._index()[-1]
+        return newlines + 1 if self.size and self.read(self.size - 1, self.size) != b"\n" else newlines
+
+    def line_start(self, line: int) -> int:
+        """line번째(0부터) 줄이 시작하는 위치. 줄 수보다 크면 내용의 끝."""
+        if line <= 0: return 0
+        block_lines = self._index()
+        if line > block_lines[-1]: return self.size
+        # line번째 줄바꿈이 들어 있는 블록을 찾고, 그 안에서 남은 만큼 줄바꿈을 건너뜁니다.
+        block = bisect.bisect_left(block_lines, line) - 1
+        pos = block * LINE_INDEX_BLOCK
+        for _ in range(line - block_lines[block]):
+            pos = self.find(b"\n", pos) + 1
+        return pos
+
+    def line_of(self, pos: int) -> int:
+        """pos 앞에 있는 줄바꿈 수. (pos가 줄의 시작이면 그 줄의 번호)"""
+        block = min(pos // LINE_INDEX_BLOCK, len(self._index()) - 1)
+        start = block * LINE_INDEX_BLOCK
+        return self._index()[block] + self.read(start, pos).count(b"\n")
+
+    def lines(self, start: int, count: int) -> list[str]:
+        """start번째 줄부터 count줄. 깨진 UTF-8은 대체 문자로 바꿉니다."""
+        pos, lines = self.line_start(start), []
+        while len(lines) < count and pos < self.size:
+            end = self.find(b"\n", pos)
+            if end < 0: end = self.size
+            lines.append(self.read(pos, end).decode("utf-8", errors="replace").rstrip("\r"))
+            pos = end + 1
+        return lines
+
+    @property
+    def hex_rows(self) -> int:
+        return (self.size + HEX_WIDTH - 1) // HEX_WIDTH
+
+    def hex_row(self, row: int) -> str:
+        data = self.read(row * HEX_WIDTH, (row + 1) * HEX_WIDTH)
+        hex_part = " ".join(f"{b:02x}" for b in data[:8]) + "  " + " ".join(f"{b:02x}" for b in data[8:])
+        text_part = "".join(chr(b) if 32 <= b < 127 else "." for b in data)
+        return f"{row * HEX_WIDTH:08x}  {hex_part:<{HEX_WIDTH * 3 + 1}} |{text_part}|"
+
+
+def open_object_view(object_hash: str, is_cancelled=lambda: False) -> ContentView | None:
+    """객체의 뷰를 엽니다. 압축되지 않은 객체는 그대로, 나머지는 임시 파일로 풀어 mmap합니다."""
+    location = raw_object_location(object_hash)
+    if location:
+        return ContentView(open(location[0], "rb"), location[1])
+    f = tempfile.TemporaryFile(prefix="filegit-view-")
+    try:
+        chunks = iter_object_chunks(object_hash)
+        try:
+            for chunk in chunks:
+                if is_cancelled(): f.close(); return None
+                f.write(chunk)
+        finally:
+            chunks.close()
+        f.flush()
+        return ContentView(f, spooled=True)
+    except BaseException:
+        f.close()
+        raise
+
+
+def open_file_view(filepath: Path) -> ContentView:
+    # 작업 중인 파일은 편집기가 줄이거나 바꿔 쓸 수 있고, 그러면 mmap된 페이지를 읽다 SIGBUS가 나므로
+    # 임시 파일로 복사해 둔 사본을 엽니다.
+    f = tempfile.TemporaryFile(prefix="filegit-view-")
+    try:
+        with open(filepath, "rb") as src: shutil.copyfileobj(src, f, _READ_SIZE)
+        f.flush()
+        return ContentView(f, spooled=True)
+    except BaseException:
+        f.close()
+        raise
+
+
+class ViewCache:
+    """객체 해시 -> 열린 뷰 LRU 캐시. 임시 파일로 푼 뷰의 디스크 사용량과 열린 파일 수를 제한합니다.
+
+    캐시에서 밀려난 뷰는 닫지 않고 참조만 놓습니다. 화면에 떠 있는 뷰는 그대로 쓰이다가
+    더 이상 참조되지 않으면 mmap과 임시 파일이 함께 정리됩니다.
+    """
+
+    def __init__(self, max_bytes: int = VIEW_SPOOL_BYTES, max_entries: int = VIEW_CACHE_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.used_bytes = 0
+        self._items: OrderedDict[str, ContentView] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, object_hash: str, is_cancelled=lambda: False) -> ContentView | None:
+        with self._lock:
+            view = self._items.get(object_hash)
+            if view is not None:
+                self._items.move_to_end(object_hash)
+                return view
+        view = open_object_view(object_hash, is_cancelled)
+        if view is None: return None
+        with self._lock:
+            if object_hash in self._items: return self._items[object_hash]
+            self._items[object_hash] = view
+            if view.spooled: self.used_bytes += view.size
+            while len(self._items) > 1 and (self.used_bytes > self.max_bytes or len(self._items) > self.max_entries):
+                _, evicted = self._items.popitem(last=False)
+                if evicted.spooled: self.used_bytes -= evicted.size
+        return view
+
+
+# --- diff ---
+def _first_difference(old: ContentView, new: ContentView) -> int:
+    """두 내용이 처음 달라지는 위치. 같으면 짧은 쪽의 길이."""
+    limit, pos = min(old.size, new.size), 0
+    while pos < limit:
+        a, b = old.read(pos, pos + _READ_SIZE), new.read(pos, pos + _READ_SIZE)
+        if a != b:
+            # 다른 블록 안에서는 반씩 줄여 가며 찾습니다.
+            lo, hi = 0, min(len(a), len(b))
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if a[lo:mid + 1] == b[lo:mid + 1]: lo = mid + 1
+                else: hi = mid
+            return pos + lo
+        pos += len(a)
+    return limit
+
+
+def _common_suffix(old: ContentView, new: ContentView, limit: int) -> int:
+    """끝에서부터 같은 바이트 수 (limit 이하)."""
+    same = 0
+    while same < limit:
+        step = min(_READ_SIZE, limit - same)
+        a = old.read(old.size - same - step, old.size - same)
+        b = new.read(new.size - same - step, new.size - same)
+        if a != b:
+            lo, hi = 0, step  # 끝에서 lo바이트가 같음
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if a[step - mid:] == b[step - mid:]: lo = mid
+                else: hi = mid - 1
+            return same + lo
+        same += step
+    return limit
+
+
+def _at_line_start(view: ContentView, pos: int) -> bool:
+    return pos == 0 or view.read(pos - 1, pos) == b"\n"
+
+
+def _format_range(start: int, length: int) -> str:
+    # unified diff 헤더의 범위 표기 (difflib과 같은 규칙)
+    if length == 1: return str(start + 1)
+    if not length: start -= 1
+    return f"{start + 1},{length}"
+
+
+def build_diff(old: ContentView | None, new: ContentView, context: int | None = DIFF_CONTEXT,
+               is_cancelled=lambda: False) -> list[str] | None:
+    """바뀐 부분(hunk)만 담은 unified diff 줄들. 취소되면 None을 반환합니다.
+
+    같은 앞부분과 뒷부분은 mmap에서 바이트로 비교해 건너뛰고, 바뀐 가운데 구간과 그 앞뒤
+    context줄만 읽어서 비교하므로, 파일이 아무리 커도 메모리는 바뀐 구간만큼만 씁니다.
+    context가 None이면 파일 전체를 문맥으로 보여줍니다.
+    """
+    if old is None: return ["[첫 커밋이므로 이전 버전 없음]"]
+    if old.is_binary or new.is_binary:
+        if old.size == new.size and _first_difference(old, new) == old.size: return ["[내용이 같습니다]"]
+        first = _first_difference(old, new)
+        return [f"[바이너리 파일] {old.size:,} → {new.size:,} bytes ({new.size - old.size:+,})",
+                f"처음 달라지는 위치: 0x{first:08x}"]
+    prefix = _first_difference(old, new)
+    if prefix == old.size == new.size: return ["[내용이 같습니다]"]
+    suffix = _common_suffix(old, new, min(old.size, new.size) - prefix)
+    # 구간을 줄 경계에 맞춥니다. 앞부분은 줄의 시작으로 당기고, 뒷부분은 다음 줄의 시작으로 밉니다.
+    # (같은 뒷부분 안에서는 두 버전의 줄 경계가 같으므로 한쪽에서 찾은 만큼 함께 밉니다)
+    start = old.rfind(b"\n", 0, prefix) + 1
+    old_end, new_end = old.size - suffix, new.size - suffix
+    if not (_at_line_start(old, old_end) and _at_line_start(new, new_end)):
+        tail = old.find(b"\n", old_end)
+        shift = (tail + 1 if tail >= 0 else old.size) - old_end
+        old_end, new_end = old_end + shift, new_end + shift
+    if is_cancelled(): return None
+
+    # 줄 번호로 바꾸고 앞뒤로 문맥을 붙입니다. (앞뒤는 두 버전이 같으므로 줄 번호도 함께 움직입니다)
+    first_line = old.line_of(start)
+    old_stop, new_stop = old.line_of(old_end), new.line_of(new_end)
+    if old_end == old.size and old.size and old.read(old.size - 1, old.size) != b"\n": old_stop += 1
+    if new_end == new.size and new.size and new.read(new.size - 1, new.size) != b"\n": new_stop += 1
+    if max(old_stop - first_line, new_stop - first_line) > DIFF_MAX_LINES:
+        return [f"[바뀐 구간이 너무 커서 diff를 표시하지 않습니다: {first_line + 1}번째 줄부터 "
+                f"-{old_stop - first_line:,}줄 +{new_stop - first_line:,}줄]"]
+    before = first_line if context is None else min(first_line, context)
+    after_limit = max(old.line_count - old_stop, 0)
+    after = after_limit if context is None else min(after_limit, context)
+    notes = []
+    if before + after + max(old_stop, new_stop) - first_line > DIFF_MAX_LINES:
+        before = after = min(DIFF_CONTEXT, before, after)
+        notes.append(f"[파일이 커서 문맥을 {DIFF_CONTEXT}줄로 줄였습니다]")
+    base = first_line - before
+    old_lines = old.lines(base, old_stop - base + after)
+    new_lines = new.lines(base, new_stop - base + after)
+    if is_cancelled(): return None
+
+    n = max(len(old_lines), len(new_lines)) if context is None else context
+    out = ["--- a", "+++ b"]
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for group in matcher.get_grouped_opcodes(n):
+        first, last = group[0], group[-1]
+        out.append(f"@@ -{_format_range(base + first[1], last[2] - first[1])} "
+                   f"+{_format_range(base + first[3], last[4] - first[3])} @@")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                out.extend(" " + line for line in old_lines[i1:i2])
+                continue
+            if tag in ("replace", "delete"): out.extend("-" + line for line in old_lines[i1:i2])
+            if tag in ("replace", "insert"): out.extend("+" + line for line in new_lines[j1:j2])
+    if len(out) == 2: return ["[줄바꿈 문자만 다릅니다]"]
+    return notes + out
+
+
+# --- 미리보기 (내용 뷰 + diff) ---
+class Preview(NamedTuple):
+    view: ContentView | None    # None이면 message만 표시
+    diff: list[str]
+    message: str | None = None
+
+
+class PreviewCache:
+    """(prev_hash, hash, context)를 키로 하는 미리보기 LRU 캐시.
+
+    diff가 차지하는 메모리와 함께 개수도 제한합니다. 미리보기마다 내용 뷰를 붙잡고 있으므로,
+    개수를 묶어 두어야 밀려난 뷰의 임시 파일이 계속 쌓이지 않습니다.
+    """
+
+    def __init__(self, max_bytes: int = PREVIEW_CACHE_BYTES, max_entries: int = VIEW_CACHE_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.used_bytes = 0
+        self._items: OrderedDict[tuple, tuple[Preview, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Preview | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None: return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key: tuple, preview: Preview):
+        size = sum(len(line) for line in preview.diff) + 64 * len(preview.diff)
+        if size > self.max_bytes: return
+        with self._lock:
+            if key in self._items: self.used_bytes -= self._items.pop(key)[1]
+            self._items[key] = (preview, size)
+            self.used_bytes += size
+            while self.used_bytes > self.max_bytes or len(self._items) > self.max_entries:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.used_bytes -= evicted
+
+
+def build_preview(info: TimelineRow, filepath: Path, views: ViewCache, context: int | None = DIFF_CONTEXT,
+                  is_cancelled=lambda: False) -> Preview | None:
+    """행 하나의 내용 뷰와 이전 버전 대비 diff를 만듭니다. 취소되면 None을 반환합니다."""
+    try:
+        view = open_file_view(filepath) if info.commit_type == "temp" else views.get(info.object_hash, is_cancelled)
+    except (OSError, ValueError, zlib.error):
+        return Preview(None, [], "[내용을 읽을 수 없습니다 (파일이 없거나 객체가 없거나 손상됨)]")
+    if view is None: return None
+    view.prepare()
+    if not info.prev_hash: return Preview(view, ["[첫 커밋이므로 이전 버전 없음]"])
+    try:
+        prev_view = views.get(info.prev_hash, is_cancelled)
+        if prev_view is None: return None
+        diff = build_diff(prev_view, view, context, is_cancelled)
+    except (OSError, ValueError, zlib.error):
+        return Preview(view, ["[이전 버전을 읽을 수 없습니다]"])
+    if diff is None: return None
+    return Preview(view, diff)
@@ -0,0 +1,122 @@
+# filegit_search.py
+from __future__ import annotations
+
+import sqlite3
+import zlib
+from typing import NamedTuple
+
+from filegit_store import iter_object_chunks
+
+# 이보다 큰 객체는 색인하지 않습니다. (로그나 덤프처럼 검색할 일이 드문 파일들)
+SEARCH_MAX_BYTES = 4 * 1024 * 1024
+INDEX_BATCH_SIZE = 64
+# trigram 토크나이저는 세 글자보다 짧은 패턴을 색인으로 찾을 수 없습니다.
+MIN_PATTERN_LENGTH = 3
+
+# search_objects.state
+STATE_PENDING, STATE_INDEXED, STATE_SKIPPED = 0, 1, 2
+
+
+class SearchHit(NamedTuple):
+    path: str
+    commit_id: int
+    timestamp: int
+    commit_type: str
+    message: str | None
+    object_hash: str
+
+
+def read_text(object_hash: str) -> str | None:
+    """객체 내용을 텍스트로 읽습니다. 너무 크거나 UTF-8 텍스트가 아니면 None."""
+    buf = bytearray()
+    chunks = iter_object_chunks(object_hash)
+    try:
+        for chunk in chunks:
+            buf += chunk
+            if len(buf) > SEARCH_MAX_BYTES: return None
+    finally:
+        chunks.close()
+    if b"\0" in buf: return None
+    try:
+        return buf.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def index_pending(conn: sqlite3.Connection, batch_size: int = INDEX_BATCH_SIZE, max_batches: int | None = None) -> int:
+    """아직 색인하지 않은 객체를 색인하고, 처리한 객체 수를 반환합니다.
+
+    객체는 트랜잭션 밖에서 읽고, 배치마다 짧은 트랜잭션 하나로 기록합니다. 텍스트가
+    아니거나 읽을 수 없는 객체는 건너뛴 것(STATE_SKIPPED)으로 표시해 다시 읽지 않습니다.
+    """
+    processed, last_id, batches = 0, 0, 0
+    while max_batches is None or batches < max_batches:
+        rows = conn.execute("SELECT id, object_hash FROM search_objects WHERE state = 0 AND id > ? ORDER BY id LIMIT ?",
+                            (last_id, batch_size)).fetchall()
+        if not rows: break
+        last_id, batches = rows[-1][0], batches + 1
+        texts = []
+        for row_id, object_hash in rows:
+            try:
+                texts.append((row_id, read_text(object_hash)))
+            except (OSError, ValueError, zlib.error):
+                texts.append((row_id, None))
+        with conn:
+            for row_id, text in texts:
+                state = STATE_SKIPPED if text is None else STATE_INDEXED
+                # 다른 프로세스(데몬, 다른 grep)가 먼저 색인했으면 다시 넣지 않습니다.
+                if not conn.execute("UPDATE search_objects SET state = ? WHERE id = ? AND state = 0",
+                                    (state, row_id)).rowcount: continue
+                if text is not None: conn.execute("INSERT INTO search_text (rowid, content) VALUES (?, ?)",
+                                                  (row_id, text))
+        processed += len(rows)
+    return processed
+
+
+def pending_count(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COUNT(*) FROM search_objects WHERE state = 0").fetchone()[0]
+
+
+def _match_query(pattern: str) -> str:
+    if len(pattern) < MIN_PATTERN_LENGTH:
+        raise ValueError(f"search pattern must be at least {MIN_PATTERN_LENGTH} characters")
+    # 따옴표로 감싼 구(phrase)로 넘겨, FTS5 쿼리 문법이 아닌 글자 그대로 찾습니다.
+    return '"' + pattern.replace('"', '""') + '"'
+
+
+def search(conn: sqlite3.Connection, pattern: str, file_path: str | None = None, limit: int = 100) -> list[SearchHit]:
+    """pattern이 들어 있는 버전의 커밋들을 최신순으로 반환합니다. 대소문자는 구분하지 않습니다.
+
+    색인에서 pattern을 가진 객체를 찾고, 그 객체를 가리키는 커밋을 object_hash 인덱스로
+    찾으므로 객체 저장소는 읽지 않습니다. 대기 중인 객체는 결과에 없으니 먼저 index_pending()을
+    부르세요.
+    """
+    scope, params = "", []
+    if file_path is not None:
+        scope, params = "AND c.path_id = (SELECT id FROM paths WHERE path = ?)", [file_path]
+    # 찾은 객체 목록을 먼저 한 번 만들고 커밋을 찾습니다. 그냥 조인하면 파일을 지정했을 때
+    # 그 파일의 커밋마다 MATCH를 다시 평가하는 계획이 나와 훨씬 느립니다.
+    rows = conn.execute(f"""
+                        SELECT p.path, c.id, c.timestamp, c.type, c.message, c.object_hash
+                        FROM commits c
+                                 JOIN paths p ON p.id = c.path_id
+                        WHERE c.object_hash IN (SELECT o.object_hash
+                                                FROM search_text s
+                                                         JOIN search_objects o ON o.id = s.rowid
+                                                WHERE search_text MATCH ?) {scope}
+                        ORDER BY c.timestamp DESC, c.id DESC
+                        LIMIT ?
+                        """, (_match_query(pattern), *params, limit))
+    return [SearchHit(*row) for row in rows]
+
+
+def matching_lines(object_hash: str, pattern: str, max_lines: int | None = None) -> list[tuple[int, str]]:
+    """객체에서 pattern이 든 줄들: (줄 번호, 줄). 색인과 같이 대소문자를 구분하지 않습니다."""
+    text = read_text(object_hash)
+    if text is None: return []
+    needle, found = pattern.lower(), []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        if needle in line.lower():
+            found.append((lineno, line))
+            if max_lines is not None and len(found) >= max_lines: break
+    return found
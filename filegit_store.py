@@ -0,0 +1,875 @@
+# filegit_store.py
+from __future__ import annotations
+
+import difflib
+import hashlib
+import io
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import NamedTuple
+
+from filegit_config import FILEGIT_DIR
+from filegit_metrics import METRICS
+
+# --- 설정 (메인 스크립트 및 데몬과 공유) ---
+OBJECTS_DIR = FILEGIT_DIR / "objects"
+PACKS_DIR = OBJECTS_DIR / "pack"
+CHUNKS_DIR = OBJECTS_DIR / "chunks"
+
+# 느슨한 객체와 청크는 해시 앞 두 글자로 나눈 하위 디렉토리(objects/ab/cdef...)에 둡니다.
+# 예전의 평평한 배치(objects/abcdef...)에 있는 객체도 migrate_layout()이 옮기기 전까지 그대로 읽습니다.
+SHARD_WIDTH = 2
+
+# 델타 체인 최대 길이: 오래된 버전을 읽을 때 적용해야 하는 델타 수의 상한
+DEFAULT_MAX_CHAIN = 10
+# 이보다 큰 객체는 델타를 만들지 않고 통째로 저장합니다.
+MAX_DELTA_SIZE = 32 * 1024 * 1024
+
+# 느슨한 객체 헤더: 매직 + 코덱 ID 1바이트. 헤더가 없는 객체는 예전 방식의 무압축 객체입니다.
+OBJECT_MAGIC = b"FGO\0"
+CODEC_RAW, CODEC_ZLIB = 0, 1
+DEFAULT_CODEC = CODEC_ZLIB
+_READ_SIZE = 1024 * 1024
+# 이보다 작은 파일은 메모리에서 해시를 먼저 구해, 이미 있는 객체면 쓰기 자체를 생략합니다.
+SMALL_OBJECT_LIMIT = 8 * 1024 * 1024
+
+# 청크 객체: 이보다 큰 파일은 내용 기반 청크로 나눠 청크마다 한 번만 저장하고,
+# 버전은 청크 목록(매니페스트)으로 남깁니다. 0이면 사용하지 않습니다.
+DEFAULT_CHUNK_THRESHOLD = 64 * 1024 * 1024
+MANIFEST_MAGIC = b"FGM\0"
+# 최소 크기 이후 바이트마다 경계가 나올 확률이 1/2^14이므로 평균 청크는 약 64KB입니다.
+CHUNK_MIN_SIZE = 48 * 1024
+CHUNK_MAX_SIZE = 256 * 1024
+_MANIFEST_ENTRY = struct.Struct(">32sI")  # chunk hash, chunk size
+
+# 객체 fsync 정책: none(하지 않음) / batched(DB 커밋 직전에 모아서) / always(객체마다)
+FSYNC_NONE, FSYNC_BATCHED, FSYNC_ALWAYS = "none", "batched", "always"
+FSYNC_POLICIES = (FSYNC_NONE, FSYNC_BATCHED, FSYNC_ALWAYS)
+
+PACK_MAGIC = b"FGPK"
+IDX_MAGIC = b"FGIX"
+PACK_VERSION = 1
+_HEADER = struct.Struct(">4sII")        # magic, version, count
+_ENTRY = struct.Struct(">B32sQ")        # kind, base hash, payload length
+_IDX_ENTRY = struct.Struct(">32sQ")     # object hash, entry offset
+KIND_FULL, KIND_DELTA = 0, 1
+_OP_COPY, _OP_INSERT = 1, 2
+
+
+# --- 델타 인코딩 ---
+def _put_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _get_varint(data: bytes, pos: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80: return value, pos
+        shift += 7
+
+
+def make_delta(base: bytes, target: bytes) -> bytes:
+    """base로부터 target을 재구성하는 copy/insert 델타를 만듭니다. (줄 단위 비교)"""
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    offsets = [0]
+    for line in base_lines: offsets.append(offsets[-1] + len(line))
+
+    out = bytearray()
+    _put_varint(out, len(base))
+    _put_varint(out, len(target))
+    target_pos = [0]
+    for line in target_lines: target_pos.append(target_pos[-1] + len(line))
+
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            out.append(_OP_COPY)
+            _put_varint(out, offsets[i1])
+            _put_varint(out, offsets[i2] - offsets[i1])
+        elif j2 > j1:
+            chunk = target[target_pos[j1]:target_pos[j2]]
+            out.append(_OP_INSERT)
+            _put_varint(out, len(chunk))
+            out += chunk
+    return bytes(out)
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """make_delta로 만든 델타를 base에 적용합니다."""
+    base_size, pos = _get_varint(delta, 0)
+    target_size, pos = _get_varint(delta, pos)
+    if base_size != len(base): raise ValueError("delta base size mismatch")
+    out = bytearray()
+    while pos < len(delta):
+        op = delta[pos]
+        pos += 1
+        if op == _OP_COPY:
+            offset, pos = _get_varint(delta, pos)
+            length, pos = _get_varint(delta, pos)
+            out += base[offset:offset + length]
+        elif op == _OP_INSERT:
+            length, pos = _get_varint(delta, pos)
+            out += delta[pos:pos + length]
+            pos += length
+        else:
+            raise ValueError(f"unknown delta opcode: {op}")
+    if len(out) != target_size: raise ValueError("delta target size mismatch")
+    return bytes(out)
+
+
+# --- 팩 파일 ---
+class Pack:
+    """팩 파일 하나와 그 인덱스(.idx)."""
+
+    def __init__(self, idx_path: Path):
+        self.idx_path = idx_path
+        self.pack_path = idx_path.with_suffix(".pack")
+        self.offsets: dict[str, int] = {}
+        data = idx_path.read_bytes()
+        magic, version, count = _HEADER.unpack_from(data, 0)
+        if magic != IDX_MAGIC or version != PACK_VERSION: raise ValueError(f"invalid pack index: {idx_path}")
+        pos = _HEADER.size
+        for _ in range(count):
+            raw_hash, offset = _IDX_ENTRY.unpack_from(data, pos)
+            self.offsets[raw_hash.hex()] = offset
+            pos += _IDX_ENTRY.size
+
+    def read_entry(self, object_hash: str) -> tuple[int, str | None, bytes]:
+        with open(self.pack_path, "rb") as f:
+            f.seek(self.offsets[object_hash])
+            kind, raw_base, length = _ENTRY.unpack(f.read(_ENTRY.size))
+            payload = zlib.decompress(f.read(length))
+        return kind, (raw_base.hex() if kind == KIND_DELTA else None), payload
+
+
+class PackStore:
+    """packs 디렉토리의 모든 팩을 하나의 객체 조회 공간으로 묶습니다."""
+
+    def __init__(self, pack_dir: Path):
+        self.pack_dir = pack_dir
+        self.packs: list[Pack] = []
+        self._scanned_mtime = None
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False):
+        with self._lock:
+            try:
+                mtime = self.pack_dir.stat().st_mtime_ns
+            except FileNotFoundError:
+                self.packs, self._scanned_mtime = [], None
+                return
+            if not force and mtime == self._scanned_mtime: return
+            self.packs = [Pack(p) for p in sorted(self.pack_dir.glob("pack-*.idx"))]
+            self._scanned_mtime = mtime
+
+    def find(self, object_hash: str) -> Pack | None:
+        self.refresh()
+        for pack in self.packs:
+            if object_hash in pack.offsets: return pack
+        return None
+
+    def _read_entry(self, object_hash: str) -> tuple[int, str | None, bytes] | None:
+        pack = self.find(object_hash)
+        if pack is None: return None
+        try:
+            return pack.read_entry(object_hash)
+        except FileNotFoundError:
+            # repack 도중 팩이 교체된 경우: 목록을 다시 읽고 한 번 더 시도합니다.
+            self.refresh(force=True)
+            pack = self.find(object_hash)
+            return pack.read_entry(object_hash) if pack else None
+
+    def read(self, object_hash: str) -> bytes | None:
+        # 델타 체인을 베이스까지 따라간 뒤, 거꾸로 델타를 적용합니다.
+        deltas = []
+        current = object_hash
+        while True:
+            entry = self._read_entry(current)
+            if entry is None:
+                if not deltas: return None
+                raise FileNotFoundError(f"missing delta base {current} for {object_hash}")
+            kind, base_hash, payload = entry
+            if kind == KIND_FULL: break
+            deltas.append(payload)
+            current = base_hash
+        for delta in reversed(deltas): payload = apply_delta(payload, delta)
+        return payload
+
+
+_packs = PackStore(PACKS_DIR)
+
+
+# --- 코덱 ---
+class _RawCodec:
+    def compress(self, data: bytes) -> bytes: return data
+
+    def decompress(self, data: bytes) -> bytes: return data
+
+    def flush(self) -> bytes: return b""
+
+
+# 코덱 ID -> (이름, 압축기 생성 함수, 해제기 생성 함수)
+# 압축기는 compress()/flush(), 해제기는 decompress()(+선택적으로 flush())를 제공해야 합니다.
+CODECS = {
+    CODEC_RAW: ("raw", _RawCodec, _RawCodec),
+    CODEC_ZLIB: ("zlib", lambda: zlib.compressobj(6), zlib.decompressobj),
+}
+
+
+def register_codec(codec_id: int, name: str, compressor_factory, decompressor_factory):
+    """새 코덱을 등록합니다. (예: lzma, zstd)"""
+    if not 0 <= codec_id <= 255: raise ValueError("codec id must fit in one byte")
+    CODECS[codec_id] = (name, compressor_factory, decompressor_factory)
+
+
+def codec_by_name(name: str) -> int:
+    for codec_id, (codec_name, _, _) in CODECS.items():
+        if codec_name == name: return codec_id
+    raise KeyError(f"unknown codec: {name}")
+
+
+def _read_codec(f) -> int | None:
+    """객체 헤더를 읽어 코덱 ID를 반환합니다. 헤더가 없으면 위치를 되돌리고 None을 반환합니다."""
+    header = f.read(len(OBJECT_MAGIC) + 1)
+    if len(header) == len(OBJECT_MAGIC) + 1 and header.startswith(OBJECT_MAGIC): return header[-1]
+    f.seek(0)
+    return None
+
+
+def _write_encoded(src, dest, codec: int) -> int:
+    """src 스트림을 codec으로 압축해 헤더와 함께 dest에 씁니다. 원본 바이트 수를 반환합니다."""
+    compressor = CODECS[codec][1]()
+    dest.write(OBJECT_MAGIC + bytes([codec]))
+    size = 0
+    while chunk := src.read(_READ_SIZE):
+        size += len(chunk)
+        dest.write(compressor.compress(chunk))
+    dest.write(compressor.flush())
+    return size
+
+
+# --- 객체 배치 (하위 디렉토리로 나눈 배치 + 예전의 평평한 배치) ---
+def _sharded(base: Path, object_hash: str) -> Path:
+    return base / object_hash[:SHARD_WIDTH] / object_hash[SHARD_WIDTH:]
+
+
+def _candidates(base: Path, object_hash: str) -> tuple[Path, Path, Path]:
+    # 새 배치, 평평한 배치, 그리고 그 사이 migrate_layout()이 옮겼을 경우를 위해 다시 새 배치.
+    path = _sharded(base, object_hash)
+    return path, base / object_hash, path
+
+
+def _find(base: Path, object_hash: str) -> Path | None:
+    for path in _candidates(base, object_hash):
+        if path.exists(): return path
+    return None
+
+
+def _open(base: Path, object_hash: str):
+    for path in _candidates(base, object_hash):
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            pass
+    raise FileNotFoundError(f"object not found: {object_hash}")
+
+
+def _remove(base: Path, object_hash: str):
+    for path in _candidates(base, object_hash)[:2]: path.unlink(missing_ok=True)
+
+
+def _iter_stored(base: Path):
+    if not base.exists(): return
+    for entry in os.scandir(base):
+        if entry.name.startswith("."): continue
+        if len(entry.name) == 64 and entry.is_file():
+            yield entry.name
+        elif len(entry.name) == SHARD_WIDTH and entry.is_dir():
+            for sub in os.scandir(entry.path):
+                if len(sub.name) == 64 - SHARD_WIDTH and not sub.name.startswith(".") and sub.is_file():
+                    yield entry.name + sub.name
+
+
+def _iter_flat(base: Path):
+    if not base.exists(): return
+    for entry in os.scandir(base):
+        if len(entry.name) == 64 and not entry.name.startswith(".") and entry.is_file(): yield entry.name
+
+
+def migrate_layout(limit: int | None = None) -> dict:
+    """평평한 배치로 남은 느슨한 객체와 청크를 하위 디렉토리로 옮깁니다.
+
+    같은 파일 시스템 안에서 이름만 바꾸므로 객체마다 원자적이고, 읽는 쪽은 두 자리를 모두
+    보므로 데몬이 스냅샷을 쓰는 중에도 옮길 수 있습니다. limit개를 옮기면 멈추므로 조금씩
+    나눠 부를 수 있고, 중단되어도 다시 부르면 이어서 진행됩니다. 옮긴 수(objects, chunks)를 반환합니다.
+    """
+    stats = {"objects": 0, "chunks": 0}
+    for base, key in ((OBJECTS_DIR, "objects"), (CHUNKS_DIR, "chunks")):
+        # 옮긴 항목은 목록에서 빠지므로, 나눠 부를 때도 매번 앞부분만 훑으면 됩니다.
+        for object_hash in _iter_flat(base):
+            if limit is not None and stats["objects"] + stats["chunks"] >= limit: return stats
+            flat, path = base / object_hash, _sharded(base, object_hash)
+            path.parent.mkdir(exist_ok=True)
+            try:
+                # 그 사이 같은 객체가 새 배치로 저장됐으면 내용이 같으므로 예전 파일만 지웁니다.
+                if path.exists(): flat.unlink()
+                else: os.replace(flat, path)
+            except FileNotFoundError:
+                continue
+            stats[key] += 1
+    return stats
+
+
+# --- 객체 읽기/쓰기 (느슨한 객체 + 팩 객체) ---
+def loose_path(object_hash: str) -> Path:
+    """느슨한 객체를 새로 쓸 자리. 이미 있는 객체의 위치는 find_loose()로 찾습니다."""
+    return _sharded(OBJECTS_DIR, object_hash)
+
+
+def find_loose(object_hash: str) -> Path | None:
+    return _find(OBJECTS_DIR, object_hash)
+
+
+def remove_loose(object_hash: str):
+    _remove(OBJECTS_DIR, object_hash)
+
+
+def has_object(object_hash: str) -> bool:
+    return find_loose(object_hash) is not None or _packs.find(object_hash) is not None
+
+
+def in_pack(object_hash: str) -> bool:
+    return _packs.find(object_hash) is not None
+
+
+def iter_packed_objects():
+    _packs.refresh(force=True)
+    for pack in _packs.packs: yield from pack.offsets
+
+
+def iter_object_chunks(object_hash: str):
+    """객체 내용을 압축을 풀면서 조각 단위로 돌려줍니다."""
+    try:
+        f = _open(OBJECTS_DIR, object_hash)
+    except FileNotFoundError:
+        data = _packs.read(object_hash)
+        if data is None: raise FileNotFoundError(f"object not found: {object_hash}")
+        yield data
+        return
+    with f:
+        if f.read(len(MANIFEST_MAGIC)) == MANIFEST_MAGIC:
+            # 청크 객체: 매니페스트 순서대로 청크를 하나씩 풀어 이어 붙입니다.
+            for chunk_hash, _ in _iter_manifest(f):
+                try:
+                    chunk_file = _open(CHUNKS_DIR, chunk_hash)
+                except FileNotFoundError:
+                    raise FileNotFoundError(f"chunk {chunk_hash} of object {object_hash} is missing") from None
+                with chunk_file:
+                    yield from _iter_encoded(chunk_file, chunk_hash)
+            return
+        f.seek(0)
+        yield from _iter_encoded(f, object_hash)
+
+
+def raw_object_location(object_hash: str) -> tuple[Path, int] | None:
+    """압축되지 않은 느슨한 객체면 (파일 경로, 내용이 시작하는 위치). 그대로 mmap할 수 있습니다."""
+    try:
+        with _open(OBJECTS_DIR, object_hash) as f:
+            if f.read(len(MANIFEST_MAGIC)) == MANIFEST_MAGIC: return None
+            f.seek(0)
+            codec = _read_codec(f)
+            if codec is None: return Path(f.name), 0
+            return (Path(f.name), f.tell()) if codec == CODEC_RAW else None
+    except FileNotFoundError:
+        return None
+
+
+def object_size(object_hash: str) -> int:
+    """객체 내용의 크기. 청크 객체와 무압축 객체는 내용을 풀지 않고 구합니다."""
+    try:
+        f = _open(OBJECTS_DIR, object_hash)
+    except FileNotFoundError:
+        f = None
+    if f is not None:
+        with f:
+            if f.read(len(MANIFEST_MAGIC)) == MANIFEST_MAGIC: return sum(size for _, size in _iter_manifest(f))
+            f.seek(0)
+            codec = _read_codec(f)
+            if codec is None or codec == CODEC_RAW: return os.fstat(f.fileno()).st_size - f.tell()
+    return sum(len(chunk) for chunk in iter_object_chunks(object_hash))
+
+
+def read_object(object_hash: str) -> bytes:
+    """느슨한 객체와 팩 객체를 구분하지 않고 압축을 푼 객체 내용을 반환합니다."""
+    return b"".join(iter_object_chunks(object_hash))
+
+
+# --- 내용 기반 청크 (큰 파일/바이너리 파일의 중복 제거) ---
+# 바이트마다 파이썬에서 롤링 해시를 돌리면 64MB에 몇 초씩 GIL을 잡으므로, 바이트를 네 글자
+# 알파벳으로 바꾸는 표(bytes.translate)와 고정된 일곱 글자 앵커 찾기(bytes.find)로 경계를
+# 정합니다. 둘 다 C에서 돌고, 경계는 그 자리의 일곱 바이트로만 정해지므로 파일 중간에 바이트가
+# 끼어들거나 빠져도 그 부근의 청크만 달라집니다. (앵커가 나올 확률 4^-7 = 1/2^14)
+# 표는 청크 경계가 실행마다 같아야 하므로 고정된 값에서 만듭니다.
+_CHUNK_TABLE = bytes(b"acgt"[hashlib.sha256(bytes([i])).digest()[0] >> 6] for i in range(256))
+_CHUNK_ANCHOR = b"gattaca"
+# 경계가 자주 나오므로 처음에는 최소 크기 뒤의 이만큼만 바꿔 찾아봅니다.
+_CHUNK_PROBE = 32 * 1024
+
+
+def _find_cut(buf: bytearray, start: int, end: int) -> int:
+    """buf[start:end]에서 청크 하나가 끝나는 위치. end는 start + CHUNK_MAX_SIZE를 넘지 않습니다."""
+    pos = start + CHUNK_MIN_SIZE
+    if pos >= end: return end
+    for lo, hi in ((pos, min(pos + _CHUNK_PROBE, end)), (pos + _CHUNK_PROBE - len(_CHUNK_ANCHOR) + 1, end)):
+        if lo >= hi: break
+        i = buf[lo:hi].translate(_CHUNK_TABLE).find(_CHUNK_ANCHOR)
+        if i >= 0: return lo + i + len(_CHUNK_ANCHOR)
+    return end
+
+
+def split_chunks(f):
+    """f(readinto를 지원하는 스트림)를 내용 기반 청크로 나눠 bytes로 하나씩 돌려줍니다.
+
+    고정 크기 버퍼에 readinto로 읽어 들이므로 메모리는 청크 최대 크기의 두 배면 충분하고,
+    작업 중인 파일을 mmap하지 않으므로 읽는 도중 파일이 줄어도 SIGBUS가 나지 않습니다.
+    """
+    buf = bytearray(CHUNK_MAX_SIZE * 2)
+    view = memoryview(buf)
+    start = end = 0
+    eof = False
+    try:
+        while True:
+            if not eof and end - start < CHUNK_MAX_SIZE:
+                # 남은 부분을 앞으로 당기고 뒤를 채웁니다.
+                buf[:end - start] = buf[start:end]
+                start, end = 0, end - start
+                while end < len(buf) and not eof:
+                    n = f.readinto(view[end:])
+                    if n: end += n
+                    else: eof = True
+            if start == end: return
+            with METRICS.timer("store.chunking"):
+                cut = _find_cut(buf, start, min(start + CHUNK_MAX_SIZE, end))
+            yield bytes(view[start:cut])
+            start = cut
+    finally:
+        view.release()
+
+
+def chunk_path(chunk_hash: str) -> Path:
+    """청크를 새로 쓸 자리. 이미 있는 청크의 위치는 find_chunk()로 찾습니다."""
+    return _sharded(CHUNKS_DIR, chunk_hash)
+
+
+def find_chunk(chunk_hash: str) -> Path | None:
+    return _find(CHUNKS_DIR, chunk_hash)
+
+
+def remove_chunk(chunk_hash: str):
+    _remove(CHUNKS_DIR, chunk_hash)
+
+
+def iter_chunks():
+    yield from _iter_stored(CHUNKS_DIR)
+
+
+def iter_chunk_data(chunk_hash: str):
+    """청크 하나의 내용을 압축을 풀면서 조각 단위로 돌려줍니다."""
+    with _open(CHUNKS_DIR, chunk_hash) as f: yield from _iter_encoded(f, chunk_hash)
+
+
+def is_chunked(object_hash: str) -> bool:
+    try:
+        with _open(OBJECTS_DIR, object_hash) as f: return f.read(len(MANIFEST_MAGIC)) == MANIFEST_MAGIC
+    except FileNotFoundError:
+        return False
+
+
+def _iter_manifest(f):
+    while entry := f.read(_MANIFEST_ENTRY.size):
+        raw_hash, size = _MANIFEST_ENTRY.unpack(entry)
+        yield raw_hash.hex(), size
+
+
+def manifest_chunks(object_hash: str) -> list[str]:
+    """청크 객체가 가리키는 청크 해시 목록. 청크 객체가 아니거나 없으면 빈 목록입니다."""
+    try:
+        with _open(OBJECTS_DIR, object_hash) as f:
+            if f.read(len(MANIFEST_MAGIC)) != MANIFEST_MAGIC: return []
+            return [chunk_hash for chunk_hash, _ in _iter_manifest(f)]
+    except FileNotFoundError:
+        return []
+
+
+def _iter_encoded(f, name: str):
+    codec = _read_codec(f)
+    if codec is None:
+        while chunk := f.read(_READ_SIZE): yield chunk
+        return
+    if codec not in CODECS: raise ValueError(f"unknown codec {codec} in object {name}")
+    decompressor = CODECS[codec][2]()
+    while chunk := f.read(_READ_SIZE):
+        out = decompressor.decompress(chunk)
+        if out: yield out
+    flush = getattr(decompressor, "flush", None)
+    if flush and (out := flush()): yield out
+
+
+class CaptureResult(NamedTuple):
+    object_hash: str
+    size: int
+    stored: bool                # 새 객체를 썼는지 (False면 이미 있던 객체)
+    stat: os.stat_result        # 읽기 시작 전의 stat
+    hashed_at_ns: int           # 읽기 시작 시각 (해시 캐시의 racily clean 판정용)
+    stable: bool                # 읽는 동안 파일이 바뀌지 않았는지
+    chunks: tuple[str, ...] = ()  # 청크 객체면 매니페스트의 청크 해시들 (DB의 청크 참조 기록용)
+
+
+_pending_sync: set[Path] = set()
+_pending_lock = threading.Lock()
+
+
+def _tmp_object_path() -> Path:
+    return OBJECTS_DIR / f".capture.{os.getpid()}.{threading.get_ident()}.{time.monotonic_ns()}.tmp"
+
+
+def _touch(path: Path | None):
+    """이미 있는 객체를 다시 쓰는 대신 mtime을 갱신합니다. GC는 최근에 쓰인 객체를 지우지 않습니다."""
+    if path is None: return
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def _place(tmp_path: Path, final_path: Path, fsync: str):
+    if not final_path.parent.is_dir():
+        final_path.parent.mkdir(exist_ok=True)
+        # 새 하위 디렉토리의 항목도 디스크에 남아야 그 안의 객체를 찾을 수 있습니다.
+        if fsync != FSYNC_NONE: _fsync_path(final_path.parent.parent)
+    os.replace(tmp_path, final_path)
+    if fsync == FSYNC_ALWAYS:
+        _fsync_path(final_path.parent)
+    elif fsync == FSYNC_BATCHED:
+        with _pending_lock: _pending_sync.add(final_path)
+
+
+def _install(tmp_path: Path, object_hash: str, fsync: str) -> bool:
+    """임시 파일을 객체 자리로 옮깁니다. 그 사이 같은 객체가 생겼으면 임시 파일을 버립니다."""
+    if has_object(object_hash):
+        tmp_path.unlink(missing_ok=True)
+        _touch(find_loose(object_hash))
+        return False
+    _place(tmp_path, loose_path(object_hash), fsync)
+    return True
+
+
+def _write_tmp(chunks, codec: int, fsync: str, header: bytes | None = None) -> Path:
+    tmp_path = _tmp_object_path()
+    compressor = CODECS[codec][1]() if header is None else _RawCodec()
+    try:
+        with open(tmp_path, "wb") as dest:
+            dest.write(OBJECT_MAGIC + bytes([codec]) if header is None else header)
+            for chunk in chunks: dest.write(compressor.compress(chunk))
+            dest.write(compressor.flush())
+            if fsync == FSYNC_ALWAYS:
+                dest.flush()
+                os.fsync(dest.fileno())
+            METRICS.inc("store.bytes_written", dest.tell())
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return tmp_path
+
+
+def _store_chunked(f, codec: int, fsync: str) -> tuple[str, bool, tuple[str, ...], int]:
+    """스트림 f를 청크로 나눠 저장하고 매니페스트를 씁니다. (객체 해시, 새로 썼는지, 청크 해시들, 읽은 크기)"""
+    CHUNKS_DIR.mkdir(parents=True, exist_ok=True)
+    hasher = hashlib.sha256()
+    manifest = bytearray()
+    chunk_hashes = []
+    size = 0
+    for chunk in split_chunks(f):
+        with METRICS.timer("store.hash"):
+            hasher.update(chunk)
+            chunk_hash = hashlib.sha256(chunk).hexdigest()
+        if existing := find_chunk(chunk_hash):
+            _touch(existing)
+            METRICS.inc("store.bytes_deduplicated", len(chunk))
+        else:
+            with METRICS.timer("store.write"):
+                _place(_write_tmp([chunk], codec, fsync), chunk_path(chunk_hash), fsync)
+        chunk_hashes.append(chunk_hash)
+        manifest += _MANIFEST_ENTRY.pack(bytes.fromhex(chunk_hash), len(chunk))
+        size += len(chunk)
+    object_hash = hasher.hexdigest()
+    chunk_hashes = tuple(chunk_hashes)
+    if has_object(object_hash):
+        _touch(find_loose(object_hash))
+        return object_hash, False, chunk_hashes, size
+    tmp_path = _write_tmp([bytes(manifest)], codec, fsync, header=MANIFEST_MAGIC)
+    return object_hash, _install(tmp_path, object_hash, fsync), chunk_hashes, size
+
+
+def capture_file(filepath: Path, codec: int = DEFAULT_CODEC, fsync: str = FSYNC_NONE,
+                 chunk_threshold: int = DEFAULT_CHUNK_THRESHOLD) -> CaptureResult | None:
+    """파일을 한 번만 읽으면서 해시를 구하고 객체로 저장합니다.
+
+    작은 파일은 메모리에 읽어 해시를 먼저 구하므로 이미 있는 객체면 아무것도 쓰지
+    않습니다. 큰 파일은 OBJECTS_DIR 안의 임시 파일로 흘려 쓰면서 해시를 구한 뒤
+    이름을 바꿔 넣으므로, 저장된 객체의 내용은 언제나 그 이름(해시)과 일치합니다.
+    chunk_threshold 이상인 파일은 청크 객체로 저장해 바뀐 부분의 청크만 새로 씁니다.
+    파일이 없으면 None을 반환합니다.
+    """
+    OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    hashed_at_ns = time.time_ns()
+    try:
+        f = open(filepath, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        st = os.fstat(f.fileno())
+        METRICS.inc("store.bytes_captured", st.st_size)
+        if chunk_threshold and st.st_size >= chunk_threshold:
+            object_hash, stored, chunk_hashes, size = _store_chunked(f, codec, fsync)
+            return CaptureResult(object_hash, size, stored, st, hashed_at_ns,
+                                 size == st.st_size and _unchanged(filepath, st), chunk_hashes)
+        hasher = hashlib.sha256()
+        head = f.read(SMALL_OBJECT_LIMIT + 1)
+        if len(head) <= SMALL_OBJECT_LIMIT:
+            object_hash, stored = _store_small(head, codec, fsync)
+            size = len(head)
+        else:
+            size = 0
+
+            def chunks():
+                nonlocal size
+                chunk = head
+                while chunk:
+                    size += len(chunk)
+                    hasher.update(chunk)
+                    yield chunk
+                    chunk = f.read(_READ_SIZE)
+
+            # 해시와 쓰기가 한 번의 읽기에 섞여 있으므로 함께 잽니다.
+            with METRICS.timer("store.hash_write"):
+                tmp_path = _write_tmp(chunks(), codec, fsync)
+                object_hash = hasher.hexdigest()
+                stored = _install(tmp_path, object_hash, fsync)
+            if not stored: METRICS.inc("store.bytes_deduplicated", size)
+    # 읽은 크기가 처음 stat과 다르면 읽는 도중 파일이 바뀐 것입니다.
+    return CaptureResult(object_hash, size, stored, st, hashed_at_ns, size == st.st_size and _unchanged(filepath, st))
+
+
+def _store_small(data: bytes, codec: int, fsync: str) -> tuple[str, bool]:
+    """메모리에 있는 내용의 해시를 먼저 구해, 이미 있는 객체면 쓰지 않습니다. (객체 해시, 새로 썼는지)"""
+    with METRICS.timer("store.hash"):
+        object_hash = hashlib.sha256(data).hexdigest()
+    if has_object(object_hash):
+        _touch(find_loose(object_hash))
+        METRICS.inc("store.bytes_deduplicated", len(data))
+        return object_hash, False
+    with METRICS.timer("store.write"):
+        return object_hash, _install(_write_tmp([data], codec, fsync), object_hash, fsync)
+
+
+def store_bytes(data: bytes, codec: int = DEFAULT_CODEC, fsync: str = FSYNC_NONE,
+                chunk_threshold: int = DEFAULT_CHUNK_THRESHOLD) -> tuple[str, bool, tuple[str, ...]]:
+    """메모리에 있는 내용(예: 가져오는 이력의 한 버전)을 객체로 저장합니다.
+
+    capture_file()과 같은 규칙으로 저장하며 (객체 해시, 새로 썼는지, 청크 해시들)을 반환합니다.
+    """
+    OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    METRICS.inc("store.bytes_captured", len(data))
+    if chunk_threshold and len(data) >= chunk_threshold: return _store_chunked(io.BytesIO(data), codec, fsync)[:3]
+    return (*_store_small(data, codec, fsync), ())
+
+
+def _unchanged(filepath: Path, st: os.stat_result) -> bool:
+    try:
+        after = os.stat(filepath)
+    except FileNotFoundError:
+        return False
+    return (after.st_size, after.st_mtime_ns, after.st_ctime_ns) == (st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+
+
+def sync_pending():
+    """batched 정책으로 쓴 객체들을 한꺼번에 fsync합니다. 이 객체를 가리키는 DB 커밋 직전에 호출합니다."""
+    with _pending_lock:
+        paths = list(_pending_sync)
+        _pending_sync.clear()
+    if not paths: return
+    for path in paths:
+        try:
+            _fsync_path(path)
+        except FileNotFoundError:
+            pass
+    for directory in {path.parent for path in paths}: _fsync_path(directory)
+
+
+def restore_object(object_hash: str, dest: Path):
+    """객체 내용으로 dest 파일을 덮어씁니다."""
+    with open(dest, "wb") as f:
+        for chunk in iter_object_chunks(object_hash): f.write(chunk)
+
+
+def iter_loose_objects():
+    yield from _iter_stored(OBJECTS_DIR)
+
+
+def compress_store(codec: int = DEFAULT_CODEC, progress=None) -> dict:
+    """기존 무압축 느슨한 객체를 제자리에서 압축합니다.
+
+    객체마다 임시 파일에 쓴 뒤 원자적으로 교체하고, 이미 헤더가 있는 객체는
+    건너뛰므로 중간에 중단되어도 다시 실행하면 이어서 진행됩니다.
+    """
+    stats = {"objects": 0, "skipped": 0, "bytes_before": 0, "bytes_after": 0}
+    if not OBJECTS_DIR.exists(): return stats
+    for leftover in OBJECTS_DIR.glob(".*.compress.tmp"): leftover.unlink(missing_ok=True)
+
+    for object_hash in list(iter_loose_objects()):
+        path = find_loose(object_hash)
+        if path is None: continue
+        tmp_path = OBJECTS_DIR / f".{object_hash}.compress.tmp"
+        try:
+            with open(path, "rb") as src:
+                is_manifest = src.read(len(MANIFEST_MAGIC)) == MANIFEST_MAGIC
+                src.seek(0)
+                if is_manifest or _read_codec(src) is not None:
+                    stats["skipped"] += 1
+                    continue
+                with open(tmp_path, "wb") as dest:
+                    before = _write_encoded(src, dest, codec)
+                    dest.flush()
+                    os.fsync(dest.fileno())
+                    after = dest.tell()
+            os.replace(tmp_path, path)
+        except FileNotFoundError:
+            # 다른 프로세스(repack 등)가 그 사이 객체를 옮긴 경우
+            tmp_path.unlink(missing_ok=True)
+            continue
+        stats["objects"] += 1
+        stats["bytes_before"] += before
+        stats["bytes_after"] += after
+        if progress: progress(stats)
+    return stats
+
+
+# --- repack ---
+def _fsync_path(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def repack(histories, max_chain: int = DEFAULT_MAX_CHAIN, drop=()) -> dict:
+    """커밋된 객체들을 델타 압축된 팩 하나로 다시 묶습니다.
+
+    histories는 파일별 객체 해시 목록(최신순)입니다. 최신 버전은 통째로,
+    그보다 오래된 버전은 바로 다음(더 새로운) 버전에 대한 델타로 저장하며,
+    델타 체인이 max_chain에 닿으면 다시 통째로 저장합니다.
+    커밋에 연결되지 않은 느슨한 객체와, 이미 청크 단위로 중복이 제거된 청크 객체는
+    건드리지 않습니다. 기존 팩에서 drop에 든 객체(GC가 고른 참조되지 않는 객체)는 빼고 묶습니다.
+    """
+    PACKS_DIR.mkdir(parents=True, exist_ok=True)
+    _packs.refresh(force=True)
+    old_packs = list(_packs.packs)
+    loose = set(iter_loose_objects())
+
+    # (해시, 델타 베이스 후보) 순서 결정
+    order: list[tuple[str, str | None]] = []
+    seen: set[str] = set()
+    for history in histories:
+        newer = None
+        for object_hash in history:
+            if object_hash not in seen and has_object(object_hash) and not is_chunked(object_hash):
+                seen.add(object_hash)
+                order.append((object_hash, newer))
+            newer = object_hash
+    # 기존 팩에만 있고 커밋에서 참조되지 않는 객체도 잃지 않도록 그대로 옮깁니다.
+    drop = set(drop)
+    dropped = 0
+    for pack in old_packs:
+        for object_hash in pack.offsets:
+            if object_hash in drop and object_hash not in seen:
+                dropped += 1
+            elif object_hash not in seen:
+                seen.add(object_hash)
+                order.append((object_hash, None))
+
+    stats = {"objects": 0, "deltas": 0, "dropped": dropped, "bytes_before": 0, "bytes_after": 0}
+    if not order:
+        # 팩에 남길 객체가 하나도 없으면 기존 팩만 지웁니다.
+        for pack in old_packs:
+            pack.idx_path.unlink(missing_ok=True)
+            pack.pack_path.unlink(missing_ok=True)
+        _packs.refresh(force=True)
+        return stats
+
+    pack_name = "pack-" + hashlib.sha256("".join(sorted(seen)).encode()).hexdigest()[:40]
+    tmp_pack = PACKS_DIR / f".{pack_name}.pack.tmp"
+    tmp_idx = PACKS_DIR / f".{pack_name}.idx.tmp"
+    depth: dict[str, int] = {}
+    index: list[tuple[bytes, int]] = []
+    prev_hash, prev_content = None, None
+
+    with open(tmp_pack, "wb") as out:
+        out.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(order)))
+        for object_hash, base_hash in order:
+            content = read_object(object_hash)
+            stats["bytes_before"] += len(content)
+            kind, payload, base_raw = KIND_FULL, content, b"\0" * 32
+
+            if (base_hash is not None and base_hash == prev_hash and depth.get(base_hash, max_chain) < max_chain
+                    and len(content) <= MAX_DELTA_SIZE and len(prev_content) <= MAX_DELTA_SIZE):
+                delta = make_delta(prev_content, content)
+                if len(delta) < len(content) // 2 and apply_delta(prev_content, delta) == content:
+                    kind, payload, base_raw = KIND_DELTA, delta, bytes.fromhex(base_hash)
+            depth[object_hash] = depth[base_hash] + 1 if kind == KIND_DELTA else 0
+
+            compressed = zlib.compress(payload)
+            index.append((bytes.fromhex(object_hash), out.tell()))
+            out.write(_ENTRY.pack(kind, base_raw, len(compressed)))
+            out.write(compressed)
+            stats["objects"] += 1
+            stats["deltas"] += kind == KIND_DELTA
+            prev_hash, prev_content = object_hash, content
+        out.flush()
+        os.fsync(out.fileno())
+        stats["bytes_after"] = out.tell()
+
+    with open(tmp_idx, "wb") as out:
+        index.sort()
+        out.write(_HEADER.pack(IDX_MAGIC, PACK_VERSION, len(index)))
+        for raw_hash, offset in index: out.write(_IDX_ENTRY.pack(raw_hash, offset))
+        out.flush()
+        os.fsync(out.fileno())
+
+    # 팩을 먼저, 인덱스를 나중에 옮겨야 인덱스가 보이는 순간 팩이 완전합니다.
+    new_pack_path = PACKS_DIR / f"{pack_name}.pack"
+    os.replace(tmp_pack, new_pack_path)
+    os.replace(tmp_idx, PACKS_DIR / f"{pack_name}.idx")
+    _fsync_path(PACKS_DIR)
+    _packs.refresh(force=True)
+
+    for pack in old_packs:
+        if pack.pack_path == new_pack_path: continue
+        pack.idx_path.unlink(missing_ok=True)
+        pack.pack_path.unlink(missing_ok=True)
+    for object_hash, _ in order:
+        if object_hash in loose: remove_loose(object_hash)
+    _packs.refresh(force=True)
+    return stats
@@ -0,0 +1,702 @@
+# filegit_tui.py
+from __future__ import annotations
+
+from collections import deque
+from pathlib import Path
+from typing import NamedTuple
+
+from rich.segment import Segment
+from rich.style import Style
+from textual import work
+from textual.app import App, ComposeResult, on
+from textual.worker import get_current_worker
+from textual.widgets import Header, Footer, DataTable, Static, Input
+from textual.containers import Vertical, Horizontal
+from textual.screen import ModalScreen
+from textual.binding import Binding
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+from filegit_db import (setup_repo, connect, format_timestamp, now_timestamp, head_hash, insert_commit, history_page,
+                        delete_file_history, recent_commits, file_stats, fill_commit_sizes)
+from filegit_hashcache import get_file_hash, remember_file_hash
+from filegit_config import load_config, capture_options
+import filegit_ipc
+from filegit_ipc import DaemonUnavailable, DaemonError
+from filegit_preview import ContentView, Preview, PreviewCache, ViewCache, build_preview, DIFF_EXPAND_STEPS
+from filegit_search import index_pending, search
+from filegit_blame import Blame, blame
+from filegit_store import capture_file, sync_pending, restore_object
+
+# 타임라인은 한 페이지씩 읽고, 커서가 가장자리에서 PREFETCH_MARGIN행 안으로 들어오면 다음 페이지를 읽습니다.
+PAGE_SIZE = 200
+PREFETCH_MARGIN = 20
+# 표에 동시에 올려 두는 최대 행 수. 이력이 아무리 길어도 메모리는 이 범위 안에서 유지됩니다.
+MAX_LOADED_ROWS = 2000
+TEMP_ROW_KEY = "temp"
+# 미리 계산해 둘 위/아래 이웃 행 수
+PREFETCH_NEIGHBORS = 2
+# 검색 결과로 기억해 둘 최대 커밋 수
+SEARCH_LIMIT = 1000
+# 저장소 대시보드의 파일 정렬 순서: (이름, 정렬 키)
+FILE_SORTS = (("최근 변경", lambda row: (row['last_timestamp'], row['last_commit_id'])),
+              ("버전 수", lambda row: row['versions']), ("논리 크기", lambda row: row['logical_bytes']))
+
+
+# --- TUI 애플리케이션 (이전과 동일) ---
+class CommitInputScreen(ModalScreen):
+    # ... (생략, 이전과 동일)
+    def __init__(self, commit_id: int): super().__init__(); self.commit_id = commit_id
+
+    def compose(self) -> ComposeResult:
+        dialog = Vertical(Static("커밋 메시지를 입력하세요 (ESC: 취소):"), Input(placeholder="메시지...", id="commit-input"),
+                          id="commit-dialog")
+        dialog.styles.align = ("center", "middle")
+        dialog.styles.width = 60
+        dialog.styles.height = 5
+        dialog.styles.border = ("thick", "dodgerblue")
+        yield dialog
+
+    def on_mount(self) -> None: self.query_one(Input).focus()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None: self.dismiss(event.value or None)
+
+
+class SearchInputScreen(ModalScreen):
+    def compose(self) -> ComposeResult:
+        dialog = Vertical(Static("모든 버전에서 찾을 내용 (세 글자 이상, ESC: 취소):"),
+                          Input(placeholder="검색어...", id="search-input"), id="search-dialog")
+        dialog.styles.align = ("center", "middle")
+        dialog.styles.width = 60
+        dialog.styles.height = 5
+        dialog.styles.border = ("thick", "dodgerblue")
+        yield dialog
+
+    def on_mount(self) -> None: self.query_one(Input).focus()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None: self.dismiss(event.value or None)
+
+    def key_escape(self) -> None: self.dismiss(None)
+
+
+class TimelineRow(NamedTuple):
+    """타임라인 한 행의 정보. 행 키는 커밋 ID(또는 'temp')입니다."""
+    object_hash: str
+    prev_hash: str | None
+    commit_id: int | None
+    commit_type: str
+    order: tuple
+
+
+# 화면을 깨뜨리는 제어 문자는 보이는 문자로 바꿔서 그립니다.
+_CONTROL_CHARS = {code: "�" for code in range(32) if code != 9}
+_STYLE_DIM = Style(dim=True)
+_STYLE_BOLD = Style(bold=True)
+_DIFF_STYLES = {"+": Style(color="green"), "-": Style(color="red"), "@": Style(color="cyan"), "[": _STYLE_DIM}
+
+
+def _diff_line(line: str) -> list[Segment]:
+    style = None if line.startswith(("+++", "---")) else _DIFF_STYLES.get(line[:1])
+    return [Segment(line.expandtabs(4).translate(_CONTROL_CHARS), style)]
+
+
+class ContentViewer(ScrollView):
+    """보이는 줄만 그리는 뷰어.
+
+    내용 뷰(ContentView)를 받으면 화면에 보이는 범위의 줄만 읽어서 그리고, 바이너리면 요약과
+    hexdump를 보여줍니다. 미리 만든 줄 목록(diff, blame)도 같은 방식으로 보여줍니다.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.view: ContentView | None = None
+        self.items: list[list[Segment]] = []    # view가 없을 때 보여줄 줄들
+        self.header: list[list[Segment]] = []   # view 위에 붙는 줄들 (바이너리 요약)
+        self._window: tuple[int, list[str]] = (0, [])
+
+    def show_view(self, view: ContentView):
+        self.view, self.items = view, []
+        if view.is_binary:
+            self.header = [[Segment(f"[바이너리 파일] {view.size:,} bytes", _STYLE_BOLD)], []]
+            self._reset(len(self.header) + view.hex_rows)
+        else:
+            self.header = []
+            self._reset(view.line_count)
+
+    def show_lines(self, lines: list[list[Segment]]):
+        self.view, self.items, self.header = None, lines, []
+        self._reset(len(lines))
+
+    def show_message(self, message: str):
+        self.show_lines([[Segment(line)] for line in message.splitlines()])
+
+    def _reset(self, rows: int):
+        self._window = (0, [])
+        self.virtual_size = Size(0, rows)
+        self.scroll_to(0, 0, animate=False)
+        self.refresh()
+
+    def _line(self, index: int) -> list[Segment]:
+        if index < len(self.header): return self.header[index]
+        index -= len(self.header)
+        if self.view is None: return self.items[index] if index < len(self.items) else []
+        if self.view.is_binary: return [Segment(self.view.hex_row(index))] if index < self.view.hex_rows else []
+        start, lines = self._window
+        if not start <= index < start + len(lines):
+            # 줄마다 찾지 않고, 화면 두 개 분량을 한 번에 읽어 둡니다.
+            start, lines = index, self.view.lines(index, max(self.size.height, 1) * 2)
+            self._window = (start, lines)
+        if index - start >= len(lines): return []
+        return [Segment(lines[index - start].expandtabs(4).translate(_CONTROL_CHARS))]
+
+    def render_line(self, y: int) -> Strip:
+        # 긴 줄은 가로로 스크롤하지 않고 패널 너비에서 자릅니다.
+        width = self.scrollable_content_region.width
+        return Strip(self._line(self.scroll_offset.y + y)).crop(0, width)
+
+
+class OrderedCell(str):
+    """정렬 순서 (timestamp, id)를 함께 들고 있는 셀. 새 행을 위쪽에 끼워 넣을 때 DataTable.sort에 씁니다."""
+
+    def __new__(cls, text: str, order: tuple):
+        cell = super().__new__(cls, text)
+        cell.order = order
+        return cell
+
+
+class DashboardApp(App):
+    # ... (생략, 이전과 동일)
+    BINDINGS = [
+        Binding("q", "quit", "종료"), Binding("a", "add_snapshot", "스냅샷 추가(A)"),
+        Binding("c", "commit_message", "커밋 메시지(C)"), Binding("r", "restore_selected", "선택 버전으로 복원(R)"),
+        Binding("f", "forget_file", "추적 중단(F)"), Binding("s", "refresh_status", "상태 새로고침(S)"),
+        Binding("slash", "search", "검색(/)"), Binding("n", "next_match", "다음 찾기", show=False),
+        Binding("N", "previous_match", "이전 찾기", show=False), Binding("b", "toggle_blame", "blame(B)"),
+        Binding("e", "expand_diff", "diff 펼치기(E)"),
+    ]
+
+    def __init__(self, filepath: Path, start_commit: int | None = None):
+        super().__init__();
+        self.filepath = filepath;
+        self.conn = setup_repo()
+        self.timeline_panel = DataTable(id="timeline_table");
+        self.content_panel = ContentViewer(id="content_view")
+        self.diff_panel = ContentViewer(id="diff_view");
+        self.header = Header()
+        self.current_row_key = None;
+        self.is_forget_pending = False
+        # 표에 올라와 있는 행들: 키 -> TimelineRow, 그리고 커밋 행 키의 순서 (최신 -> 오래된)
+        self.rows: dict[str, TimelineRow] = {}
+        self.window: deque[str] = deque()
+        self.at_head = True     # 가장 최신 커밋까지 읽혀 있는지
+        self.at_tail = False    # 가장 오래된 커밋까지 읽혀 있는지
+        self.previews = PreviewCache()
+        self.views = ViewCache()
+        self.diff_context = DIFF_EXPAND_STEPS[0]
+        self.start_commit = start_commit
+        # 마지막 검색 결과 (최신순)와 지금 보고 있는 결과의 위치
+        self.search_pattern: str | None = None
+        self.search_hits: list = []
+        self.search_pos = -1
+        self.blame_mode = False  # 내용 패널에 줄마다 출처 커밋을 붙여 보여줄지
+
+    def compose(self) -> ComposeResult:
+        left_pane = Vertical(self.timeline_panel, self.diff_panel, id="left-pane")
+        main_container = Horizontal(left_pane, self.content_panel, id="main-container")
+        main_container.styles.height = "1fr";
+        left_pane.styles.width = "60%";
+        left_pane.styles.min_width = 40;
+        left_pane.styles.border_right = ("solid", "dodgerblue")
+        self.timeline_panel.styles.height = "60%";
+        self.timeline_panel.styles.border_bottom = ("solid", "dodgerblue")
+        self.diff_panel.styles.height = "40%";
+        self.diff_panel.styles.padding = (0, 1)
+        self.content_panel.styles.width = "40%";
+        self.content_panel.styles.padding = (0, 1)
+        yield self.header;
+        yield main_container;
+        yield Footer()
+
+    def on_mount(self) -> None:
+        self.timeline_panel.cursor_type = "row";
+        self.type_column, self.date_column, self.hash_column, self.message_column = \
+            self.timeline_panel.add_columns("타입", "날짜", "해시", "메시지")
+        self.refresh_all()
+        if self.start_commit is not None:
+            row = self.conn.execute("""
+                                    SELECT timestamp FROM commits
+                                    WHERE id = ? AND path_id = (SELECT id FROM paths WHERE path = ?)
+                                    """, (self.start_commit, str(self.filepath))).fetchone()
+            if not row: self.notify(f"이 파일에는 #{self.start_commit} 커밋이 없습니다.", severity="warning"); return
+            self.jump_to_commit(self.start_commit, (row[0], self.start_commit))
+
+    def refresh_all(self):
+        self.update_header(); self.sync_timeline()
+
+    def _head_and_current(self) -> tuple[str | None, str | None]:
+        # 데몬이 떠 있으면 아직 기록되지 않은 커밋까지 아는 데몬에게 묻고, 아니면 직접 확인합니다.
+        # 데몬은 해시 캐시에 있는 해시만 알려 주므로, 없으면(current가 None) 여기서 해시합니다.
+        try:
+            reply = filegit_ipc.request("head", path=str(self.filepath), timeout=0.5)
+            return reply["head"], reply["current"] or get_file_hash(self.filepath)
+        except (DaemonUnavailable, DaemonError):
+            return head_hash(self.conn, str(self.filepath)), get_file_hash(self.filepath)
+
+    def update_header(self):
+        last_hash, current_hash = self._head_and_current()
+        style_map = {"success": "darkgreen", "warning": "darkgoldenrod", "error": "darkred"};
+        style = "success"
+        if not current_hash:
+            style, status_text = "error", "[DELETED]"
+        else:
+            if not last_hash or current_hash != last_hash:
+                style, status_text = "warning", "[MODIFIED]"
+            else:
+                style, status_text = "success", "[up-to-date]"
+        self.header.text = f"📜 {self.filepath.name}";
+        self.header.sub_text = f"상태: {status_text}";
+        self.header.styles.background = style_map.get(style, "darkblue")
+
+    # --- 타임라인 페이지 관리 ---
+    def _selected_key(self) -> str | None:
+        return self.current_row_key.value if self.current_row_key else None
+
+    def _restore_cursor(self, key: str | None):
+        # 행을 끼워 넣거나 지우면 커서(행 번호)가 다른 행을 가리키게 되므로 같은 행으로 되돌립니다.
+        if key in self.rows: self.timeline_panel.move_cursor(row=self.timeline_panel.get_row_index(key))
+
+    def _sort_rows(self):
+        self.timeline_panel.sort(self.date_column, key=lambda cell: cell.order, reverse=True)
+
+    def _add_commit_row(self, log, prev_hash: str | None) -> str:
+        key, order = str(log['id']), (log['timestamp'], log['id'])
+        marker = "(*)" if log['type'] == 'manual' else "(')"
+        self.rows[key] = TimelineRow(log['object_hash'], prev_hash, log['id'], log['type'], order)
+        self.timeline_panel.add_row(marker, OrderedCell(format_timestamp(log['timestamp']), order),
+                                    log['object_hash'][:12], log['message'] or "", key=key)
+        return key
+
+    def _remove_row(self, key: str):
+        self.timeline_panel.remove_row(key)
+        del self.rows[key]
+
+    def load_older(self, before: tuple[int, int] | None = None):
+        """표의 가장 아래 행(또는 before)보다 오래된 커밋을 한 페이지 더 읽어 아래쪽에 붙입니다."""
+        if self.at_tail: return
+        selected = self._selected_key()
+        if before is None and self.window: before = self.rows[self.window[-1]].order
+        # 한 행을 더 읽어 페이지 마지막 행의 이전 해시를 알아냅니다.
+        logs = history_page(self.conn, str(self.filepath), before=before, limit=PAGE_SIZE + 1)
+        self.at_tail = len(logs) <= PAGE_SIZE
+        for i, log in enumerate(logs[:PAGE_SIZE]):
+            prev_hash = logs[i + 1]['object_hash'] if i + 1 < len(logs) else None
+            self.window.append(self._add_commit_row(log, prev_hash))
+        while len(self.window) > MAX_LOADED_ROWS:
+            self._remove_row(self.window.popleft())
+            self.at_head = False
+        if not self.at_head and TEMP_ROW_KEY in self.rows: self._remove_row(TEMP_ROW_KEY)
+        self._restore_cursor(selected)
+
+    def load_newer(self):
+        """표의 가장 위 행보다 새로운 커밋을 한 페이지 읽어 위쪽에 끼워 넣습니다."""
+        if self.at_head or not self.window: return
+        selected = self._selected_key()
+        top = self.rows[self.window[0]]
+        logs = history_page(self.conn, str(self.filepath), after=top.order, limit=PAGE_SIZE)
+        self.at_head = len(logs) < PAGE_SIZE
+        prev_hash = top.object_hash
+        for log in logs:
+            self.window.appendleft(self._add_commit_row(log, prev_hash))
+            prev_hash = log['object_hash']
+        while len(self.window) > MAX_LOADED_ROWS:
+            self._remove_row(self.window.pop())
+            self.at_tail = False
+        if logs: self._sort_rows()
+        self._restore_cursor(selected)
+
+    def sync_timeline(self):
+        """새 커밋과 저장되지 않은 변경(temp 행)을 반영합니다. 표를 비우지 않고 바뀐 행만 고칩니다."""
+        if not self.at_head: return
+        if not self.window:
+            self.at_tail = False
+            self.load_older()
+        else:
+            self.at_head = False
+            while not self.at_head: self.load_newer()
+
+        selected = self._selected_key()
+        current_hash = get_file_hash(self.filepath);
+        head = self.rows[self.window[0]].object_hash if self.window else None
+        if current_hash and current_hash != head:
+            info = TimelineRow(current_hash, head, None, 'temp', (float('inf'),))
+            ts = OrderedCell(format_timestamp(now_timestamp()), info.order)
+            if TEMP_ROW_KEY in self.rows:
+                self.timeline_panel.update_cell(TEMP_ROW_KEY, self.date_column, ts)
+                self.timeline_panel.update_cell(TEMP_ROW_KEY, self.hash_column, current_hash[:12])
+            else:
+                self.timeline_panel.add_row("(temp)", ts, current_hash[:12], "저장되지 않은 변경 사항", key=TEMP_ROW_KEY)
+                self._sort_rows()
+            self.rows[TEMP_ROW_KEY] = info
+        elif TEMP_ROW_KEY in self.rows:
+            self._remove_row(TEMP_ROW_KEY)
+        self._restore_cursor(selected)
+
+    def jump_to_commit(self, commit_id: int, order: tuple[int, int]):
+        """커밋 행으로 커서를 옮깁니다. 표에 없으면 그 커밋 주변의 페이지로 표를 다시 채웁니다."""
+        key = str(commit_id)
+        if key not in self.rows:
+            self.timeline_panel.clear()
+            self.rows.clear()
+            self.window.clear()
+            self.current_row_key = None
+            self.at_head = self.at_tail = False
+            # (timestamp, id) 키셋에서 이 커밋까지 포함하도록 id를 하나 늘려 읽습니다.
+            self.load_older(before=(order[0], order[1] + 1))
+            self.load_newer()
+        self._restore_cursor(key)
+
+    def _load_near_cursor(self):
+        row = self.timeline_panel.cursor_row
+        if row >= self.timeline_panel.row_count - PREFETCH_MARGIN and not self.at_tail:
+            self.load_older()
+        elif row < PREFETCH_MARGIN and not self.at_head:
+            self.load_newer()
+
+    @on(DataTable.RowHighlighted)
+    def update_views(self, event: DataTable.RowHighlighted) -> None:
+        self.current_row_key = event.row_key;
+        key = self._selected_key()
+        info = self.rows.get(key)
+        if not info: return
+        self._load_near_cursor()
+        preview = self.previews.get(self._preview_key(info))
+        if preview:
+            self.show_preview(key, preview)
+        else:
+            if not self.blame_mode: self.content_panel.show_message("[불러오는 중...]")
+            self.diff_panel.show_message("")
+            # 같은 그룹의 이전 작업은 취소되므로, 빠르게 스크롤해도 마지막 행만 계산됩니다.
+            self.load_preview(key, info)
+        if self.blame_mode: self.load_blame(key, info)
+        self.prefetch_previews(self._neighbor_rows())
+
+    def _preview_key(self, info: TimelineRow) -> tuple:
+        return info.prev_hash, info.object_hash, self.diff_context
+
+    def show_preview(self, key: str, preview: Preview):
+        if key != self._selected_key(): return
+        if not self.blame_mode:
+            if preview.view is not None: self.content_panel.show_view(preview.view)
+            else: self.content_panel.show_message(preview.message or "")
+        self.diff_panel.show_lines([_diff_line(line) for line in preview.diff])
+
+    def _neighbor_rows(self) -> list[TimelineRow]:
+        row, neighbors = self.timeline_panel.cursor_row, []
+        for offset in range(1, PREFETCH_NEIGHBORS + 1):
+            for index in (row + offset, row - offset):
+                if 0 <= index < self.timeline_panel.row_count:
+                    row_key, _ = self.timeline_panel.coordinate_to_cell_key((index, 0))
+                    info = self.rows.get(row_key.value)
+                    if info: neighbors.append(info)
+        return neighbors
+
+    @work(thread=True, exclusive=True, group="preview")
+    def load_preview(self, key: str, info: TimelineRow) -> None:
+        worker = get_current_worker()
+        preview = build_preview(info, self.filepath, self.views, self.diff_context, lambda: worker.is_cancelled)
+        if preview is None or worker.is_cancelled: return
+        self.previews.put(self._preview_key(info), preview)
+        self.call_from_thread(self.show_preview, key, preview)
+
+    @work(thread=True, exclusive=True, group="blame")
+    def load_blame(self, key: str, info: TimelineRow) -> None:
+        if info.commit_id is None:
+            self.call_from_thread(self.show_blame, key, None)
+            return
+        conn = connect()
+        try:
+            result = blame(conn, str(self.filepath), info.commit_id)
+        finally:
+            conn.close()
+        if get_current_worker().is_cancelled: return
+        self.call_from_thread(self.show_blame, key, result)
+
+    def show_blame(self, key: str, result: Blame | None):
+        if key != self._selected_key() or not self.blame_mode: return
+        if result is None:
+            self.content_panel.show_message("[저장되지 않은 변경 사항입니다. 먼저 스냅샷을 추가(A)하세요]")
+            return
+        commit_id = self.rows[key].commit_id if key in self.rows else None
+        new_style, lines = Style(bold=True, color="green"), []
+        for origin, line in zip(result.origins, result.lines):
+            info = result.commits.get(origin)
+            label = f"#{origin:<6} {format_timestamp(info['timestamp'])[:8]} " if info else f"{'?':<16} "
+            # 이 버전에서 새로 들어온 줄은 눈에 띄게 표시합니다.
+            lines.append([Segment(label, new_style if origin == commit_id else _STYLE_DIM),
+                          Segment(line.expandtabs(4).translate(_CONTROL_CHARS))])
+        self.content_panel.show_lines(lines)
+
+    @work(thread=True, exclusive=True, group="prefetch")
+    def prefetch_previews(self, neighbors: list[TimelineRow]) -> None:
+        worker = get_current_worker()
+        for info in neighbors:
+            if worker.is_cancelled: return
+            if self.previews.get(self._preview_key(info)): continue
+            preview = build_preview(info, self.filepath, self.views, self.diff_context, lambda: worker.is_cancelled)
+            if preview is not None: self.previews.put(self._preview_key(info), preview)
+
+    def action_add_snapshot(self) -> None:
+        captured = capture_file(self.filepath, **capture_options(load_config()));
+        if not captured: self.notify("파일을 찾을 수 없습니다.", severity="error"); return
+        if captured.stable: remember_file_hash(self.filepath, captured.stat, captured.object_hash, captured.hashed_at_ns)
+        sync_pending()
+        with self.conn: insert_commit(self.conn, str(self.filepath), captured.object_hash, now_timestamp(),
+                                      chunks=captured.chunks, size=captured.size)
+        self.notify("✨ 스냅샷을 추가했습니다.", title="Snapshot Added");
+        self.refresh_all()
+
+    def action_commit_message(self) -> None:
+        info = self.rows.get(self._selected_key())
+        if not info: self.notify("먼저 타임라인에서 행을 선택하세요.", severity="warning", timeout=2); return
+        commit_id, commit_type = info.commit_id, info.commit_type
+        if commit_type == 'manual': self.notify("이미 수동 커밋입니다.", severity="warning"); return
+        if commit_type == 'temp': self.notify("먼저 스냅샷을 추가(A)해야 커밋할 수 있습니다.", severity="error"); return
+
+        def on_submit(message: str | None):
+            if message:
+                with self.conn: self.conn.execute("UPDATE commits SET type = 'manual', message = ? WHERE id = ?",
+                                                  (message, commit_id))
+                # 바뀐 행 하나만 고칩니다.
+                key = str(commit_id)
+                if key in self.rows:
+                    self.rows[key] = self.rows[key]._replace(commit_type="manual")
+                    self.timeline_panel.update_cell(key, self.type_column, "(*)")
+                    self.timeline_panel.update_cell(key, self.message_column, message)
+                self.notify(f"📌 커밋 완료: {message}");
+
+        self.push_screen(CommitInputScreen(commit_id), on_submit)
+
+    def action_restore_selected(self) -> None:
+        info = self.rows.get(self._selected_key())
+        if not info: self.notify("먼저 타임라인에서 행을 선택하세요.", severity="warning", timeout=2); return
+        selected_hash, commit_type = info.object_hash, info.commit_type
+        if commit_type == 'temp': self.notify("현재 작업중인 버전입니다.", severity="information"); return
+        restore_object(selected_hash, self.filepath);
+        self.notify(f"✅ [{selected_hash[:7]}] 버전으로 복원 완료!", title="Restore");
+        self.refresh_all()
+
+    def action_forget_file(self) -> None:
+        if self.is_forget_pending:
+            with self.conn:
+                delete_file_history(self.conn, str(self.filepath)); self.exit(
+                    message=f"'{self.filepath.name}'의 모든 이력을 삭제했습니다.")
+        else:
+            self.notify("정말로 삭제하시려면 5초 안에 'F'를 다시 누르세요.", severity="error", timeout=5);
+            self.is_forget_pending = True;
+            self.set_timer(5, self.cancel_forget)
+
+    def cancel_forget(self) -> None:
+        if self.is_forget_pending: self.is_forget_pending = False; self.notify("삭제가 취소되었습니다.")
+
+    def action_toggle_blame(self) -> None:
+        self.blame_mode = not self.blame_mode
+        self.notify("blame: 줄마다 그 줄을 들여온 커밋을 표시합니다." if self.blame_mode else "blame을 껐습니다.",
+                    timeout=2)
+        key = self._selected_key()
+        info = self.rows.get(key)
+        if not info: return
+        if self.blame_mode:
+            self.content_panel.show_message("[blame 계산 중...]")
+            self.load_blame(key, info)
+        elif preview := self.previews.get(self._preview_key(info)):
+            self.show_preview(key, preview)
+        else:
+            self.load_preview(key, info)
+
+    def action_expand_diff(self) -> None:
+        """diff의 문맥 줄 수를 차례로 늘리고, 끝까지 가면 처음으로 돌아갑니다."""
+        step = DIFF_EXPAND_STEPS.index(self.diff_context) + 1
+        self.diff_context = DIFF_EXPAND_STEPS[step % len(DIFF_EXPAND_STEPS)]
+        self.notify(f"diff 문맥: {'파일 전체' if self.diff_context is None else f'{self.diff_context}줄'}", timeout=1)
+        key = self._selected_key()
+        info = self.rows.get(key)
+        if not info: return
+        if preview := self.previews.get(self._preview_key(info)):
+            self.show_preview(key, preview)
+        else:
+            self.load_preview(key, info)
+
+    # --- 전문 검색 ---
+    def action_search(self) -> None:
+        def on_submit(pattern: str | None):
+            if pattern: self.run_search(pattern)
+
+        self.push_screen(SearchInputScreen(), on_submit)
+
+    @work(thread=True, exclusive=True, group="search")
+    def run_search(self, pattern: str) -> None:
+        # 색인 중에도 화면이 멈추지 않도록 작업 스레드에서 자기 연결로 찾습니다.
+        conn = connect()
+        try:
+            index_pending(conn)
+            hits = search(conn, pattern, str(self.filepath), limit=SEARCH_LIMIT)
+        except ValueError as e:
+            self.call_from_thread(self.notify, str(e), severity="error")
+            return
+        finally:
+            conn.close()
+        self.call_from_thread(self.show_search_results, pattern, hits)
+
+    def show_search_results(self, pattern: str, hits: list):
+        self.search_pattern, self.search_hits, self.search_pos = pattern, hits, -1
+        if not hits: self.notify(f"'{pattern}'이(가) 든 버전이 없습니다.", severity="warning"); return
+        more = "+" if len(hits) == SEARCH_LIMIT else ""
+        self.notify(f"'{pattern}': 버전 {len(hits)}{more}개 (n/N: 다음/이전)", title="Search")
+        self.action_next_match()
+
+    def _show_match(self, pos: int):
+        if not self.search_hits: self.notify("먼저 검색(/)하세요.", severity="warning", timeout=2); return
+        self.search_pos = pos % len(self.search_hits)
+        hit = self.search_hits[self.search_pos]
+        self.jump_to_commit(hit.commit_id, (hit.timestamp, hit.commit_id))
+        self.notify(f"'{self.search_pattern}' {self.search_pos + 1}/{len(self.search_hits)}", timeout=1)
+
+    def action_next_match(self) -> None:
+        # 결과는 최신순이므로 "다음"은 더 오래된 버전입니다.
+        self._show_match(self.search_pos + 1)
+
+    def action_previous_match(self) -> None:
+        self._show_match(self.search_pos - 1)
+
+    def action_refresh_status(self) -> None:
+        self.refresh_all(); self.notify("상태를 새로고침했습니다.", title="Refresh")
+
+
+def _format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB": break
+        size /= 1024
+    return f"{size:,.0f} {unit}" if unit == "B" else f"{size:,.1f} {unit}"
+
+
+class RepoDashboardApp(App):
+    """저장소 전체 대시보드: 파일별 요약과, 모든 파일의 최근 커밋을 시간순으로 합친 목록.
+
+    파일 요약은 path_stats에서, 최근 커밋은 timestamp 인덱스를 따라 한 페이지씩 읽으므로
+    index.db가 커도 바로 열립니다. 행을 고르면 (파일 경로, 커밋 ID 또는 None)을 결과로 끝나고,
+    호출한 쪽이 그 파일의 DashboardApp을 엽니다.
+    """
+    BINDINGS = [
+        Binding("q", "quit", "종료"), Binding("s", "refresh_status", "새로고침(S)"),
+        Binding("o", "cycle_sort", "정렬 바꾸기(O)"),
+    ]
+
+    def __init__(self, select: str | None = None):
+        super().__init__()
+        self.conn = setup_repo()
+        self.files_panel = DataTable(id="files_table")
+        self.recent_panel = DataTable(id="recent_table")
+        self.header = Header()
+        self.select = select
+        self.stats: dict = {}                          # 경로 -> file_stats() 행
+        self.commits: dict[str, tuple[str, int]] = {}  # 최근 커밋 행 키 -> (경로, 커밋 ID)
+        self.oldest: tuple[int, int] | None = None     # 최근 커밋 표의 가장 아래 행 (timestamp, id)
+        self.at_tail = False
+        self.sort_index = 0
+
+    def compose(self) -> ComposeResult:
+        self.files_panel.styles.height = "50%"
+        self.files_panel.styles.border_bottom = ("solid", "dodgerblue")
+        self.recent_panel.styles.height = "50%"
+        yield self.header
+        yield Vertical(self.files_panel, self.recent_panel)
+        yield Footer()
+
+    def on_mount(self) -> None:
+        self.files_panel.cursor_type = self.recent_panel.cursor_type = "row"
+        # 버전 내용 크기의 합이라 압축, 청크 중복 제거, 델타로 줄어든 실제 디스크 사용량보다 큽니다.
+        self.files_panel.add_columns("파일", "버전", "논리 크기", "마지막 변경")
+        self.recent_panel.add_columns("날짜", "파일", "타입", "메시지")
+        self.load_stats()
+        self.load_recent()
+        if self.select in self.stats: self.files_panel.move_cursor(row=self.files_panel.get_row_index(self.select))
+        if any(row['unsized'] for row in self.stats.values()): self.fill_sizes()
+
+    def load_stats(self):
+        """파일별 요약을 다시 읽어 표를 채웁니다. 커서는 같은 파일에 남깁니다."""
+        selected = self._selected_file()
+        rows = file_stats(self.conn)
+        self.stats = {row['path']: row for row in rows}
+        rows.sort(key=FILE_SORTS[self.sort_index][1], reverse=True)
+        self.files_panel.clear()
+        for row in rows:
+            size = _format_size(row['logical_bytes'])
+            # 크기를 아직 모르는 버전이 있으면 아는 만큼의 합이므로 '+'를 붙입니다.
+            if row['unsized']: size += "+"
+            self.files_panel.add_row(row['path'], f"{row['versions']:,}", size,
+                                     format_timestamp(row['last_timestamp']), key=row['path'])
+        if selected in self.stats: self.files_panel.move_cursor(row=self.files_panel.get_row_index(selected))
+        self.update_header()
+
+    def update_header(self):
+        versions = sum(row['versions'] for row in self.stats.values())
+        logical = sum(row['logical_bytes'] for row in self.stats.values())
+        unsized = sum(row['unsized'] for row in self.stats.values())
+        self.header.text = "📚 filegit 저장소"
+        self.header.sub_text = (f"파일 {len(self.stats):,}개 · 버전 {versions:,}개 · 논리 크기 {_format_size(logical)}"
+                                + (f" (크기 계산 중: 버전 {unsized:,}개)" if unsized else "")
+                                + f" · 정렬: {FILE_SORTS[self.sort_index][0]}")
+
+    def load_recent(self):
+        """최근 커밋을 한 페이지 더 읽어 아래쪽에 붙입니다. MAX_LOADED_ROWS개까지만 읽습니다."""
+        if self.at_tail: return
+        logs = recent_commits(self.conn, before=self.oldest, limit=PAGE_SIZE)
+        self.at_tail = len(logs) < PAGE_SIZE or len(self.commits) + len(logs) >= MAX_LOADED_ROWS
+        for log in logs:
+            key = str(log['id'])
+            marker = "(*)" if log['type'] == 'manual' else "(')"
+            self.commits[key] = (log['path'], log['id'])
+            self.recent_panel.add_row(format_timestamp(log['timestamp']), log['path'], marker, log['message'] or "",
+                                      key=key)
+        if logs: self.oldest = (logs[-1]['timestamp'], logs[-1]['id'])
+
+    def _selected_file(self) -> str | None:
+        if not self.files_panel.row_count: return None
+        row_key, _ = self.files_panel.coordinate_to_cell_key((self.files_panel.cursor_row, 0))
+        return row_key.value
+
+    @on(DataTable.RowHighlighted, "#recent_table")
+    def load_more(self, event: DataTable.RowHighlighted) -> None:
+        if self.recent_panel.cursor_row >= self.recent_panel.row_count - PREFETCH_MARGIN: self.load_recent()
+
+    @on(DataTable.RowSelected)
+    def open_selected(self, event: DataTable.RowSelected) -> None:
+        key = event.row_key.value
+        if event.data_table is self.files_panel: self.exit((key, None))
+        elif key in self.commits: self.exit(self.commits[key])
+
+    @work(thread=True, exclusive=True, group="sizes")
+    def fill_sizes(self) -> None:
+        # 스키마 v6 이전의 커밋은 크기를 모르므로, 데몬이 채우기 전이라도 여기서 조금씩 채웁니다.
+        worker = get_current_worker()
+        conn = connect()
+        cursor = ""
+        try:
+            while cursor is not None and not worker.is_cancelled:
+                filled, cursor = fill_commit_sizes(conn, max_batches=1, after=cursor)
+                if filled: self.call_from_thread(self.load_stats)
+        finally:
+            conn.close()
+
+    def action_cycle_sort(self) -> None:
+        self.sort_index = (self.sort_index + 1) % len(FILE_SORTS)
+        self.load_stats()
+
+    def action_refresh_status(self) -> None:
+        self.commits.clear()
+        self.recent_panel.clear()
+        self.oldest, self.at_tail = None, False
+        self.load_stats()
+        self.load_recent()
+        self.notify("새로고침했습니다.", title="Refresh")
@@ -0,0 +1,74 @@
+# filegit_watchlist.py
+from __future__ import annotations
+
+import glob
+import json
+import os
+from pathlib import Path
+
+from filegit_config import FILEGIT_DIR
+
+# --- 설정 (메인 스크립트 및 데몬과 공유) ---
+WATCHLIST_PATH = FILEGIT_DIR / "watchlist.json"
+
+_GLOB_CHARS = set("*?[")
+
+
+def is_glob(entry: str) -> bool:
+    return any(c in _GLOB_CHARS for c in entry)
+
+
+def normalize_entry(target: str) -> str:
+    """감시 목록 항목을 절대 경로로 바꿉니다. glob 패턴은 심볼릭 링크를 풀지 않습니다."""
+    expanded = os.path.expanduser(target)
+    if is_glob(expanded): return os.path.abspath(expanded)
+    return str(Path(expanded).resolve())
+
+
+def glob_base(pattern: str) -> str:
+    """glob 패턴에서 와일드카드가 나오기 전까지의 디렉토리."""
+    parts = Path(pattern).parts
+    base = []
+    for part in parts:
+        if is_glob(part): break
+        base.append(part)
+    return str(Path(*base)) if base else "/"
+
+
+def load_watchlist() -> set:
+    if not WATCHLIST_PATH.exists(): return set()
+    with open(WATCHLIST_PATH, 'r') as f:
+        try:
+            return set(json.load(f))
+        except json.JSONDecodeError:
+            return set()
+
+
+def save_watchlist(watchlist: set):
+    # 데몬이 반쯤 쓰인 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체합니다.
+    WATCHLIST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = WATCHLIST_PATH.with_name(f".{WATCHLIST_PATH.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(sorted(watchlist), f, indent=2)
+    os.replace(tmp_path, WATCHLIST_PATH)
+
+
+def is_internal(path: str) -> bool:
+    """filegit 자신의 저장소 안에 있는 경로인지 (디렉토리 감시가 객체 저장소를 다시 감시하지 않도록)."""
+    return path == str(FILEGIT_DIR) or path.startswith(str(FILEGIT_DIR) + os.sep)
+
+
+def expand_entry(entry: str):
+    """항목이 가리키는 현재 존재하는 파일 경로들을 돌려줍니다."""
+    if is_glob(entry):
+        paths = (str(Path(p).resolve()) for p in glob.iglob(entry, recursive=True) if os.path.isfile(p))
+    elif os.path.isdir(entry):
+        paths = (os.path.join(root, name) for root, _, files in os.walk(entry) for name in files)
+    else:
+        paths = [entry] if os.path.isfile(entry) else []
+    for path in paths:
+        if not is_internal(path): yield path
+
+
+def expand_watchlist(watchlist) -> list[str]:
+    return sorted({path for entry in watchlist for path in expand_entry(entry)})
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import tempfile
+
+# 모듈들이 import 시점에 FILEGIT_DIR을 읽으므로, 실제 저장소를 건드리지 않도록 먼저 임시 디렉토리로 돌립니다.
+os.environ["FILEGIT_DIR"] = tempfile.mkdtemp(prefix="filegit-test-")
@@ -0,0 +1,45 @@
+# tests/test_chunking.py
+import io
+import os
+
+from filegit_store import (split_chunks, store_bytes, capture_file, read_object, iter_object_chunks, is_chunked,
+                           manifest_chunks, CHUNK_MAX_SIZE, CHUNK_MIN_SIZE)
+
+
+def _chunks(data: bytes) -> list[bytes]:
+    return list(split_chunks(io.BytesIO(data)))
+
+
+def test_chunks_cover_the_input_within_size_bounds():
+    data = os.urandom(4 * 1024 * 1024)
+    chunks = _chunks(data)
+    assert b"".join(chunks) == data
+    assert all(CHUNK_MIN_SIZE <= len(chunk) <= CHUNK_MAX_SIZE for chunk in chunks[:-1])
+    # 경계가 없는 내용은 최대 크기에서 자릅니다.
+    assert [len(chunk) for chunk in _chunks(bytes(CHUNK_MAX_SIZE * 2 + 5))] == [CHUNK_MAX_SIZE] * 2 + [5]
+    assert _chunks(b"") == []
+
+
+def test_cuts_survive_a_small_prefix_insert():
+    data = os.urandom(4 * 1024 * 1024)
+    before = _chunks(data)
+    after = _chunks(data[:1000] + b"inserted" + data[1000:])
+    reused = set(before) & set(after)
+    # 끼워 넣은 부근의 청크 하나만 달라집니다.
+    assert len(reused) >= len(before) - 2
+
+
+def test_chunked_object_reads_back_byte_for_byte(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 12345)
+    object_hash, _, chunks = store_bytes(data, chunk_threshold=1)
+    assert is_chunked(object_hash)
+    assert manifest_chunks(object_hash) == list(chunks)
+    assert read_object(object_hash) == data
+    assert b"".join(iter_object_chunks(object_hash)) == data
+
+    path = tmp_path / "big.bin"
+    path.write_bytes(data)
+    captured = capture_file(path, chunk_threshold=1)
+    assert captured.object_hash == object_hash
+    assert captured.size == len(data) and captured.stable
+    assert not captured.stored
@@ -0,0 +1,40 @@
+# tests/test_daemon_control.py
+import time
+
+import pytest
+
+import filegit_hashcache
+from filegit_daemon import DaemonControl
+from filegit_hashcache import HashCache, hash_file
+
+
+class FakeWriter:
+    def head_hash(self, path):
+        return "head"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = HashCache(tmp_path / "hashcache.db")
+    monkeypatch.setattr(filegit_hashcache, "_cache", cache)
+    return cache
+
+
+def test_head_answers_from_stat_only(tmp_path, cache, monkeypatch):
+    path = tmp_path / "big.bin"
+    path.write_bytes(b"x" * 4096)
+    old = path.stat()
+    digest = hash_file(path)
+    control = DaemonControl(FakeWriter(), None, None)
+
+    def no_read(filepath):
+        raise AssertionError("head must not read the file")
+
+    monkeypatch.setattr(filegit_hashcache, "hash_file", no_read)
+    # 캐시에 없거나 racily clean인 기록이면 읽지 않고 current를 비워 둡니다.
+    assert control.head(str(path)) == {"head": "head", "current": None}
+    cache.store(str(path), old, digest, time.time_ns())
+    assert control.head(str(path))["current"] is None
+    cache.store(str(path), old, digest, time.time_ns() + filegit_hashcache.RACY_WINDOW_NS * 2)
+    assert control.head(str(path))["current"] == digest
+    assert control.head(str(tmp_path / "missing"))["current"] is None
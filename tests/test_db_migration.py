@@ -0,0 +1,64 @@
+# tests/test_db_migration.py
+import sqlite3
+from datetime import datetime, timedelta
+
+from filegit_db import connect, ensure_schema, file_stats, head_hash, history_page, SCHEMA_VERSION
+
+# 스키마 버전이 없던 처음 filegit의 commits 테이블 (경로 문자열과 ISO 시각)
+BASELINE_SCHEMA = """
+CREATE TABLE commits
+(
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_path   TEXT NOT NULL,
+    object_hash TEXT NOT NULL,
+    message     TEXT,
+    timestamp   TEXT NOT NULL,
+    type        TEXT NOT NULL DEFAULT 'auto'
+)
+"""
+
+
+def _baseline_db(db_path):
+    started = datetime(2024, 1, 1, 9, 0, 0)
+    rows = []
+    for i in range(5):
+        rows.append(("/home/me/notes.txt", f"{i:064x}", None, (started + timedelta(minutes=i)).isoformat(),
+                     "manual" if i == 2 else "auto"))
+    rows.append(("/home/me/todo.md", "f" * 64, "first", started.isoformat(), "manual"))
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(BASELINE_SCHEMA)
+        conn.executemany("INSERT INTO commits (file_path, object_hash, message, timestamp, type) "
+                         "VALUES (?, ?, ?, ?, ?)", rows)
+    conn.close()
+    return started
+
+
+def test_baseline_db_migrates_to_current_schema(tmp_path):
+    db_path = tmp_path / "index.db"
+    started = _baseline_db(db_path)
+    conn = connect(db_path)
+    ensure_schema(conn, db_path)
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert (tmp_path / "index.db.v0.bak").exists()
+    assert head_hash(conn, "/home/me/notes.txt") == f"{4:064x}"
+    assert head_hash(conn, "/home/me/todo.md") == "f" * 64
+
+    page = history_page(conn, "/home/me/notes.txt")
+    assert [row["object_hash"] for row in page] == [f"{i:064x}" for i in reversed(range(5))]
+    assert page[-1]["timestamp"] == int(started.timestamp() * 1_000_000)
+    assert [row["type"] for row in page].count("manual") == 1
+
+    stats = {row["path"]: row for row in file_stats(conn)}
+    assert stats["/home/me/notes.txt"]["versions"] == 5
+    assert stats["/home/me/notes.txt"]["last_commit_id"] == page[0]["id"]
+    assert stats["/home/me/todo.md"]["versions"] == 1
+    # 예전 커밋은 크기를 모르므로 fill_commit_sizes()가 채울 때까지 unsized로 셉니다.
+    assert stats["/home/me/notes.txt"]["unsized"] == 5
+    assert stats["/home/me/notes.txt"]["logical_bytes"] == 0
+
+    # 이미 최신이면 아무것도 하지 않습니다.
+    ensure_schema(conn, db_path)
+    assert head_hash(conn, "/home/me/notes.txt") == f"{4:064x}"
+    conn.close()
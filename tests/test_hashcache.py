@@ -0,0 +1,86 @@
+# tests/test_hashcache.py
+import os
+import time
+
+import pytest
+
+import filegit_hashcache
+from filegit_hashcache import HashCache, hash_file
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # 창을 줄여 "시간이 지난 뒤"를 짧게 기다릴 수 있게 합니다.
+    monkeypatch.setattr(filegit_hashcache, "RACY_WINDOW_NS", 200_000_000)
+    return HashCache(tmp_path / "hashcache.db")
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    calls = []
+
+    def counting(filepath):
+        calls.append(filepath)
+        return hash_file(filepath)
+
+    monkeypatch.setattr(filegit_hashcache, "hash_file", counting)
+    return calls
+
+
+def _remember_like_daemon(cache, path):
+    # 데몬은 저장 직후에 캡처하므로 기록이 racily clean으로 남습니다.
+    hashed_at_ns = time.time_ns()
+    digest = hash_file(path)
+    cache.store(str(path), os.stat(path), digest, hashed_at_ns)
+    return digest
+
+
+def test_daemon_hash_is_trusted_on_next_quiet_event(tmp_path, cache, reads):
+    path = tmp_path / "notes.txt"
+    path.write_text("hello")
+    digest = _remember_like_daemon(cache, path)
+    assert cache.refresh(path) is None
+    assert reads == []
+
+    time.sleep(0.3)
+    assert cache.refresh(path) == digest
+    assert len(reads) == 1
+    # 새 시각으로 다시 남겼으므로 그다음부터는 읽지 않습니다.
+    assert cache.refresh(path) == digest
+    assert cache.cached_hash(path) == digest
+    assert len(reads) == 1
+
+
+def test_cached_hash_never_opens_the_file(tmp_path, cache, reads, monkeypatch):
+    path = tmp_path / "notes.txt"
+    path.write_text("hello")
+    _remember_like_daemon(cache, path)
+    time.sleep(0.3)
+
+    def no_open(*args, **kwargs):
+        raise AssertionError("cached_hash() must not open the file")
+
+    monkeypatch.setattr(filegit_hashcache, "open", no_open, raising=False)
+    # 창이 지난 racy 기록도 stat만 보는 경로에서는 다시 읽지 않고 None입니다.
+    assert cache.cached_hash(path) is None
+    assert reads == []
+
+
+def test_changed_file_is_not_trusted(tmp_path, cache, reads):
+    path = tmp_path / "notes.txt"
+    path.write_text("hello")
+    _remember_like_daemon(cache, path)
+    time.sleep(0.3)
+    path.write_text("hello, world")
+    assert cache.refresh(path) is None
+    assert reads == []
+
+
+def test_get_file_hash_restamps_racy_entry(tmp_path, cache, reads):
+    path = tmp_path / "notes.txt"
+    path.write_text("hello")
+    digest = _remember_like_daemon(cache, path)
+    time.sleep(0.3)
+    assert cache.get_file_hash(path) == digest
+    assert cache.get_file_hash(path) == digest
+    assert len(reads) == 1
@@ -0,0 +1,69 @@
+# tests/test_pack.py
+import os
+
+import pytest
+
+import filegit_store
+from filegit_store import (apply_delta, make_delta, repack, read_object, store_bytes, find_loose, in_pack,
+                           KIND_DELTA, KIND_FULL)
+
+
+def _versions(count: int) -> list[bytes]:
+    """줄 하나씩만 바뀌는 텍스트 버전들 (오래된 것부터). 테스트마다 내용이 겹치지 않게 임의 줄을 섞습니다."""
+    lines = [os.urandom(16).hex().encode() + b"\n" for _ in range(200)]
+    versions = []
+    for i in range(count):
+        lines[i * 7 % len(lines)] = f"version {i}\n".encode()
+        versions.append(b"".join(lines))
+    return versions
+
+
+def _chain_length(object_hash: str) -> int:
+    length = 0
+    while True:
+        kind, base_hash, _ = filegit_store._packs.find(object_hash).read_entry(object_hash)
+        if kind == KIND_FULL: return length
+        object_hash, length = base_hash, length + 1
+
+
+def test_delta_round_trip():
+    base, target = _versions(2)
+    delta = make_delta(base, target)
+    assert len(delta) < len(target) // 2
+    assert apply_delta(base, delta) == target
+    # 줄 단위가 아닌 내용과 빈 내용도 그대로 재구성됩니다.
+    for old, new in ((b"", b"abc"), (b"abc", b""), (os.urandom(100), os.urandom(100))):
+        assert apply_delta(old, make_delta(old, new)) == new
+
+
+def test_apply_delta_rejects_wrong_base():
+    base, target = _versions(2)
+    with pytest.raises(ValueError):
+        apply_delta(base + b"x", make_delta(base, target))
+
+
+@pytest.mark.parametrize("max_chain", [1, 3])
+def test_repack_caps_delta_chain(max_chain):
+    versions = _versions(8)
+    hashes = [store_bytes(content)[0] for content in versions]
+    stats = repack([list(reversed(hashes))], max_chain=max_chain)
+    assert stats["deltas"] > 0
+    lengths = [_chain_length(object_hash) for object_hash in hashes]
+    assert max(lengths) == max_chain
+    # 최신 버전은 언제나 통째로 저장됩니다.
+    assert lengths[-1] == 0
+    for object_hash, content in zip(hashes, versions):
+        assert read_object(object_hash) == content
+
+
+def test_read_from_pack_after_loose_objects_are_removed():
+    versions = _versions(4)
+    hashes = [store_bytes(content)[0] for content in versions]
+    assert all(find_loose(object_hash) for object_hash in hashes)
+    repack([list(reversed(hashes))])
+    for object_hash, content in zip(hashes, versions):
+        assert find_loose(object_hash) is None
+        assert in_pack(object_hash)
+        assert read_object(object_hash) == content
+    kind, _, _ = filegit_store._packs.find(hashes[0]).read_entry(hashes[0])
+    assert kind == KIND_DELTA
@@ -0,0 +1,79 @@
+# tests/test_retention_gc.py
+import os
+
+import pytest
+
+from filegit_db import connect, ensure_schema, head_hash, insert_commit, prune_history
+from filegit_gc import apply_retention, collect_garbage
+from filegit_store import find_chunk, find_loose, has_object, read_object, store_bytes
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = tmp_path / "index.db"
+    conn = connect(db_path)
+    ensure_schema(conn, db_path)
+    yield conn
+    conn.close()
+
+
+def _commit(conn, path, data, timestamp, commit_type="auto", chunk_threshold=0):
+    object_hash, _, chunks = store_bytes(data, chunk_threshold=chunk_threshold)
+    with conn:
+        insert_commit(conn, path, object_hash, timestamp, commit_type, chunks=chunks, size=len(data))
+    return object_hash, chunks
+
+
+def test_object_shared_with_a_kept_commit_survives(conn):
+    shared, _ = _commit(conn, "/a.txt", os.urandom(64), 1)
+    dropped, _ = _commit(conn, "/a.txt", os.urandom(64), 2)
+    newest, _ = _commit(conn, "/a.txt", os.urandom(64), 3)
+    # 다른 파일의 버전이 같은 내용을 가리킵니다.
+    with conn:
+        insert_commit(conn, "/b.txt", shared, 4)
+        assert prune_history(conn, "/a.txt", keep_last=1) == 2
+    collect_garbage(conn, grace=0)
+    assert find_loose(dropped) is None
+    assert read_object(shared)
+    assert read_object(newest)
+    assert head_hash(conn, "/a.txt") == newest
+
+
+def test_chunks_are_kept_while_any_manifest_refers_to_them(conn):
+    old_data = os.urandom(1024 * 1024)
+    new_data = old_data[:-300 * 1024] + os.urandom(300 * 1024)
+    old, old_chunks = _commit(conn, "/big.bin", old_data, 1, chunk_threshold=1)
+    new, new_chunks = _commit(conn, "/big.bin", new_data, 2, chunk_threshold=1)
+    shared = set(old_chunks) & set(new_chunks)
+    only_old = set(old_chunks) - set(new_chunks)
+    assert shared and only_old
+
+    with conn: prune_history(conn, "/big.bin", keep_last=1)
+    stats = collect_garbage(conn, grace=0)
+    assert not has_object(old)
+    assert stats["chunks"] == len(only_old)
+    assert all(find_chunk(chunk_hash) is None for chunk_hash in only_old)
+    assert all(find_chunk(chunk_hash) for chunk_hash in shared)
+    assert read_object(new) == new_data
+
+
+def test_newest_version_is_never_pruned(conn):
+    for i in range(3): _commit(conn, "/c.txt", os.urandom(32), i + 1)
+    newest, _ = _commit(conn, "/c.txt", os.urandom(32), 10, commit_type="manual")
+    with conn:
+        # 모든 버전이 before보다 오래되었어도 최신 버전은 남습니다.
+        assert prune_history(conn, "/c.txt", before=2 ** 62) == 3
+    assert head_hash(conn, "/c.txt") == newest
+    assert apply_retention(conn, [{"older_than_days": 0, "auto_only": True}]) == 0
+    collect_garbage(conn, grace=0)
+    assert read_object(newest)
+
+
+def test_keep_manual_deletes_only_auto_commits(conn):
+    manual, _ = _commit(conn, "/d.txt", os.urandom(32), 1, commit_type="manual")
+    auto, _ = _commit(conn, "/d.txt", os.urandom(32), 2)
+    newest, _ = _commit(conn, "/d.txt", os.urandom(32), 3)
+    with conn: assert prune_history(conn, "/d.txt", before=2 ** 62, keep_manual=True) == 1
+    collect_garbage(conn, grace=0)
+    assert find_loose(auto) is None
+    assert read_object(manual) and read_object(newest)
@@ -0,0 +1,47 @@
+# tests/test_watch_ignore.py
+import json
+
+import filegit_config
+from filegit_config import DEFAULT_CONFIG, get_option, load_config
+from filegit_daemon import WatchMatcher
+
+DEFAULT_IGNORE = DEFAULT_CONFIG["watch"]["ignore"]
+
+
+def test_default_ignore_skips_editor_and_temp_files(tmp_path):
+    matcher = WatchMatcher({str(tmp_path)}, DEFAULT_IGNORE)
+    assert matcher.matches(str(tmp_path / "notes.txt"))
+    assert matcher.matches(str(tmp_path / "sub" / "notes.txt"))
+    for name in (".notes.txt.swp", "notes.txt~", "4913", ".#notes.txt", "notes.txt.tmp",
+                 ".capture.1.2.3.tmp", ".watchlist.json.42.tmp"):
+        assert not matcher.matches(str(tmp_path / name)), name
+
+
+def test_ignore_applies_to_glob_entries(tmp_path):
+    matcher = WatchMatcher({str(tmp_path / "*")}, DEFAULT_IGNORE)
+    assert matcher.matches(str(tmp_path / "report.md"))
+    assert not matcher.matches(str(tmp_path / "report.md~"))
+
+
+def test_explicit_file_is_never_ignored(tmp_path):
+    target = str(tmp_path / "draft.tmp")
+    matcher = WatchMatcher({target, str(tmp_path)}, DEFAULT_IGNORE)
+    assert matcher.matches(target)
+    assert not matcher.matches(str(tmp_path / "other.tmp"))
+
+
+def test_ignore_patterns_are_configurable(tmp_path):
+    entries = {str(tmp_path)}
+    assert WatchMatcher(entries, ()).matches(str(tmp_path / "notes.txt~"))
+    matcher = WatchMatcher(entries, ["*.log"])
+    assert not matcher.matches(str(tmp_path / "app.log"))
+    assert matcher.matches(str(tmp_path / "notes.txt~"))
+
+
+def test_user_config_overrides_default(monkeypatch, tmp_path):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"watch": {"ignore": ["*.bak"]}}))
+    monkeypatch.setattr(filegit_config, "CONFIG_PATH", config_path)
+    ignore = get_option(load_config(), "watch.ignore")
+    assert ignore == ["*.bak"]
+    assert not WatchMatcher({str(tmp_path)}, ignore).matches(str(tmp_path / "a.bak"))